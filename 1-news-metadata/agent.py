@@ -1,57 +1,221 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END, START
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 
-from schema import State
+# Repository root, for the transport shared by all agents. Inserted first so
+# this checkout's `common` wins over any installed package of that name.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.transport import openai_http_clients
+from cache import ResultCache, result_cache
+from chunking import merge_entities, split_text
+from dedup import NearDuplicateIndex
+from prompts import (
+    chunk_summarization_prompt,
+    classification_prompt,
+    combine_summaries_prompt,
+    entity_extraction_prompt,
+    fused_extraction_prompt,
+    summarization_prompt,
+)
+from schema import NewsMetadata, State
 
 load_dotenv()
-llm = ChatOpenAI(model="gpt-4o-mini",temperature=0)
+llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, **openai_http_clients())
+structured_llm = llm.with_structured_output(NewsMetadata)
+near_duplicates = NearDuplicateIndex(threshold=float(os.getenv("NEWS_DEDUP_THRESHOLD", "0.8")))
+# Chunked mode: token budget per chunk, overlap between chunks, partial
+# summaries combined per reduce call, and chunk calls in flight per process.
+CHUNK_TOKENS = int(os.getenv("NEWS_CHUNK_TOKENS", "3000"))
+CHUNK_OVERLAP = int(os.getenv("NEWS_CHUNK_OVERLAP", "200"))
+SUMMARY_REDUCE_FANIN = 8
+chunk_window = asyncio.Semaphore(int(os.getenv("NEWS_CHUNK_CONCURRENCY", "16")))
+
+
+def _cache_get(node: str, template: str, text: str) -> Tuple[Optional[str], Optional[str]]:
+    '''Cache key and cached output for the prompt, both None when the cache is disabled.
+    Opens the cache on first use; SQLite blocks, so call it through asyncio.to_thread'''
+    cache = result_cache()
+    if cache is None:
+        return None, None
+    key = ResultCache.key(text, template, llm.model_name)
+    return key, cache.get(key, node)
+
+def _cache_set(key: Optional[str], value: str) -> None:
+    if key is not None:
+        result_cache().set(key, value)
+
+async def _cached_invoke(node: str, prompt: PromptTemplate, text: str) -> str:
+    '''Return the model output for the prompt, served from the cache when the text was seen before'''
+    key, cached = await asyncio.to_thread(_cache_get, node, prompt.template, text)
+    if cached is not None:
+        return cached
+    message = HumanMessage(content=prompt.format(text=text))
+    response = await llm.ainvoke([message])
+    content = response.content.strip()
+    await asyncio.to_thread(_cache_set, key, content)
+    return content
 
 # Nodes
 async def classification_node(state: State):
     '''Classify the text into one of the categories: News, Blog, Research, or Other '''
-    prompt = PromptTemplate(
-        input_variables=["text"],
-        template="Classify the following text into one of the categories: News, Blog, Research, or Other.\n\nText:{text}\n\nCategory:"
-    )
-    message = HumanMessage(content=prompt.format(text=state.text))
-    classification = await llm.ainvoke([message])
-    return {"classification": classification.content.strip()}
+    classification = await _cached_invoke("classification", classification_prompt, state.text)
+    return {"classification": classification}
 
 async def entity_extraction_node(state: State):
     ''' Extract all the entities (Person, Organization, Location) from the text'''
-    prompt = PromptTemplate(
-        input_variables=["text"],
-        template="Extract all the entities (Person, Organization, Location) from the following text. Provide the result as a comma-separated list.\n\nText:{text}\n\nEntities:"
-    )
-    message = HumanMessage(content=prompt.format(text=state.text))
-    entities = await llm.ainvoke([message])
-    return {"entities": entities.content.strip().split(", ")}
+    entities = await _cached_invoke("entity_extraction", entity_extraction_prompt, state.text)
+    return {"entities": entities.split(", ")}
 
 async def summarization_node(state: State):
     '''Summarize the text in one short sentence'''
-    prompt = PromptTemplate(
-        input_variables=["text"],
-        template="Summarize the following text in one short sentence.\n\nText:{text}\n\nSummary:"
+    summary = await _cached_invoke("summarization", summarization_prompt, state.text)
+    return {"summary": summary}
+
+async def fused_extraction_node(state: State):
+    '''Classify, extract entities and summarize the text with one structured-output call'''
+    key, cached = await asyncio.to_thread(_cache_get, "fused_extraction", fused_extraction_prompt.template, state.text)
+    if cached is not None:
+        metadata = NewsMetadata.model_validate_json(cached)
+    else:
+        message = HumanMessage(content=fused_extraction_prompt.format(text=state.text))
+        metadata = await structured_llm.ainvoke([message])
+        await asyncio.to_thread(_cache_set, key, metadata.model_dump_json())
+    validated = State.model_validate({"text": state.text, **metadata.model_dump()})
+    return {
+        "classification": validated.classification,
+        "entities": validated.entities,
+        "summary": validated.summary,
+    }
+
+async def _chunk_invoke(node: str, prompt: PromptTemplate, text: str) -> str:
+    async with chunk_window:
+        return await _cached_invoke(node, prompt, text)
+
+async def chunked_classification_node(state: State):
+    '''Classify a long text from its first chunk, which is enough to tell the category'''
+    first_chunk = split_text(state.text, CHUNK_TOKENS, CHUNK_OVERLAP, llm.model_name)[0]
+    classification = await _chunk_invoke("classification", classification_prompt, first_chunk)
+    return {"classification": classification}
+
+async def chunked_entity_extraction_node(state: State):
+    '''Extract entities from every chunk concurrently and merge the deduplicated lists'''
+    chunks = split_text(state.text, CHUNK_TOKENS, CHUNK_OVERLAP, llm.model_name)
+    results = await asyncio.gather(
+        *(_chunk_invoke("entity_extraction", entity_extraction_prompt, chunk) for chunk in chunks)
+    )
+    return {"entities": merge_entities(result.split(", ") for result in results)}
+
+async def chunked_summarization_node(state: State):
+    '''Summarize every chunk concurrently, then reduce the partial summaries level by level'''
+    chunks = split_text(state.text, CHUNK_TOKENS, CHUNK_OVERLAP, llm.model_name)
+    if len(chunks) == 1:
+        return {"summary": await _chunk_invoke("summarization", summarization_prompt, chunks[0])}
+    partials = await asyncio.gather(
+        *(_chunk_invoke("summarization", chunk_summarization_prompt, chunk) for chunk in chunks)
+    )
+    while len(partials) > SUMMARY_REDUCE_FANIN:
+        groups = [
+            partials[i:i + SUMMARY_REDUCE_FANIN]
+            for i in range(0, len(partials), SUMMARY_REDUCE_FANIN)
+        ]
+        partials = await asyncio.gather(
+            *(_chunk_invoke("summarization", combine_summaries_prompt, "\n\n".join(group)) for group in groups)
+        )
+    summary = await _chunk_invoke("summarization", summarization_prompt, "\n\n".join(partials))
+    return {"summary": summary}
+
+async def near_duplicate_node(state: State):
+    '''Reuse the metadata of an already processed near-duplicate of the text, if there is one'''
+    signature = near_duplicates.signature(state.text)
+    match = near_duplicates.query_signature(signature)
+    if match is None:
+        return {"minhash": signature.tobytes()}
+    metadata, similarity = match
+    return {**metadata, "entities": list(metadata["entities"]), "duplicate_similarity": similarity}
+
+async def remember_node(state: State):
+    '''Index the text so that later near-duplicates can reuse its metadata'''
+    if state.minhash is not None:
+        signature = np.frombuffer(state.minhash, dtype=np.uint32)
+    else:
+        signature = near_duplicates.signature(state.text)
+    near_duplicates.add_signature(
+        signature,
+        {
+            "classification": state.classification,
+            "entities": state.entities,
+            "summary": state.summary,
+        },
     )
-    message = HumanMessage(content=prompt.format(text=state.text))
-    summary = await llm.ainvoke([message])
-    return {"summary": summary.content.strip()}
+    return {}
 
 # Graph
-workflow = StateGraph(State)
+def build_workflow(mode: str = "fanout", dedup: bool = True) -> StateGraph:
+    """Build the metadata graph.
+
+    ``fanout`` runs one model call per field in parallel; ``fused`` asks for all
+    three fields in a single call, sending the article text only once;
+    ``chunked`` is the fan-out graph with token-budgeted map-reduce nodes for
+    documents too long to send in one prompt. With
+    ``dedup`` a MinHash/LSH stage runs first and short-circuits near-duplicates
+    of articles this process has already seen.
+    """
+    workflow = StateGraph(State)
+
+    if mode == "fused":
+        extraction_nodes = {"fused_extraction": fused_extraction_node}
+    elif mode == "fanout":
+        extraction_nodes = {
+            "classification_node": classification_node,
+            "entity_extraction": entity_extraction_node,
+            "summarization": summarization_node,
+        }
+    elif mode == "chunked":
+        extraction_nodes = {
+            "classification_node": chunked_classification_node,
+            "entity_extraction": chunked_entity_extraction_node,
+            "summarization": chunked_summarization_node,
+        }
+    else:
+        raise ValueError(f"Unsupported workflow mode: {mode}")
+
+    for name, node in extraction_nodes.items():
+        workflow.add_node(name, node)
+
+    if not dedup:
+        for name in extraction_nodes:
+            workflow.add_edge(START, name)
+            workflow.add_edge(name, END)
+        return workflow
+
+    workflow.add_node("near_duplicate", near_duplicate_node)
+    workflow.add_node("remember", remember_node)
+    workflow.add_edge(START, "near_duplicate")
+
+    def route_near_duplicate(state: State):
+        if state.duplicate_similarity is not None:
+            return END
+        return list(extraction_nodes)
+
+    workflow.add_conditional_edges(
+        "near_duplicate", route_near_duplicate, [END, *extraction_nodes]
+    )
+    workflow.add_edge(list(extraction_nodes), "remember")
+    workflow.add_edge("remember", END)
 
-workflow.add_node("classification_node", classification_node)
-workflow.add_node("entity_extraction", entity_extraction_node)
-workflow.add_node("summarization", summarization_node)
+    return workflow
 
-workflow.add_edge(START, "classification_node")
-workflow.add_edge(START, "entity_extraction")
-workflow.add_edge(START, "summarization")
-workflow.add_edge("classification_node", END)
-workflow.add_edge("entity_extraction", END)
-workflow.add_edge("summarization", END)
 
-app = workflow.compile()
+app = build_workflow("fanout").compile()
+fused_app = build_workflow("fused").compile()
+chunked_app = build_workflow("chunked").compile()
+apps = {"fanout": app, "fused": fused_app, "chunked": chunked_app}
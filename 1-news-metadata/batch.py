@@ -0,0 +1,202 @@
+"""Batch entry point: run the news-metadata graph over a JSONL/Parquet corpus.
+
+Results are appended to a JSONL file as each document finishes, so a crashed
+run can be restarted with the same arguments and picks up where it stopped.
+
+    python 1-news-metadata/batch.py articles.jsonl results.jsonl --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from agent import apps
+from cache import result_cache
+from corpus import iter_documents
+
+
+@dataclass
+class BatchStats:
+    """Throughput and latency counters for one batch run."""
+
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    latencies: List[float] = field(default_factory=list)
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.latencies.append(latency)
+        if ok:
+            self.processed += 1
+        else:
+            self.failed += 1
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started_at
+        ordered = sorted(self.latencies)
+        done = self.processed + self.failed
+        return {
+            "processed": self.processed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_s": round(elapsed, 3),
+            "docs_per_s": round(done / elapsed, 3) if elapsed > 0 else 0.0,
+            "p50_latency_s": round(_percentile(ordered, 50), 3),
+            "p99_latency_s": round(_percentile(ordered, 99), 3),
+        }
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def load_completed_offsets(output_path: Path) -> Set[int]:
+    """Return the offsets that already have a successful result in ``output_path``.
+
+    A run killed mid-write can leave a partial last line behind; it is truncated
+    so that new results are appended after the last complete record.
+    """
+    completed: Set[int] = set()
+    if not output_path.exists():
+        return completed
+    valid_bytes = 0
+    with output_path.open("rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                break
+            valid_bytes += len(raw)
+            if "error" not in record:
+                completed.add(record["offset"])
+    if valid_bytes != output_path.stat().st_size:
+        with output_path.open("r+b") as f:
+            f.truncate(valid_bytes)
+    return completed
+
+
+def _resume_offset(completed: Set[int]) -> int:
+    """First offset that has not been completed; everything before it is done."""
+    offset = 0
+    while offset in completed:
+        offset += 1
+    return offset
+
+
+async def _process(
+    offset: int,
+    doc_id: Optional[str],
+    text: str,
+    graph,
+    out,
+    stats: BatchStats,
+    window: asyncio.Semaphore,
+) -> None:
+    started = time.perf_counter()
+    record: Dict[str, Any] = {"offset": offset, "id": doc_id}
+    try:
+        result = await graph.ainvoke({"text": text})
+        record.update(
+            classification=result["classification"],
+            entities=result["entities"],
+            summary=result["summary"],
+            duplicate_similarity=result.get("duplicate_similarity"),
+        )
+        ok = True
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        ok = False
+    finally:
+        window.release()
+    latency = time.perf_counter() - started
+    record["latency_s"] = round(latency, 4)
+    # One write per record keeps lines whole even with many tasks in flight.
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+    stats.record(latency, ok)
+
+
+async def run_batch(
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = 8,
+    text_field: str = "text",
+    id_field: str = "id",
+    limit: Optional[int] = None,
+    mode: str = "fanout",
+) -> Dict[str, Any]:
+    """Run the graph over every pending document and return the run statistics."""
+    graph = apps[mode]
+    completed = load_completed_offsets(output_path)
+    start = _resume_offset(completed)
+    stats = BatchStats()
+    window = asyncio.Semaphore(concurrency)
+    tasks: Set[asyncio.Task] = set()
+    submitted = 0
+
+    with output_path.open("a", encoding="utf-8") as out:
+        for offset, doc_id, text in iter_documents(input_path, text_field, id_field, start):
+            if offset in completed:
+                stats.skipped += 1
+                continue
+            if limit is not None and submitted >= limit:
+                break
+            # Block the reader until a slot frees up so memory stays bounded.
+            await window.acquire()
+            task = asyncio.create_task(_process(offset, doc_id, text, graph, out, stats, window))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            submitted += 1
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    stats.skipped += start
+    report = stats.report()
+    cache = result_cache()
+    if cache:
+        report["cache"] = cache.stats()
+    return report
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", type=Path, help="JSONL or Parquet file with one article per record")
+    parser.add_argument("output", type=Path, help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("NEWS_BATCH_CONCURRENCY", "8")))
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--mode", choices=sorted(apps), default="fanout")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many new documents")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    report = asyncio.run(
+        run_batch(
+            args.input,
+            args.output,
+            concurrency=args.concurrency,
+            text_field=args.text_field,
+            id_field=args.id_field,
+            limit=args.limit,
+            mode=args.mode,
+        )
+    )
+    print(json.dumps(report, indent=2))
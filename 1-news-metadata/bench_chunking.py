@@ -0,0 +1,71 @@
+"""Measure how entity extraction and summarization latency scale with document length.
+
+Each length is run through the single-prompt nodes and the chunked map-reduce
+nodes. Single-prompt runs that exceed the model context window are reported as
+errors rather than timings.
+
+    python 1-news-metadata/bench_chunking.py --lengths 1000 8000 32000 128000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+load_dotenv()
+# Every length re-sends overlapping text; the cache would turn most calls into hits.
+os.environ["NEWS_CACHE_PATH"] = ""
+
+import agent
+from chunking import count_tokens
+from main import sample_text
+from schema import State
+
+
+def _document(source: str, tokens: int) -> str:
+    """Repeat ``source`` paragraphs until the text reaches ``tokens`` tokens."""
+    paragraphs = [p for p in source.split("\n") if p.strip()]
+    parts, total, i = [], 0, 0
+    while total < tokens:
+        paragraph = paragraphs[i % len(paragraphs)]
+        parts.append(paragraph)
+        total += count_tokens(paragraph) + 1
+        i += 1
+    return "\n".join(parts)
+
+
+async def _time_nodes(nodes, state: State) -> dict:
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(node(state) for node in nodes))
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {str(e)[:120]}"}
+    return {"latency_s": round(time.perf_counter() - started, 3)}
+
+
+async def main(args: argparse.Namespace) -> None:
+    source = args.source.read_text(encoding="utf-8") if args.source else sample_text
+    for length in args.lengths:
+        state = State(text=_document(source, length))
+        single = await _time_nodes(
+            (agent.entity_extraction_node, agent.summarization_node), state
+        )
+        chunked = await _time_nodes(
+            (agent.chunked_entity_extraction_node, agent.chunked_summarization_node), state
+        )
+        print(json.dumps({
+            "tokens": count_tokens(state.text),
+            "chunk_tokens": agent.CHUNK_TOKENS,
+            "single_prompt": single,
+            "chunked": chunked,
+        }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1000, 4000, 16000, 64000, 160000])
+    parser.add_argument("--source", type=Path, default=None, help="Text file to build documents from")
+    asyncio.run(main(parser.parse_args()))
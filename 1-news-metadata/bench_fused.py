@@ -0,0 +1,75 @@
+"""Compare token usage and wall-clock time of the fan-out and fused graphs.
+
+    python 1-news-metadata/bench_fused.py --docs articles.jsonl --limit 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from dotenv import load_dotenv
+load_dotenv()
+# Measure real model calls: a warm result cache would hide the difference.
+os.environ["NEWS_CACHE_PATH"] = ""
+
+from langchain_core.callbacks import get_usage_metadata_callback
+
+from agent import build_workflow
+from main import sample_text
+
+
+async def _run_mode(mode: str, texts: List[str], concurrency: int) -> Dict[str, float]:
+    # Without the near-duplicate stage so that repeated texts still hit the model.
+    graph = build_workflow(mode, dedup=False).compile()
+    window = asyncio.Semaphore(concurrency)
+
+    async def run_one(text: str) -> None:
+        async with window:
+            await graph.ainvoke({"text": text})
+
+    with get_usage_metadata_callback() as usage:
+        started = time.perf_counter()
+        await asyncio.gather(*(run_one(text) for text in texts))
+        elapsed = time.perf_counter() - started
+
+    totals = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for model_usage in usage.usage_metadata.values():
+        for key in totals:
+            totals[key] += model_usage.get(key, 0)
+    return {
+        "mode": mode,
+        "docs": len(texts),
+        "wall_clock_s": round(elapsed, 3),
+        "s_per_doc": round(elapsed / len(texts), 3),
+        **totals,
+        "tokens_per_doc": round(totals["total_tokens"] / len(texts), 1),
+    }
+
+
+def _load_texts(path: Path, limit: int) -> List[str]:
+    texts = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                texts.append(json.loads(line)["text"])
+            if len(texts) >= limit:
+                break
+    return texts
+
+
+async def main(args: argparse.Namespace) -> None:
+    texts = _load_texts(args.docs, args.limit) if args.docs else [sample_text] * args.limit
+    for mode in ("fanout", "fused"):
+        print(json.dumps(await _run_mode(mode, texts, args.concurrency)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=Path, default=None, help="JSONL corpus; defaults to main.sample_text")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""Persistent, content-addressed cache for node results.
+
+Entries are keyed on a hash of the normalized article text, the prompt template
+and the model name, so a re-delivered article skips the model call while a
+prompt or model change naturally misses. The store is a single SQLite file
+whose total payload size is bounded with least-recently-used eviction.
+"""
+
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+_WHITESPACE = re.compile(r"\s+")
+DEFAULT_PATH = Path(__file__).parent / ".cache" / "results.sqlite"
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFKC, collapsed whitespace, trimmed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class ResultCache:
+    """SQLite-backed LRU cache of model outputs with per-node hit/miss counters.
+
+    Calls are serialized by a lock, so async code can run them on worker
+    threads with ``asyncio.to_thread``.
+    """
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = 256 * 1024 * 1024):
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._conn = sqlite3.connect(self._path, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access)"
+        )
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        self._total_bytes = total
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def key(text: str, template: str, model: str) -> str:
+        digest = hashlib.sha256()
+        for part in (normalize_text(text), template, model):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str, node: str = "default") -> Optional[str]:
+        with self._lock:
+            return self._get(key, node)
+
+    def _get(self, key: str, node: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses[node] += 1
+            return None
+        self.hits[node] += 1
+        self._conn.execute(
+            "UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key)
+        )
+        return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._set(key, value)
+
+    def _set(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        previous = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, value, size, time.time()),
+        )
+        self._total_bytes += size - (previous[0] if previous else 0)
+        if self._total_bytes > self._max_bytes:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the store is under 90% of its bound."""
+        target = int(self._max_bytes * 0.9)
+        doomed = []
+        cursor = self._conn.execute("SELECT key, size FROM results ORDER BY last_access")
+        for key, size in cursor:
+            if self._total_bytes <= target:
+                break
+            doomed.append((key,))
+            self._total_bytes -= size
+        cursor.close()
+        self._conn.execute("BEGIN")
+        self._conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+        self._conn.execute("COMMIT")
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            nodes = sorted(set(self.hits) | set(self.misses))
+            return {node: {"hits": self.hits[node], "misses": self.misses[node]} for node in nodes}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@functools.cache
+def result_cache() -> Optional[ResultCache]:
+    """The process-wide cache at NEWS_CACHE_PATH, opened on first use; None when the variable is empty."""
+    path = os.getenv("NEWS_CACHE_PATH", str(DEFAULT_PATH))
+    return ResultCache(path) if path else None
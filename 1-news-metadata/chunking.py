@@ -0,0 +1,58 @@
+"""Token-budget text splitting and merge helpers for long documents."""
+
+from functools import lru_cache
+from typing import Iterable, List
+
+import tiktoken
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> tiktoken.Encoding:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    return len(_encoding(model).encode(text, disallowed_special=()))
+
+
+def split_text(
+    text: str,
+    max_tokens: int,
+    overlap: int = 0,
+    model: str = "gpt-4o-mini",
+) -> List[str]:
+    """Split ``text`` into windows of at most ``max_tokens`` tokens.
+
+    Consecutive windows share ``overlap`` tokens so that a sentence or a name
+    cut at a boundary still appears whole in one of them.
+    """
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    encoding = _encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return [text]
+    step = max_tokens - overlap
+    chunks = []
+    for start in range(0, len(tokens), step):
+        chunks.append(encoding.decode(tokens[start:start + max_tokens]))
+        if start + max_tokens >= len(tokens):
+            break
+    return chunks
+
+
+def merge_entities(entity_lists: Iterable[Iterable[str]]) -> List[str]:
+    """Merge per-chunk entity lists, dropping case and whitespace duplicates.
+
+    The first spelling seen wins and the order of first appearance is kept.
+    """
+    merged = {}
+    for entities in entity_lists:
+        for entity in entities:
+            cleaned = " ".join(entity.split()).strip(" .")
+            if cleaned:
+                merged.setdefault(cleaned.casefold(), cleaned)
+    return list(merged.values())
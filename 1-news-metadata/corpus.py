@@ -0,0 +1,53 @@
+"""Readers for article corpora stored as JSONL or Parquet."""
+
+import json
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+
+def iter_documents(
+    path: Path,
+    text_field: str = "text",
+    id_field: str = "id",
+    start: int = 0,
+) -> Iterator[Tuple[int, Optional[str], str]]:
+    """Yield ``(offset, doc_id, text)`` for every record at or after ``start``.
+
+    The offset is the zero-based line number for JSONL and the row number for
+    Parquet, which makes it stable across restarts.
+    """
+    if path.suffix == ".parquet":
+        yield from _iter_parquet(path, text_field, id_field, start)
+        return
+    with path.open("r", encoding="utf-8") as f:
+        for offset, line in enumerate(f):
+            if offset < start or not line.strip():
+                continue
+            record = json.loads(line)
+            doc_id = record.get(id_field)
+            yield offset, None if doc_id is None else str(doc_id), record[text_field]
+
+
+def _iter_parquet(
+    path: Path, text_field: str, id_field: str, start: int
+) -> Iterator[Tuple[int, Optional[str], str]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet input requires `pip install pyarrow`.") from e
+
+    parquet_file = pq.ParquetFile(path)
+    columns = [text_field]
+    if id_field in parquet_file.schema_arrow.names:
+        columns.append(id_field)
+    offset = 0
+    for batch in parquet_file.iter_batches(columns=columns):
+        if offset + batch.num_rows <= start:
+            offset += batch.num_rows
+            continue
+        texts = batch.column(text_field).to_pylist()
+        ids = batch.column(id_field).to_pylist() if len(columns) > 1 else [None] * len(texts)
+        for doc_id, text in zip(ids, texts):
+            if offset >= start:
+                yield offset, None if doc_id is None else str(doc_id), text
+            offset += 1
@@ -0,0 +1,134 @@
+"""In-memory MinHash/LSH index for spotting near-duplicate articles.
+
+Syndicated copies of a story usually differ only by a byline, a dateline or a
+tracking footer. Those copies share most of their character shingles, so their
+MinHash signatures agree on most positions and collide in at least one LSH
+band. Shingling and hashing are done with NumPy over the UTF-8 bytes of the
+text, a bounded block of shingles at a time, and signatures are stored as one
+contiguous ``uint32`` matrix so that millions of documents fit in memory.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from cache import normalize_text
+
+# Mersenne prime 2^31 - 1. With a, b and x reduced below it, a * x + b fits in
+# uint64 exactly, so each permutation is the universal hash (a * x + b) mod p.
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+# Shingles hashed per step; bounds the (num_perm, block) matrix to a few MB.
+_SHINGLE_BLOCK = 4096
+# Weights of missed near-duplicates and of spurious candidates when choosing
+# the LSH bands. Every candidate is verified against its full signature, so a
+# false positive costs one comparison while a false negative costs model calls.
+_FALSE_NEGATIVE_WEIGHT = 0.9
+_FALSE_POSITIVE_WEIGHT = 0.1
+
+
+def _lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Pick ``(bands, rows)`` minimising the weighted false-negative and false-positive areas.
+
+    A pair with Jaccard similarity ``s`` becomes a candidate with probability
+    ``1 - (1 - s**rows) ** bands``. The false-positive area integrates it below
+    ``threshold`` and the false-negative area its complement above, as
+    datasketch does. Only ``bands * rows`` of the ``num_perm`` hashes are banded.
+    """
+    points = 1000
+    below = (np.arange(points) + 0.5) / points * threshold
+    above = threshold + (np.arange(points) + 0.5) / points * (1 - threshold)
+    best, best_error = (num_perm, 1), float("inf")
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive = (1 - (1 - below**rows) ** bands).mean() * threshold
+            false_negative = ((1 - above**rows) ** bands).mean() * (1 - threshold)
+            error = _FALSE_POSITIVE_WEIGHT * false_positive + _FALSE_NEGATIVE_WEIGHT * false_negative
+            if error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """MinHash signatures plus banded LSH buckets, with a payload per document."""
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        shingle_size: int = 9,
+        seed: int = 1,
+        initial_capacity: int = 1024,
+    ):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self._num_perm = num_perm
+        self._shingle_size = shingle_size
+        self._bands, self._rows = _lsh_params(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        # Polynomial rolling-hash weights for one shingle, highest power first.
+        self._powers = np.uint64(257) ** np.arange(shingle_size - 1, -1, -1, dtype=np.uint64)
+        self._signatures = np.empty((initial_capacity, num_perm), dtype=np.uint32)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self._bands)]
+        self._payloads: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        data = np.frombuffer(normalize_text(text).lower().encode("utf-8"), dtype=np.uint8)
+        if data.size < self._shingle_size:
+            data = np.pad(data, (0, self._shingle_size - data.size))
+        windows = sliding_window_view(data, self._shingle_size).astype(np.uint64)
+        # uint64 arithmetic wraps on overflow, which is what a rolling hash wants.
+        return np.unique((windows @ self._powers) % _MERSENNE_PRIME)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of ``text`` as a ``(num_perm,)`` uint32 array."""
+        shingles = self._shingles(text)
+        signature = np.full(self._num_perm, _MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(shingles), _SHINGLE_BLOCK):
+            block = shingles[start:start + _SHINGLE_BLOCK]
+            hashed = (np.outer(self._a, block) + self._b[:, None]) % _MERSENNE_PRIME
+            np.minimum(signature, hashed.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        banded = signature[:self._bands * self._rows]
+        return [band.tobytes() for band in banded.reshape(self._bands, self._rows)]
+
+    def query(self, text: str) -> Optional[Tuple[Any, float]]:
+        """Return ``(payload, similarity)`` of the closest indexed near-duplicate, if any."""
+        return self.query_signature(self.signature(text))
+
+    def query_signature(self, signature: np.ndarray) -> Optional[Tuple[Any, float]]:
+        candidates = set()
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(band.get(key, ()))
+        if not candidates:
+            return None
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signatures[ids] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            return None
+        return self._payloads[ids[best]], float(similarity[best])
+
+    def add(self, text: str, payload: Any) -> int:
+        """Index ``text`` and remember ``payload`` for future matches; return its id."""
+        return self.add_signature(self.signature(text), payload)
+
+    def add_signature(self, signature: np.ndarray, payload: Any) -> int:
+        doc_id = len(self._payloads)
+        if doc_id == len(self._signatures):
+            grown = np.empty((2 * len(self._signatures), self._num_perm), dtype=np.uint32)
+            grown[:doc_id] = self._signatures
+            self._signatures = grown
+        self._signatures[doc_id] = signature
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(key, []).append(doc_id)
+        self._payloads.append(payload)
+        return doc_id
@@ -9,14 +9,15 @@ OpenAI has announced the GPT-4 model, which is a large multimodal model that exh
 additionally, the model is designed to be more efficient and scalable than its predecessor, GPT-3. The GPT-4 model is expected to be released in the coming months and will be available to the public for research and development purposes.
 """
 
-state_input = {"text": sample_text}
-result = asyncio.run(app.ainvoke(state_input))
+if __name__ == "__main__":
+    state_input = {"text": sample_text}
+    result = asyncio.run(app.ainvoke(state_input))
 
-print("Classification:", result["classification"])
-print("\nEntities:", result["entities"])
-print("\nSummary:", result["summary"])
-print("\n", type(result), result)
+    print("Classification:", result["classification"])
+    print("\nEntities:", result["entities"])
+    print("\nSummary:", result["summary"])
+    print("\n", type(result), result)
 
-app.get_graph().draw_mermaid_png(
-    output_file_path="1-news-metadata/compiled_graph.png"
-)
+    app.get_graph().draw_mermaid_png(
+        output_file_path="1-news-metadata/compiled_graph.png"
+    )
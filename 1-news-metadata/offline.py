@@ -0,0 +1,369 @@
+"""Offline executor for overnight backfills through a batch API.
+
+Instead of calling the model once per node per article, the prompts of every
+node are written to JSONL files in the OpenAI Batch API request format,
+submitted through a pluggable backend, and the responses are mapped back onto
+``State`` objects once the batches complete. Batch pricing trades latency for
+cost, which is what a backfill wants.
+
+    python 1-news-metadata/offline.py articles.jsonl results.jsonl --backend local
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from langchain_core.prompts import PromptTemplate
+
+from cache import ResultCache, result_cache
+from corpus import iter_documents
+from prompts import (
+    classification_prompt,
+    entity_extraction_prompt,
+    fused_extraction_prompt,
+    summarization_prompt,
+)
+from schema import NewsMetadata, State
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# The OpenAI Batch API accepts at most 50,000 requests per input file.
+MAX_REQUESTS_PER_FILE = 50_000
+
+NODE_PROMPTS: Dict[str, PromptTemplate] = {
+    "classification": classification_prompt,
+    "entity_extraction": entity_extraction_prompt,
+    "summarization": summarization_prompt,
+    "fused_extraction": fused_extraction_prompt,
+}
+MODE_NODES = {
+    "fanout": ["classification", "entity_extraction", "summarization"],
+    "fused": ["fused_extraction"],
+}
+
+
+class BatchBackend(Protocol):
+    """Somewhere batch input files can be submitted and their output collected."""
+
+    async def submit(self, input_path: Path) -> str: ...
+
+    async def status(self, batch_id: str) -> str: ...
+
+    async def download(self, batch_id: str, output_path: Path) -> Path: ...
+
+
+class OpenAIBatchBackend:
+    """Backend for the hosted OpenAI Batch API."""
+
+    def __init__(self, client: Any = None, completion_window: str = "24h"):
+        if client is None:
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI()
+        self._client = client
+        self._completion_window = completion_window
+
+    async def submit(self, input_path: Path) -> str:
+        with input_path.open("rb") as f:
+            uploaded = await self._client.files.create(file=f, purpose="batch")
+        batch = await self._client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=CHAT_COMPLETIONS_URL,
+            completion_window=self._completion_window,
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        return (await self._client.batches.retrieve(batch_id)).status
+
+    async def download(self, batch_id: str, output_path: Path) -> Path:
+        batch = await self._client.batches.retrieve(batch_id)
+        with output_path.open("wb") as out:
+            # Failed requests are reported in a separate error file with the same line format.
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    content = await self._client.files.content(file_id)
+                    out.write(content.read())
+        return output_path
+
+
+def _placeholder_content(body: Dict[str, Any]) -> str:
+    """Deterministic reply for the local backend that still parses like a real one."""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") != "json_schema":
+        return "Other"
+    values = {}
+    for name, spec in response_format["json_schema"]["schema"]["properties"].items():
+        if "enum" in spec:
+            values[name] = spec["enum"][-1]
+        elif spec.get("type") == "array":
+            values[name] = []
+        else:
+            values[name] = ""
+    return json.dumps(values)
+
+
+class LocalFileBatchBackend:
+    """Network-free backend that answers every request from a local responder.
+
+    Batches complete as soon as they are submitted. Output files use the same
+    line format as the OpenAI Batch API, so the whole executor path can be run
+    and checked offline.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        responder: Callable[[Dict[str, Any]], str] = _placeholder_content,
+    ):
+        self._root = Path(root)
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._responder = responder
+
+    def _output_path(self, batch_id: str) -> Path:
+        return self._root / f"{batch_id}_output.jsonl"
+
+    async def submit(self, input_path: Path) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        with input_path.open("r", encoding="utf-8") as src, self._output_path(batch_id).open("w", encoding="utf-8") as out:
+            for line in src:
+                request = json.loads(line)
+                response = {
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "request_id": uuid.uuid4().hex,
+                        "body": {
+                            "object": "chat.completion",
+                            "model": request["body"]["model"],
+                            "choices": [{
+                                "index": 0,
+                                "message": {"role": "assistant", "content": self._responder(request["body"])},
+                                "finish_reason": "stop",
+                            }],
+                        },
+                    },
+                    "error": None,
+                }
+                out.write(json.dumps(response) + "\n")
+        return batch_id
+
+    async def status(self, batch_id: str) -> str:
+        return "completed" if self._output_path(batch_id).exists() else "failed"
+
+    async def download(self, batch_id: str, output_path: Path) -> Path:
+        shutil.copyfile(self._output_path(batch_id), output_path)
+        return output_path
+
+
+def _apply_response(fields: Dict[str, Any], node: str, content: str) -> None:
+    """Post-process a node's raw output the same way the graph nodes do."""
+    content = content.strip()
+    if node == "classification":
+        fields["classification"] = content
+    elif node == "entity_extraction":
+        fields["entities"] = content.split(", ")
+    elif node == "summarization":
+        fields["summary"] = content
+    elif node == "fused_extraction":
+        fields.update(NewsMetadata.model_validate_json(content).model_dump())
+
+
+class OfflineExecutor:
+    """Run the news-metadata prompts for a whole corpus through a batch backend."""
+
+    def __init__(
+        self,
+        backend: BatchBackend,
+        work_dir: Path,
+        mode: str = "fanout",
+        model: str = "gpt-4o-mini",
+        poll_interval: float = 60.0,
+        max_requests_per_file: int = MAX_REQUESTS_PER_FILE,
+        cache: Optional[ResultCache] = None,
+    ):
+        if mode not in MODE_NODES:
+            raise ValueError(f"Unsupported offline mode: {mode}")
+        self._backend = backend
+        self._work_dir = Path(work_dir)
+        self._work_dir.mkdir(parents=True, exist_ok=True)
+        self._nodes = MODE_NODES[mode]
+        self._model = model
+        self._poll_interval = poll_interval
+        self._max_requests_per_file = max_requests_per_file
+        self._cache = cache
+
+    def _request(self, custom_id: str, node: str, text: str) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            "model": self._model,
+            "temperature": 0,
+            "messages": [{"role": "user", "content": NODE_PROMPTS[node].format(text=text)}],
+        }
+        if node == "fused_extraction":
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "NewsMetadata", "schema": NewsMetadata.model_json_schema()},
+            }
+        return {"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_URL, "body": body}
+
+    def _cache_key(self, node: str, text: str) -> str:
+        return ResultCache.key(text, NODE_PROMPTS[node].template, self._model)
+
+    def write_batch_files(
+        self,
+        docs: Iterable[Tuple[str, str]],
+        texts: Dict[str, str],
+        fields: Dict[str, Dict[str, Any]],
+    ) -> List[Path]:
+        """Write pending requests to batch input files, answering cache hits directly.
+
+        Raises ``ValueError`` on a repeated document id, whose requests and
+        results could not be told apart.
+        """
+        paths: List[Path] = []
+        out = None
+        in_file = 0
+        try:
+            for doc_id, text in docs:
+                if doc_id in texts:
+                    raise ValueError(f"Duplicate document id {doc_id!r}; document ids must be unique")
+                texts[doc_id] = text
+                fields[doc_id] = {}
+                for node in self._nodes:
+                    if self._cache:
+                        cached = self._cache.get(self._cache_key(node, text), node)
+                        if cached is not None:
+                            _apply_response(fields[doc_id], node, cached)
+                            continue
+                    if out is None or in_file >= self._max_requests_per_file:
+                        if out is not None:
+                            out.close()
+                        paths.append(self._work_dir / f"input_{len(paths):04d}.jsonl")
+                        out = paths[-1].open("w", encoding="utf-8")
+                        in_file = 0
+                    request = self._request(f"{doc_id}::{node}", node, text)
+                    out.write(json.dumps(request, ensure_ascii=False) + "\n")
+                    in_file += 1
+        finally:
+            if out is not None:
+                out.close()
+        return paths
+
+    async def _wait_for(self, batch_id: str, index: int) -> Optional[Path]:
+        status = await self._backend.status(batch_id)
+        while status not in TERMINAL_STATUSES:
+            await asyncio.sleep(self._poll_interval)
+            status = await self._backend.status(batch_id)
+        if status == "failed":
+            return None
+        # Expired and cancelled batches still return whatever finished in time.
+        return await self._backend.download(batch_id, self._work_dir / f"output_{index:04d}.jsonl")
+
+    async def run(self, docs: Iterable[Tuple[str, str]]) -> Tuple[Dict[str, State], Dict[str, str]]:
+        """Process ``(doc_id, text)`` pairs; return the states and per-request errors."""
+        texts: Dict[str, str] = {}
+        fields: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+        input_paths = self.write_batch_files(docs, texts, fields)
+        batch_ids = await asyncio.gather(*(self._backend.submit(path) for path in input_paths))
+        output_paths = await asyncio.gather(
+            *(self._wait_for(batch_id, i) for i, batch_id in enumerate(batch_ids))
+        )
+
+        answered = set()
+        for output_path in output_paths:
+            if output_path is None:
+                continue
+            with output_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    result = json.loads(line)
+                    custom_id = result["custom_id"]
+                    doc_id, node = custom_id.rsplit("::", 1)
+                    answered.add(custom_id)
+                    response = result.get("response") or {}
+                    if result.get("error") or response.get("status_code") != 200:
+                        errors[custom_id] = json.dumps(result.get("error") or response.get("body"))
+                        continue
+                    content = response["body"]["choices"][0]["message"]["content"]
+                    try:
+                        _apply_response(fields[doc_id], node, content)
+                    except ValueError as e:
+                        errors[custom_id] = str(e)
+                        continue
+                    if self._cache:
+                        self._cache.set(self._cache_key(node, texts[doc_id]), content.strip())
+
+        for path in input_paths:
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    custom_id = json.loads(line)["custom_id"]
+                    if custom_id not in answered:
+                        errors.setdefault(custom_id, "no result returned by the batch backend")
+
+        states = {doc_id: State(text=texts[doc_id], **fields[doc_id]) for doc_id in texts}
+        return states, errors
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", type=Path, help="JSONL or Parquet file with one article per record")
+    parser.add_argument("output", type=Path, help="JSONL file to write one result per article to")
+    parser.add_argument("--backend", choices=["openai", "local"], default="openai")
+    parser.add_argument("--mode", choices=sorted(MODE_NODES), default="fanout")
+    parser.add_argument("--work-dir", type=Path, default=Path(__file__).resolve().parent / ".batches")
+    parser.add_argument("--poll-interval", type=float, default=60.0)
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--id-field", default="id")
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> int:
+    """Run the backfill; return the number of documents with a failed request."""
+    run_dir = args.work_dir / time.strftime("%Y%m%d-%H%M%S")
+    cache = None
+    if args.backend == "local":
+        backend: BatchBackend = LocalFileBatchBackend(run_dir / "backend")
+    else:
+        backend = OpenAIBatchBackend()
+        # Share the graph's result cache; placeholder answers from the local backend must not land in it.
+        cache = result_cache()
+    executor = OfflineExecutor(
+        backend, run_dir, mode=args.mode, poll_interval=args.poll_interval, cache=cache
+    )
+    docs = (
+        (doc_id if doc_id is not None else str(offset), text)
+        for offset, doc_id, text in iter_documents(args.input, args.text_field, args.id_field)
+    )
+    states, errors = await executor.run(docs)
+    doc_errors: Dict[str, List[str]] = {}
+    for custom_id, error in errors.items():
+        doc_id, node = custom_id.rsplit("::", 1)
+        doc_errors.setdefault(doc_id, []).append(f"{node}: {error}")
+    with args.output.open("w", encoding="utf-8") as out:
+        for doc_id, state in states.items():
+            if doc_id in doc_errors:
+                # Partial metadata is not written; consumers see which documents need a rerun.
+                record = {"id": doc_id, "error": "; ".join(doc_errors[doc_id])}
+            else:
+                record = {"id": doc_id, **state.model_dump(exclude={"text", "duplicate_similarity"})}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(json.dumps({
+        "documents": len(states),
+        "failed_documents": len(doc_errors),
+        "failed_requests": len(errors),
+    }))
+    return len(doc_errors)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    sys.exit(1 if asyncio.run(main(_parse_args())) else 0)
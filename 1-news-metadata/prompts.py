@@ -0,0 +1,30 @@
+from langchain_core.prompts import PromptTemplate
+
+
+classification_prompt = PromptTemplate(
+    input_variables=["text"],
+    template="Classify the following text into one of the categories: News, Blog, Research, or Other.\n\nText:{text}\n\nCategory:"
+)
+entity_extraction_prompt = PromptTemplate(
+    input_variables=["text"],
+    template="Extract all the entities (Person, Organization, Location) from the following text. Provide the result as a comma-separated list.\n\nText:{text}\n\nEntities:"
+)
+summarization_prompt = PromptTemplate(
+    input_variables=["text"],
+    template="Summarize the following text in one short sentence.\n\nText:{text}\n\nSummary:"
+)
+chunk_summarization_prompt = PromptTemplate(
+    input_variables=["text"],
+    template="The following is one section of a longer document. Summarize it in two or three sentences, keeping the key facts and names.\n\nText:{text}\n\nSummary:"
+)
+combine_summaries_prompt = PromptTemplate(
+    input_variables=["text"],
+    template="The following are summaries of consecutive sections of one document. Combine them into a single summary of two or three sentences.\n\nSummaries:{text}\n\nSummary:"
+)
+fused_extraction_prompt = PromptTemplate(
+    input_variables=["text"],
+    template="Analyze the following text and return:\n"
+    "- classification: one of News, Blog, Research, or Other\n"
+    "- entities: all the entities (Person, Organization, Location) in the text\n"
+    "- summary: the text summarized in one short sentence\n\nText:{text}"
+)
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -8,3 +8,17 @@ class State(BaseModel):
     classification: Optional[str] = None
     entities: List[str] = Field(default_factory=list)
     summary: Optional[str] = None
+    # Set when the metadata was reused from an already processed near-duplicate.
+    duplicate_similarity: Optional[float] = None
+    # MinHash signature computed by the near-duplicate lookup, reused when the text is indexed.
+    minhash: Optional[bytes] = Field(default=None, exclude=True)
+
+
+class NewsMetadata(BaseModel):
+    """All three metadata fields, returned by a single structured-output call."""
+
+    classification: Literal["News", "Blog", "Research", "Other"]
+    entities: List[str] = Field(
+        description="Every Person, Organization and Location mentioned in the text."
+    )
+    summary: str = Field(description="One short sentence summarizing the text.")
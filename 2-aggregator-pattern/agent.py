@@ -1,3 +1,5 @@
+import os
+
 from langgraph.graph import START, END, StateGraph
 
 from utils.nodes import (
@@ -6,6 +8,7 @@ from utils.nodes import (
     route_joke_quality,
     improve_joke,
     finalize_joke,
+    speculate_joke,
     compose_poem,
     write_story,
     aggregate_answers,
@@ -14,13 +17,33 @@ from utils.state import State
 
 
 
-def _build_workflow() -> StateGraph:
+def _build_workflow(joke_mode: str = "serial") -> StateGraph:
+    """Build the aggregator graph.
+
+    ``joke_mode`` is "serial" for the generate/check/improve loop or
+    "speculative" to draft several candidates in parallel and keep the best.
+    """
     workflow = StateGraph(State)
 
     # Joke nodes
-    workflow.add_node("generate_joke", generate_joke)
-    workflow.add_node("check_joke_quality", check_joke_quality)
-    workflow.add_node("improve_joke", improve_joke)
+    if joke_mode == "serial":
+        workflow.add_node("generate_joke", generate_joke)
+        workflow.add_node("check_joke_quality", check_joke_quality)
+        workflow.add_node("improve_joke", improve_joke)
+        workflow.add_edge(START, "generate_joke")
+        workflow.add_edge("generate_joke", "check_joke_quality")
+        workflow.add_conditional_edges(
+            "check_joke_quality",
+            route_joke_quality,
+            {"passed": "finalize_joke", "retry": "improve_joke", "give_up": "finalize_joke"},
+        )
+        workflow.add_edge("improve_joke", "check_joke_quality")
+    elif joke_mode == "speculative":
+        workflow.add_node("speculate_joke", speculate_joke)
+        workflow.add_edge(START, "speculate_joke")
+        workflow.add_edge("speculate_joke", "finalize_joke")
+    else:
+        raise ValueError(f"Unsupported joke mode: {joke_mode}")
     workflow.add_node("finalize_joke", finalize_joke)
     # Poem node
     workflow.add_node("compose_poem", compose_poem)
@@ -28,14 +51,6 @@ def _build_workflow() -> StateGraph:
     workflow.add_node("write_story", write_story)
     workflow.add_node("aggregate_answers", aggregate_answers, defer=True)
 
-    workflow.add_edge(START, "generate_joke")
-    workflow.add_edge("generate_joke", "check_joke_quality")
-    workflow.add_conditional_edges(
-        "check_joke_quality",
-        route_joke_quality,
-        {"passed": "finalize_joke", "retry": "improve_joke", "give_up": "finalize_joke"},
-    )
-    workflow.add_edge("improve_joke", "check_joke_quality")
     workflow.add_edge("finalize_joke", "aggregate_answers")
     
     workflow.add_edge(START, "compose_poem")
@@ -49,4 +64,4 @@ def _build_workflow() -> StateGraph:
     return workflow
 
 
-aggregator_app = _build_workflow().compile()
+aggregator_app = _build_workflow(os.getenv("AGGREGATOR_JOKE_MODE", "serial")).compile()
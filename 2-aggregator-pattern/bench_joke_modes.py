@@ -0,0 +1,118 @@
+"""Latency of `aggregator_app.ainvoke`: serial joke loop vs speculative candidates.
+
+Both graphs run against simulated models with log-normal latency and a fixed
+chance that any joke passes the quality check, so the comparison reflects the
+shape of the joke branch rather than a provider's mood. The rate and
+concurrency limiters are widened so they do not dominate the timings.
+
+    python 2-aggregator-pattern/bench_joke_modes.py --runs 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import time
+from typing import Dict
+
+from langchain_core.messages import AIMessage
+
+from agent import _build_workflow
+from utils import nodes
+from utils.rate_limit import AdaptiveConcurrencyLimiter, TokenBucketRateLimiter
+from utils.registry import ModelRegistry
+from utils.state import JokeCandidateScore, JokeCandidateScores, JokeQualityDecision
+
+
+class SimulatedModel:
+    def __init__(self, rng: random.Random, median_latency: float, sigma: float, pass_rate: float):
+        self._rng = rng
+        self._median_latency = median_latency
+        self._sigma = sigma
+        self._pass_rate = pass_rate
+        self._schema = None
+        self._parent = self
+        self.calls = 0
+
+    def with_structured_output(self, schema):
+        structured = SimulatedModel(self._rng, self._median_latency, self._sigma, self._pass_rate)
+        structured._schema = schema
+        structured._parent = self
+        return structured
+
+    def _result(self) -> str:
+        return "Pass" if self._rng.random() < self._pass_rate else "Fail"
+
+    async def ainvoke(self, prompt: str):
+        self._parent.calls += 1
+        await asyncio.sleep(self._median_latency * self._rng.lognormvariate(0, self._sigma))
+        if self._schema is JokeQualityDecision:
+            return JokeQualityDecision(result=self._result())
+        if self._schema is JokeCandidateScores:
+            count = len(re.findall(r"^\[\d+\]", prompt, flags=re.MULTILINE))
+            return JokeCandidateScores(scores=[
+                JokeCandidateScore(index=i, result=self._result(), score=self._rng.randint(1, 10))
+                for i in range(count)
+            ])
+        return AIMessage(content=f"simulated reply {self._rng.random():.6f}")
+
+
+class NullSink:
+    async def write(self, topic: str, combined: Dict[str, str]) -> None:
+        return None
+
+
+def _percentiles(samples) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "p50_ms": round(pick(0.50) * 1000, 1),
+        "p95_ms": round(pick(0.95) * 1000, 1),
+        "p99_ms": round(pick(0.99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 1),
+    }
+
+
+async def _run_mode(mode: str, args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    models = {
+        provider: SimulatedModel(rng, args.median_latency, args.sigma, args.pass_rate)
+        for provider in ("openai", "google")
+    }
+    nodes.model_registry = ModelRegistry({provider: (lambda m=model: m) for provider, model in models.items()})
+    for provider in models:
+        nodes._rate_limiters[provider] = TokenBucketRateLimiter(requests_per_minute=1e9)
+        nodes._concurrency_limiters[provider] = AdaptiveConcurrencyLimiter(initial_limit=1e6, max_limit=1e6)
+    app = _build_workflow(mode).compile()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await app.ainvoke({"topic": f"topic {i}"})
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(args.runs)))
+    calls = sum(model.calls for model in models.values())
+    return {**_percentiles(latencies), "model_calls_per_run": round(calls / args.runs, 2)}
+
+
+async def main(args: argparse.Namespace) -> None:
+    nodes.configure_output_sink(NullSink())
+    results = {mode: await _run_mode(mode, args) for mode in ("serial", "speculative")}
+    print(json.dumps({"runs": args.runs, "pass_rate": args.pass_rate, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--median-latency", type=float, default=0.05, help="seconds per simulated model call")
+    parser.add_argument("--sigma", type=float, default=0.6, help="log-normal spread of call latency")
+    parser.add_argument("--pass-rate", type=float, default=0.35)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,162 @@
+"""Startup time and per-call overhead of the model registry.
+
+Three measurements:
+
+1. startup: building the real chat models and warming them up (without API
+   keys or network the warm-up errors are reported, not raised).
+2. lookup: cost of fetching a cached model from many concurrent coroutines,
+   the previous lock-guarded `_get_model` against `ModelRegistry.get`.
+3. first call: latency of the first chat call against a local
+   OpenAI-compatible mock server, with and without warm-up.
+
+    python 2-aggregator-pattern/bench_model_registry.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+from utils.registry import ModelRegistry, warm_openai
+
+COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4.1",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+MODELS = {"object": "list", "data": [{"id": "gpt-4.1", "object": "model", "created": 0, "owned_by": "bench"}]}
+
+
+async def _mock_openai(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Keep-alive HTTP/1.1 handler answering /v1/models and /v1/chat/completions."""
+    try:
+        while request_line := await reader.readline():
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length:
+                await reader.readexactly(length)
+            payload = MODELS if b"/models" in request_line else COMPLETION
+            body = json.dumps(payload).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+class LegacyModelCache:
+    """The lock-guarded lookup that `_get_model` used before the registry."""
+
+    def __init__(self, model: Any):
+        self._model = model
+        self._cache: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, provider: str) -> Any:
+        async with self._lock:
+            cached = self._cache.get(provider)
+            if cached is not None:
+                return cached
+            self._cache[provider] = self._model
+            return self._model
+
+
+async def bench_startup() -> dict:
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+    from utils.nodes import model_registry
+
+    started = time.perf_counter()
+    report = await model_registry.warm_up(timeout=5.0)
+    return {"total_s": round(time.perf_counter() - started, 3), **report}
+
+
+async def bench_lookup(tasks: int, lookups: int) -> dict:
+    model = object()
+    legacy = LegacyModelCache(model)
+    registry = ModelRegistry({"openai": lambda: model})
+
+    async def legacy_worker() -> None:
+        for _ in range(lookups):
+            await legacy.get("openai")
+            await asyncio.sleep(0)
+
+    async def registry_worker() -> None:
+        for _ in range(lookups):
+            registry.get("openai")
+            await asyncio.sleep(0)
+
+    async def baseline_worker() -> None:
+        for _ in range(lookups):
+            await asyncio.sleep(0)
+
+    timings = {}
+    for name, worker in (("baseline", baseline_worker), ("legacy", legacy_worker), ("registry", registry_worker)):
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(tasks)))
+        timings[name] = time.perf_counter() - started
+    total = tasks * lookups
+    # The event-loop switch each worker makes per lookup is subtracted out.
+    return {
+        name: {"ns_per_lookup": round((timings[name] - timings["baseline"]) / total * 1e9)}
+        for name in ("legacy", "registry")
+    }
+
+
+async def bench_first_call(port: int) -> dict:
+    base_url = f"http://127.0.0.1:{port}/v1"
+    results = {}
+    for warmed in (False, True):
+        # langchain-openai shares one default httpx client per base URL across
+        # instances, which would let the cold run warm the pool for the next.
+        http_client = httpx.AsyncClient()
+        registry = ModelRegistry(
+            {"openai": lambda: ChatOpenAI(
+                model="gpt-4.1", base_url=base_url, api_key="sk-bench", http_async_client=http_client
+            )},
+            {"openai": warm_openai},
+        )
+        if warmed:
+            await registry.warm_up()
+        started = time.perf_counter()
+        await registry.get("openai").ainvoke("ping")
+        first = time.perf_counter() - started
+        started = time.perf_counter()
+        await registry.get("openai").ainvoke("ping")
+        second = time.perf_counter() - started
+        await http_client.aclose()
+        results["warmed" if warmed else "cold"] = {
+            "first_call_ms": round(first * 1000, 2),
+            "second_call_ms": round(second * 1000, 2),
+        }
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    print(json.dumps({"startup": await bench_startup()}, indent=2))
+    print(json.dumps({"lookup": await bench_lookup(args.tasks, args.lookups)}, indent=2))
+    server = await asyncio.start_server(_mock_openai, "127.0.0.1", 0)
+    async with server:
+        port = server.sockets[0].getsockname()[1]
+        print(json.dumps({"first_call": await bench_first_call(port)}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--lookups", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,80 @@
+"""Throughput of the output sinks with hundreds of concurrent runs.
+
+Each sink receives `--runs` concurrent writes of a realistic payload. The
+legacy behaviour (every run truncating one shared file and writing it section
+by section) is included for comparison, along with how many runs survive.
+
+    python 2-aggregator-pattern/bench_output_sinks.py --runs 500
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import aiofiles
+
+from utils.sinks import JsonlSink, MarkdownFileSink, SQLiteSink
+
+PAYLOAD = {
+    "joke": "A Minion opened a bank account for its banana, hoping for compound peel. " * 2,
+    "story": "At the edge of the bustling city lived a rowdy group of Minions. " * 60,
+    "poem": "Yellow dreams in goggles bright, banana moons in the night. " * 8,
+}
+
+
+async def _legacy_write(path: Path, topic: str, combined: dict) -> None:
+    async with aiofiles.open(path, "w") as f:
+        await f.write(f"# Aggregated Creations for `{topic}`\n\n")
+        for key, value in combined.items():
+            await f.write(f"## {key.title()}\n\n{value}\n\n")
+
+
+async def _time_runs(write, runs: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(write(f"topic {i}", PAYLOAD) for i in range(runs)))
+    return time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+
+        legacy_path = root / "output.md"
+        elapsed = await _time_runs(lambda t, c: _legacy_write(legacy_path, t, c), args.runs)
+        results["legacy_shared_file"] = {
+            "runs_per_s": round(args.runs / elapsed),
+            "runs_kept": legacy_path.read_text().count("# Aggregated Creations"),
+        }
+
+        markdown = MarkdownFileSink(root / "markdown")
+        elapsed = await _time_runs(markdown.write, args.runs)
+        results["markdown_per_run"] = {
+            "runs_per_s": round(args.runs / elapsed),
+            "runs_kept": len(list((root / "markdown").glob("*.md"))),
+        }
+
+        jsonl = JsonlSink(root / "runs.jsonl")
+        elapsed = await _time_runs(jsonl.write, args.runs)
+        jsonl.close()
+        with (root / "runs.jsonl").open() as f:
+            kept = sum(1 for line in f if json.loads(line)["story"] == PAYLOAD["story"])
+        results["jsonl_append"] = {"runs_per_s": round(args.runs / elapsed), "runs_kept": kept}
+
+        sqlite_sink = SQLiteSink(root / "runs.sqlite")
+        elapsed = await _time_runs(sqlite_sink.write, args.runs)
+        sqlite_sink.close()
+        (kept,) = sqlite3.connect(root / "runs.sqlite").execute("SELECT COUNT(*) FROM runs").fetchone()
+        results["sqlite"] = {"runs_per_s": round(args.runs / elapsed), "runs_kept": kept}
+
+    print(json.dumps({"concurrent_runs": args.runs, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
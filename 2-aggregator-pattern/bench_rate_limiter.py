@@ -0,0 +1,138 @@
+"""Microbenchmark: fairness and overhead of the rate limiters under heavy contention.
+
+Compares the token-bucket limiter with the previous sliding-window limiter when
+thousands of coroutines contend for one provider budget.
+
+    python 2-aggregator-pattern/bench_rate_limiter.py --waiters 2000
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import random
+import statistics
+import time
+from collections import deque
+
+from utils.rate_limit import TokenBucketRateLimiter
+
+
+class SlidingWindowLimiter:
+    """The previous limiter: timestamps in a deque behind a lock, with polling waiters."""
+
+    def __init__(self, max_calls: int, period_seconds: float):
+        self._max_calls = max_calls
+        self._period = period_seconds
+        self._timestamps = deque()
+        self._lock = asyncio.Lock()
+        self.wakeups = 0
+
+    async def acquire(self, tokens: int = 0) -> None:
+        while True:
+            self.wakeups += 1
+            async with self._lock:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self._period:
+                    self._timestamps.popleft()
+                if len(self._timestamps) < self._max_calls:
+                    self._timestamps.append(now)
+                    return
+                wait_time = self._period - (now - self._timestamps[0])
+            await asyncio.sleep(max(wait_time, 0.0))
+
+
+class CountingTokenBucket(TokenBucketRateLimiter):
+    wakeups = 0
+
+    def _wake(self) -> None:
+        self.wakeups += 1
+        super()._wake()
+
+
+def _inversions(order):
+    """Pairs served in the opposite order to their arrival."""
+    served, count = [], 0
+    for arrival in order:
+        count += len(served) - bisect.bisect_right(served, arrival)
+        bisect.insort(served, arrival)
+    return count
+
+
+async def _contend(limiter, waiters: int, token_sizes=None):
+    order, waits = [], []
+
+    async def worker(i: int) -> None:
+        started = time.perf_counter()
+        await limiter.acquire(token_sizes[i] if token_sizes else 0)
+        waits.append(time.perf_counter() - started)
+        order.append(i)
+
+    started = time.perf_counter()
+    tasks = []
+    for i in range(waiters):
+        tasks.append(asyncio.create_task(worker(i)))
+        # Yield so arrival order is the creation order.
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    waits.sort()
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "order_inversions": _inversions(order),
+        "p50_wait_ms": round(statistics.median(waits) * 1000, 2),
+        "p99_wait_ms": round(waits[int(0.99 * (len(waits) - 1))] * 1000, 2),
+        "max_wait_ms": round(waits[-1] * 1000, 2),
+        "wakeups": limiter.wakeups,
+    }
+
+
+async def _uncontended_overhead(limiter, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await limiter.acquire(10)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def main(args: argparse.Namespace) -> None:
+    per_second = args.per_second
+    results = {}
+
+    # 1. Request-limited contention: every limiter allows `per_second` calls/s.
+    results["sliding_window"] = await _contend(
+        SlidingWindowLimiter(max_calls=per_second, period_seconds=1), args.waiters
+    )
+    results["token_bucket"] = await _contend(
+        CountingTokenBucket(requests_per_minute=per_second * 60, request_burst=per_second),
+        args.waiters,
+    )
+
+    # 2. Token-limited contention with mixed prompt sizes.
+    rng = random.Random(0)
+    sizes = [rng.choice([50, 200, 1000, 4000]) for _ in range(args.waiters)]
+    tokens_per_second = sum(sizes) / 2  # the whole run should take about two seconds
+    limiter = CountingTokenBucket(
+        requests_per_minute=10**9,
+        tokens_per_minute=tokens_per_second * 60,
+        token_burst=max(sizes),
+    )
+    token_run = await _contend(limiter, args.waiters, sizes)
+    token_run["achieved_tokens_per_s"] = round(sum(sizes) / token_run["elapsed_s"])
+    token_run["budget_tokens_per_s"] = round(tokens_per_second)
+    results["token_bucket_tpm"] = token_run
+
+    # 3. Per-acquire overhead when nothing has to wait.
+    results["uncontended_us_per_acquire"] = {
+        "sliding_window": round(await _uncontended_overhead(SlidingWindowLimiter(10**9, 1), 100_000), 2),
+        "token_bucket": round(
+            await _uncontended_overhead(TokenBucketRateLimiter(10**12, 10**15), 100_000), 2
+        ),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--waiters", type=int, default=2000)
+    parser.add_argument("--per-second", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
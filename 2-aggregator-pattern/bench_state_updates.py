@@ -0,0 +1,141 @@
+"""Cost of joke-flow state updates per superstep: copy-per-node vs partial-update reducer.
+
+The joke loop is run with stub nodes (no model calls) so only state handling
+is measured. The legacy variant deep-copies `JokeFlowState` and then copies it
+again with the update, as the nodes used to; the reducer variant returns only
+the changed fields. Timings and allocations are reported per superstep across
+retry limits and numbers of concurrent runs.
+
+    python 2-aggregator-pattern/bench_state_updates.py
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from typing import Any, Optional
+
+from langgraph.graph import END, START, StateGraph
+from pydantic import BaseModel, Field
+
+from utils.state import JokeFlowState, State, merge_joke_flow
+
+
+class LegacyState(BaseModel):
+    topic: str
+    final_joke: Optional[str] = None
+    poem: Optional[str] = None
+    story: Optional[str] = None
+    joke_flow: JokeFlowState = Field(default_factory=JokeFlowState)
+
+
+def _legacy_update(state: LegacyState, **updates: Any) -> JokeFlowState:
+    current = state.joke_flow.model_copy(deep=True)
+    return current.model_copy(update=updates)
+
+
+def _build(retry_limit: int, legacy: bool):
+    def flow(state, **updates):
+        return _legacy_update(state, **updates) if legacy else updates
+
+    async def generate(state):
+        return {"joke_flow": flow(state, draft="draft 1", style_hint="deadpan", attempts=1, quality=None, final=None)}
+
+    async def check(state):
+        quality = "Pass" if state.joke_flow.attempts >= retry_limit else "Fail"
+        return {"joke_flow": flow(state, quality=quality)}
+
+    async def improve(state):
+        attempts = state.joke_flow.attempts + 1
+        return {"joke_flow": flow(state, draft=f"draft {attempts}", attempts=attempts, quality=None)}
+
+    async def finalize(state):
+        return {"final_joke": "final", "joke_flow": flow(state, final="final")}
+
+    def route(state):
+        return "passed" if state.joke_flow.quality == "Pass" else "retry"
+
+    workflow = StateGraph(LegacyState if legacy else State)
+    workflow.add_node("generate_joke", generate)
+    workflow.add_node("check_joke_quality", check)
+    workflow.add_node("improve_joke", improve)
+    workflow.add_node("finalize_joke", finalize)
+    workflow.add_edge(START, "generate_joke")
+    workflow.add_edge("generate_joke", "check_joke_quality")
+    workflow.add_conditional_edges(
+        "check_joke_quality", route, {"passed": "finalize_joke", "retry": "improve_joke"}
+    )
+    workflow.add_edge("improve_joke", "check_joke_quality")
+    workflow.add_edge("finalize_joke", END)
+    return workflow.compile()
+
+
+async def _measure(graph, retry_limit: int, concurrent: int, repeats: int) -> dict:
+    # generate, finalize, plus a check for every attempt and an improve for every retry.
+    supersteps = 2 + retry_limit + (retry_limit - 1)
+    await graph.ainvoke({"topic": "warm-up"}, {"recursion_limit": 4 * supersteps})
+
+    async def batch() -> None:
+        await asyncio.gather(*(
+            graph.ainvoke({"topic": f"topic {i}"}, {"recursion_limit": 4 * supersteps})
+            for i in range(concurrent)
+        ))
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await batch()
+    elapsed = time.perf_counter() - started
+    # Allocations are traced in a separate pass: tracemalloc itself dominates timings.
+    tracemalloc.start()
+    await batch()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    total_steps = supersteps * concurrent * repeats
+    return {"us_per_superstep": round(elapsed / total_steps * 1e6, 1), "peak_kib": round(peak / 1024)}
+
+
+def _micro(retry_limit: int, iterations: int) -> dict:
+    """State-update cost alone, outside the graph runtime."""
+    results = {}
+    for name in ("legacy", "reducer"):
+        def run(count: int) -> None:
+            legacy = LegacyState(topic="t")
+            flow = JokeFlowState()
+            for _ in range(count):
+                for attempt in range(1, retry_limit + 1):
+                    if name == "legacy":
+                        legacy.joke_flow = _legacy_update(legacy, draft="d", attempts=attempt, quality=None)
+                        legacy.joke_flow = _legacy_update(legacy, quality="Fail")
+                    else:
+                        flow = merge_joke_flow(flow, {"draft": "d", "attempts": attempt, "quality": None})
+                        flow = merge_joke_flow(flow, {"quality": "Fail"})
+
+        started = time.perf_counter()
+        run(iterations)
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        run(100)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        updates = iterations * retry_limit * 2
+        results[name] = {"us_per_update": round(elapsed / updates * 1e6, 2), "peak_kib": round(peak / 1024)}
+    return results
+
+
+async def main(args: argparse.Namespace) -> None:
+    for retry_limit in args.retry_limits:
+        print(json.dumps({"retry_limit": retry_limit, "micro": _micro(retry_limit, 20_000)}))
+        for concurrent in args.concurrent:
+            row = {"retry_limit": retry_limit, "concurrent_runs": concurrent}
+            for name, legacy in (("legacy", True), ("reducer", False)):
+                row[name] = await _measure(_build(retry_limit, legacy), retry_limit, concurrent, args.repeats)
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--retry-limits", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--concurrent", type=int, nargs="+", default=[1, 50, 200])
+    parser.add_argument("--repeats", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
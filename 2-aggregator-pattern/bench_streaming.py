@@ -0,0 +1,120 @@
+"""Time to first content: `invoke_graph` vs `stream_graph`.
+
+Runs are served by a simulated chat model that streams tokens at a fixed rate
+after a first-token delay, with structured quality checks that pass at a fixed
+rate. For `invoke_graph` the first content is the finished result; for
+`stream_graph` it is the first token from a story, poem or final joke.
+
+    python 2-aggregator-pattern/bench_streaming.py --runs 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from main import invoke_graph, stream_graph
+from utils import nodes
+from utils.rate_limit import AdaptiveConcurrencyLimiter, TokenBucketRateLimiter
+from utils.registry import ModelRegistry
+from utils.state import JokeCandidateScore, JokeCandidateScores, JokeQualityDecision
+
+
+class SimulatedStreamingModel(BaseChatModel):
+    first_token_s: float = 0.3
+    token_interval_s: float = 0.005
+    tokens: int = 120
+    pass_rate: float = 0.35
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated-streaming"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("the benchmark only uses the async API")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.first_token_s + self.tokens * self.token_interval_s)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="word " * self.tokens))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_s)
+        for _ in range(self.tokens):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content="word "))
+            if run_manager:
+                await run_manager.on_llm_new_token("word ", chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self.token_interval_s)
+
+    def with_structured_output(self, schema, **kwargs):
+        async def judge(prompt: Any, config: Optional[dict] = None):
+            await asyncio.sleep(self.first_token_s)
+            result = lambda: "Pass" if random.random() < self.pass_rate else "Fail"
+            if schema is JokeCandidateScores:
+                return JokeCandidateScores(scores=[
+                    JokeCandidateScore(index=i, result=result(), score=random.randint(1, 10))
+                    for i in range(str(prompt).count("\n["))
+                ])
+            return JokeQualityDecision(result=result())
+
+        return RunnableLambda(judge)
+
+
+class NullSink:
+    async def write(self, topic, combined) -> None:
+        return None
+
+
+async def _invoke_first_content(topic: str) -> float:
+    started = time.perf_counter()
+    await invoke_graph(topic)
+    return time.perf_counter() - started
+
+
+async def _stream_first_content(topic: str) -> float:
+    ttfc = None
+    async for event in stream_graph(topic):
+        if event["event"] == "final":
+            ttfc = event["time_to_first_content_s"]
+    return ttfc
+
+
+def _summary(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "p50_s": round(ordered[len(ordered) // 2], 3),
+        "p95_s": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    random.seed(args.seed)
+    model = SimulatedStreamingModel(first_token_s=args.first_token_s, token_interval_s=args.token_interval_s)
+
+    nodes.model_registry = ModelRegistry({"openai": lambda: model, "google": lambda: model})
+    for provider in ("openai", "google"):
+        nodes._rate_limiters[provider] = TokenBucketRateLimiter(requests_per_minute=1e9)
+        nodes._concurrency_limiters[provider] = AdaptiveConcurrencyLimiter(initial_limit=1e6, max_limit=1e6)
+    nodes.configure_output_sink(NullSink())
+
+    results = {}
+    for name, measure in (("invoke_graph", _invoke_first_content), ("stream_graph", _stream_first_content)):
+        samples = await asyncio.gather(*(measure(f"topic {i}") for i in range(args.runs)))
+        results[name] = _summary(samples)
+    print(json.dumps({"runs": args.runs, "time_to_first_content": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--first-token-s", type=float, default=0.3)
+    parser.add_argument("--token-interval-s", type=float, default=0.005)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
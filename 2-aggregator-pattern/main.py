@@ -2,7 +2,12 @@ import anyio
 import fastenv
 import asyncio
 import os
-from typing import Any, Dict
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+# Node updates forwarded by `stream_graph`, mapped to the state field they carry.
+CONTENT_NODES = {"write_story": "story", "compose_poem": "poem", "finalize_joke": "final_joke"}
 
 
 def configure_tracing_defaults() -> None:
@@ -18,15 +23,81 @@ async def invoke_graph(topic: str) -> Dict[str, Any]:
     # Import lazily so configuration above happens first in CLI runs.
     from agent import aggregator_app
 
-    # TODO: async call to draw graph
-    aggregator_app.get_graph().draw_mermaid_png(
-        output_file_path="2-aggregator-pattern/compiled_graph.png"
-    )
     return await aggregator_app.ainvoke({"topic": topic})
 
 
+async def stream_graph(topic: str) -> AsyncIterator[Dict[str, Any]]:
+    """Stream a run for one topic as events, each as soon as it is available.
+
+    Events are ``{"event": "token", "node", "text"}`` for model output chunks
+    from content nodes, ``{"event": "content", "node", "field", "text"}`` when
+    a branch finishes, and finally ``{"event": "final", "result"}`` with the
+    combined payload of ``aggregate_answers``. Every event carries
+    ``elapsed_s`` since the run started; the first ``time_to_first_content_s``
+    is attached to the final event. Internal joke drafts and quality checks
+    are not forwarded.
+    """
+    from agent import aggregator_app
+
+    started = time.perf_counter()
+    first_content: Optional[float] = None
+    async for mode, payload in aggregator_app.astream(
+        {"topic": topic}, stream_mode=["updates", "messages", "custom"]
+    ):
+        elapsed = time.perf_counter() - started
+        if mode == "messages":
+            chunk, metadata = payload
+            node = metadata.get("langgraph_node")
+            text = str(chunk.text)
+            if node not in CONTENT_NODES or not text:
+                continue
+            event = {"event": "token", "node": node, "text": text}
+        elif mode == "custom":
+            if "aggregate_answers" in payload:
+                yield {
+                    "event": "final",
+                    "result": payload["aggregate_answers"],
+                    "elapsed_s": elapsed,
+                    "time_to_first_content_s": first_content,
+                }
+            continue
+        else:
+            (node, update), = payload.items()
+            if node not in CONTENT_NODES or not update:
+                continue
+            field = CONTENT_NODES[node]
+            event = {"event": "content", "node": node, "field": field, "text": update[field]}
+        if first_content is None:
+            first_content = elapsed
+        yield {**event, "elapsed_s": elapsed}
+
+
+async def print_stream(topic: str) -> None:
+    """Print streamed chunks per branch as they arrive."""
+    async for event in stream_graph(topic):
+        if event["event"] == "token":
+            print(f"[{event['node']}] {event['text']}", flush=True)
+        elif event["event"] == "final":
+            print(f"time to first content: {event['time_to_first_content_s']:.2f}s", flush=True)
+
+
+async def render_graph(output_file_path: Optional[str] = None) -> bytes:
+    """Render the compiled graph as PNG on demand, off the event loop."""
+    from agent import aggregator_app
+
+    return await asyncio.to_thread(
+        aggregator_app.get_graph().draw_mermaid_png,
+        output_file_path=output_file_path,
+    )
+
+
 if __name__ == "__main__":
     anyio.run(load_env_async)
     configure_tracing_defaults()
     topic = input("Enter a joke topic: ").strip()
-    result = asyncio.run(invoke_graph(topic))
+    if "--stream" in sys.argv:
+        asyncio.run(print_stream(topic))
+    else:
+        result = asyncio.run(invoke_graph(topic))
+    if "--render-graph" in sys.argv:
+        asyncio.run(render_graph("2-aggregator-pattern/compiled_graph.png"))
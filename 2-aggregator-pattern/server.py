@@ -0,0 +1,169 @@
+"""Long-running HTTP entry point serving many topics concurrently.
+
+The graph is compiled once at startup and every request runs `ainvoke` on the
+same event loop, so all runs share the per-provider limiters in `utils.nodes`.
+
+    python 2-aggregator-pattern/server.py --port 8080
+
+Endpoints:
+    POST /topics      {"topics": ["cats", "dogs"]} or {"topic": "cats"}
+    POST /stream      {"topic": "cats"}, answered with NDJSON events from `stream_graph`
+    GET  /graph.png   graph rendered on first request, then served from memory
+    GET  /metrics     per-provider concurrency limits, router health and hedging counters
+    GET  /healthz
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+from typing import Any, AsyncGenerator, Dict, Optional, Tuple, Union
+
+from main import configure_tracing_defaults, load_env_async, render_graph, stream_graph
+
+logger = logging.getLogger(__name__)
+
+Body = Union[bytes, AsyncGenerator[bytes, None]]
+
+
+def _to_json(payload: Any) -> bytes:
+    # Graph results hold pydantic models such as JokeFlowState.
+    return json.dumps(payload, default=lambda o: o.model_dump() if hasattr(o, "model_dump") else str(o)).encode()
+
+
+class AggregatorServer:
+    """Minimal asyncio HTTP/1.1 server around the compiled aggregator graph."""
+
+    def __init__(self, max_concurrent_runs: int = 64, max_body_bytes: int = 1 << 20):
+        # Imported here so the environment is loaded before the models are built.
+        from agent import aggregator_app
+        from utils.nodes import limiter_metrics, router_metrics
+
+        self._app = aggregator_app
+        self._limiter_metrics = limiter_metrics
+        self._router_metrics = router_metrics
+        self._runs = asyncio.Semaphore(max_concurrent_runs)
+        self._max_body_bytes = max_body_bytes
+        self._graph_png: Optional[bytes] = None
+        self._graph_lock = asyncio.Lock()
+
+    async def run_topic(self, topic: str) -> Dict[str, Any]:
+        async with self._runs:
+            try:
+                return {"topic": topic, "result": await self._app.ainvoke({"topic": topic})}
+            except Exception as e:
+                logger.exception("Run failed for topic %r", topic)
+                return {"topic": topic, "error": f"{type(e).__name__}: {e}"}
+
+    async def stream_topic(self, topic: str) -> AsyncGenerator[bytes, None]:
+        async with self._runs:
+            try:
+                async for event in stream_graph(topic):
+                    yield _to_json(event) + b"\n"
+            except Exception as e:
+                logger.exception("Streamed run failed for topic %r", topic)
+                yield _to_json({"event": "error", "error": f"{type(e).__name__}: {e}"}) + b"\n"
+
+    async def graph_png(self) -> bytes:
+        async with self._graph_lock:
+            if self._graph_png is None:
+                self._graph_png = await render_graph()
+        return self._graph_png
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[HTTPStatus, str, Body]:
+        if method == "GET" and path == "/healthz":
+            return HTTPStatus.OK, "text/plain", b"ok"
+        if method == "GET" and path == "/metrics":
+            return HTTPStatus.OK, "application/json", _to_json(
+                {"limiters": self._limiter_metrics(), "router": self._router_metrics()}
+            )
+        if method == "GET" and path == "/graph.png":
+            return HTTPStatus.OK, "image/png", await self.graph_png()
+        if method == "POST" and path == "/topics":
+            try:
+                payload = json.loads(body or b"{}")
+                topics = payload["topics"] if "topics" in payload else [payload["topic"]]
+            except (ValueError, KeyError, TypeError):
+                return HTTPStatus.BAD_REQUEST, "text/plain", b'expected {"topics": [...]} or {"topic": "..."}'
+            results = await asyncio.gather(*(self.run_topic(str(topic)) for topic in topics))
+            return HTTPStatus.OK, "application/json", _to_json(results)
+        if method == "POST" and path == "/stream":
+            try:
+                topic = json.loads(body or b"{}")["topic"]
+            except (ValueError, KeyError, TypeError):
+                return HTTPStatus.BAD_REQUEST, "text/plain", b'expected {"topic": "..."}'
+            return HTTPStatus.OK, "application/x-ndjson", self.stream_topic(str(topic))
+        return HTTPStatus.NOT_FOUND, "text/plain", b"not found"
+
+    async def _respond(self, reader: asyncio.StreamReader) -> Optional[Tuple[HTTPStatus, str, Body]]:
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            if len(request_line) < 2:
+                return None
+            method, path = request_line[0].upper(), request_line[1].split("?", 1)[0]
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length > self._max_body_bytes:
+                return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "text/plain", b"body too large"
+            body = await reader.readexactly(length) if length else b""
+            return await self._route(method, path, body)
+        except Exception as e:
+            logger.exception("Request handling failed")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, "text/plain", str(e).encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            response = await self._respond(reader)
+            if response is None:
+                return
+            status, content_type, body = response
+            head = f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {content_type}\r\n"
+            if isinstance(body, bytes):
+                writer.write(
+                    f"{head}Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+                return
+            # Streamed bodies are delimited by closing the connection.
+            writer.write(f"{head}Cache-Control: no-cache\r\nConnection: close\r\n\r\n".encode("latin-1"))
+            try:
+                async for chunk in body:
+                    writer.write(chunk)
+                    await writer.drain()
+            finally:
+                # Releases the run slot even if the client went away mid-stream.
+                await body.aclose()
+        finally:
+            writer.close()
+
+
+async def serve(host: str, port: int, max_concurrent_runs: int) -> None:
+    await load_env_async()
+    configure_tracing_defaults()
+    server = AggregatorServer(max_concurrent_runs=max_concurrent_runs)
+    from utils.nodes import warm_up_models
+
+    logger.info("Model warm-up: %s", await warm_up_models())
+    listener = await asyncio.start_server(server.handle, host, port)
+    logger.info("Serving aggregator graph on http://%s:%s", host, port)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        from common.transport import aclose_clients
+
+        await aclose_clients()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrent-runs", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.max_concurrent_runs))
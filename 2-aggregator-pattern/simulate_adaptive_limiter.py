@@ -0,0 +1,138 @@
+"""Simulated-provider harness for the adaptive concurrency limiter.
+
+A fake provider serves requests with a base latency that grows once more than
+`capacity` calls are in flight, and answers 429 with a Retry-After header when
+it is overloaded or during an incident. Three scenarios are checked:
+
+1. healthy: the limit climbs from its initial value towards the capacity.
+2. incident: 429s cut the limit and no call is sent while Retry-After holds.
+3. mixed: short and 15x longer calls share a healthy provider; each kind is
+   compared with its own latency baseline, so the long ones do not cut the
+   limit.
+
+    python 2-aggregator-pattern/simulate_adaptive_limiter.py
+"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from utils.rate_limit import AdaptiveConcurrencyLimiter
+
+
+class SimulatedProviderError(Exception):
+    """Shaped like the OpenAI SDK's APIStatusError: status code plus response headers."""
+
+    def __init__(self, status_code: int, retry_after: float):
+        super().__init__(f"simulated HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(
+            status_code=status_code, headers={"Retry-After": str(retry_after)}
+        )
+
+
+class SimulatedProvider:
+    def __init__(self, capacity: int, base_latency: float = 0.02, retry_after: float = 0.2):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.incident = False
+        self.call_times = []
+
+    async def call(self, length: float = 1.0) -> str:
+        self.call_times.append(time.monotonic())
+        self.in_flight += 1
+        try:
+            if self.incident or self.in_flight > 2 * self.capacity:
+                await asyncio.sleep(self.base_latency / 4)
+                raise SimulatedProviderError(429, self.retry_after)
+            # Queueing: latency grows linearly once the provider is saturated.
+            await asyncio.sleep(length * self.base_latency * max(1.0, self.in_flight / self.capacity))
+            return "ok"
+        finally:
+            self.in_flight -= 1
+
+
+async def _drive(limiter, provider, duration: float, clients: int, kinds=(("", 1.0),)):
+    """Keep `clients` callers busy for `duration` seconds, sampling the limit.
+
+    Clients take turns at the (key, relative length) call kinds in `kinds`.
+    """
+    stop_at = time.monotonic() + duration
+    samples = []
+
+    async def client(key: str, length: float) -> None:
+        while time.monotonic() < stop_at:
+            try:
+                async with limiter.slot(key):
+                    await provider.call(length)
+            except SimulatedProviderError:
+                pass
+
+    async def sampler() -> None:
+        while time.monotonic() < stop_at:
+            samples.append(limiter.limit)
+            await asyncio.sleep(0.05)
+
+    await asyncio.gather(sampler(), *(client(*kinds[i % len(kinds)]) for i in range(clients)))
+    return samples
+
+
+async def healthy_scenario() -> dict:
+    # Never overloaded: 429s start above 2 * capacity, beyond the limiter's max.
+    provider = SimulatedProvider(capacity=40)
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=64)
+    samples = await _drive(limiter, provider, duration=3.0, clients=64)
+    assert samples[-1] > 16, f"limit did not grow on a healthy provider: {samples[-1]:.1f}"
+    assert limiter.throttled == 0, "healthy provider should never throttle"
+    return {"start_limit": samples[0], "end_limit": round(samples[-1], 2), **limiter.metrics()}
+
+
+async def incident_scenario() -> dict:
+    provider = SimulatedProvider(capacity=16, retry_after=0.3)
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, max_limit=64)
+
+    async def incident() -> None:
+        await asyncio.sleep(1.0)
+        provider.incident = True
+        await asyncio.sleep(0.5)
+        provider.incident = False
+
+    samples, _ = await asyncio.gather(
+        _drive(limiter, provider, duration=3.0, clients=64), incident()
+    )
+    assert limiter.throttled > 0, "the incident should produce 429s"
+    assert min(samples) < 16 / 2 + 1, f"limit did not back off: min {min(samples):.1f}"
+
+    # Retry-After: after the first 429, calls should stop for ~retry_after seconds.
+    gaps = [b - a for a, b in zip(provider.call_times, provider.call_times[1:])]
+    longest_pause = max(gaps)
+    assert longest_pause >= provider.retry_after * 0.9, f"Retry-After ignored: {longest_pause:.3f}s"
+    return {
+        "min_limit": round(min(samples), 2),
+        "end_limit": round(samples[-1], 2),
+        "longest_pause_s": round(longest_pause, 3),
+        **limiter.metrics(),
+    }
+
+
+async def mixed_scenario() -> dict:
+    provider = SimulatedProvider(capacity=40)
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=32)
+    samples = await _drive(limiter, provider, duration=3.0, clients=32, kinds=(("judge", 1.0), ("story", 15.0)))
+    assert limiter.throttled == 0, "healthy provider should never throttle"
+    assert samples[-1] > 16, f"long calls cut the limit of a healthy provider: {samples[-1]:.1f}"
+    return {"start_limit": samples[0], "end_limit": round(samples[-1], 2), **limiter.metrics()}
+
+
+async def main() -> None:
+    print(json.dumps({"healthy": await healthy_scenario()}, indent=2))
+    print(json.dumps({"incident": await incident_scenario()}, indent=2))
+    print(json.dumps({"mixed": await mixed_scenario()}, indent=2))
+    print("adaptive limiter scenarios passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""Simulated-provider harness for the model router.
+
+Three scenarios are checked against fake providers:
+
+1. slow tail: the primary provider occasionally stalls; hedging to the second
+   provider after the primary's p95 must cut the p99 latency while firing
+   hedges for only a small share of calls.
+2. outage: the primary provider fails every call; every call must still
+   succeed through failover, and the primary must be skipped after a few
+   consecutive failures.
+3. rejected requests: the primary answers every call with a 400; calls fail
+   over, but a client error never puts the primary on cooldown.
+
+    python 2-aggregator-pattern/simulate_router.py
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import Optional
+
+from utils.router import ModelRouter, Route
+
+
+class SimulatedStatusError(Exception):
+    """Shaped like the OpenAI SDK's APIStatusError."""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"simulated HTTP {status_code}")
+        self.status_code = status_code
+
+
+class SimulatedProvider:
+    def __init__(self, latency: float, stall_rate: float = 0.0, stall: float = 1.0, failing: Optional[int] = None):
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.failing = failing
+        self.calls = 0
+
+    async def call(self, prompt: str) -> str:
+        self.calls += 1
+        if self.failing:
+            await asyncio.sleep(self.latency / 4)
+            raise SimulatedStatusError(self.failing)
+        stalled = random.random() < self.stall_rate
+        await asyncio.sleep(self.stall if stalled else self.latency * random.uniform(0.8, 1.2))
+        return prompt
+
+
+def _router(providers: dict, hedge: bool) -> ModelRouter:
+    async def call(provider: str, prompt: str):
+        return await providers[provider].call(prompt)
+
+    return ModelRouter(
+        routes={"task": Route(["primary", "secondary"], hedge=hedge)},
+        call=call,
+        initial_hedge_delay=0.5,
+        cooldown=5.0,
+    )
+
+
+async def _latencies(router: ModelRouter, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await router.ainvoke("task", f"prompt {i}")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    ordered = sorted(latencies)
+    return ordered[len(ordered) // 2], ordered[int(0.99 * (len(ordered) - 1))]
+
+
+async def slow_tail_scenario() -> dict:
+    results = {}
+    for hedge in (False, True):
+        random.seed(7)
+        providers = {
+            "primary": SimulatedProvider(latency=0.05, stall_rate=0.04, stall=1.0),
+            "secondary": SimulatedProvider(latency=0.06),
+        }
+        router = _router(providers, hedge)
+        p50, p99 = await _latencies(router, calls=1000, concurrency=50)
+        results["hedged" if hedge else "unhedged"] = {
+            "p50_s": round(p50, 3),
+            "p99_s": round(p99, 3),
+            "hedges_fired": router.hedges_fired,
+            "hedges_won": sum(p["hedges_won"] for p in router.metrics()["providers"].values()),
+        }
+    assert results["hedged"]["p99_s"] < results["unhedged"]["p99_s"] / 2, "hedging did not cut the tail"
+    assert results["hedged"]["hedges_fired"] < 1000 * 0.15, "too many hedged calls"
+    # Only a hedge request beating the original counts as a win.
+    assert 0 < results["hedged"]["hedges_won"] <= results["hedged"]["hedges_fired"], "hedge wins miscounted"
+    return results
+
+
+async def outage_scenario() -> dict:
+    providers = {
+        "primary": SimulatedProvider(latency=0.05, failing=503),
+        "secondary": SimulatedProvider(latency=0.05),
+    }
+    router = _router(providers, hedge=True)
+    for i in range(50):
+        assert await router.ainvoke("task", f"prompt {i}") == f"prompt {i}"
+    assert providers["primary"].calls == 3, f"primary not skipped: {providers['primary'].calls} calls"
+    return {"primary_calls": providers["primary"].calls, **router.metrics()}
+
+
+async def rejected_scenario() -> dict:
+    providers = {
+        "primary": SimulatedProvider(latency=0.05, failing=400),
+        "secondary": SimulatedProvider(latency=0.05),
+    }
+    router = _router(providers, hedge=True)
+    for i in range(20):
+        assert await router.ainvoke("task", f"prompt {i}") == f"prompt {i}"
+    assert providers["primary"].calls == 20, f"client errors cooled the primary down: {providers['primary'].calls} calls"
+    return {"primary_calls": providers["primary"].calls, **router.metrics()}
+
+
+async def main() -> None:
+    print(json.dumps({"slow_tail": await slow_tail_scenario()}, indent=2))
+    print(json.dumps({"outage": await outage_scenario()}, indent=2))
+    print(json.dumps({"rejected": await rejected_scenario()}, indent=2))
+    print("router scenarios passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
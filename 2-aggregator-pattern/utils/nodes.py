@@ -1,76 +1,115 @@
 import asyncio
+import logging
 import random
-import time
-from collections import deque
-from typing import Any, Dict
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-import aiofiles
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
+from langgraph.config import get_stream_writer
 
+# Repository root, for the transport shared by all agents. Inserted first so
+# this checkout's `common` wins over any installed package of that name.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.transport import openai_http_clients
+from utils.rate_limit import (
+    AdaptiveConcurrencyLimiter,
+    TokenBucketRateLimiter,
+    estimate_tokens,
+    used_tokens,
+)
+from utils.registry import ModelRegistry, warm_google, warm_openai
+from utils.router import ModelRouter, Route, current_task
+from utils.sinks import OutputSink, sink_from_env
 from utils.state import (
+    JOKE_CANDIDATES,
     JOKE_RETRY_LIMIT,
-    JokeFlowState,
+    JokeCandidateScores,
     JokeQualityDecision,
     State,
 )
 
+logger = logging.getLogger(__name__)
+
+JOKE_STYLES = ["deadpan", "absurdist", "wordplay-heavy", "self-aware stand-up routine", "wholesome storytelling"]
+
 
 # Generic functions
-class AsyncRateLimiter:
-    """Simple async-friendly rate limiter supporting burst control."""
-
-    def __init__(self, max_calls: int, period_seconds: float):
-        self._max_calls = max_calls
-        self._period = period_seconds
-        self._timestamps: deque[float] = deque()
-        self._lock = asyncio.Lock()
-
-    async def __aenter__(self):
-        await self.acquire()
-        return self
-
-    async def __aexit__(self, *exc_info):
-        return False
-
-    async def acquire(self) -> None:
-        while True:
-            async with self._lock:
-                now = time.monotonic()
-                while self._timestamps and now - self._timestamps[0] >= self._period:
-                    self._timestamps.popleft()
-                if len(self._timestamps) < self._max_calls:
-                    self._timestamps.append(now)
-                    return
-                wait_time = self._period - (now - self._timestamps[0])
-            await asyncio.sleep(max(wait_time, 0.0))
-
-
-_model_cache: Dict[str, Any] = {}
-_model_lock = asyncio.Lock()
+# SDK retries are off: a 429 or 5xx must reach the limiters below, which back
+# off on it and honour Retry-After, instead of being retried out of their sight.
+model_registry = ModelRegistry(
+    factories={
+        "openai": lambda: ChatOpenAI(model="gpt-4.1", temperature=0.9, max_retries=0, **openai_http_clients()),
+        "google": lambda: ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0.8, max_retries=0),
+    },
+    warmers={"openai": warm_openai, "google": warm_google},
+)
 _rate_limiters = {
-    "openai": AsyncRateLimiter(max_calls=3, period_seconds=1),
-    "google": AsyncRateLimiter(max_calls=3, period_seconds=1),
+    "openai": TokenBucketRateLimiter(requests_per_minute=180, tokens_per_minute=30_000),
+    "google": TokenBucketRateLimiter(requests_per_minute=180, tokens_per_minute=250_000),
+}
+# Calls in flight per provider, adapted to 429/5xx responses and latency.
+_concurrency_limiters = {
+    "openai": AdaptiveConcurrencyLimiter(initial_limit=3, max_limit=32),
+    "google": AdaptiveConcurrencyLimiter(initial_limit=3, max_limit=32),
 }
 
 
-async def _get_model(provider: str):
-    """Create or return the cached chat model for a provider."""
-    async with _model_lock:
-        cached = _model_cache.get(provider)
-        if cached is not None:
-            return cached
-        if provider == "openai":
-            model = ChatOpenAI(model="gpt-4.1", temperature=0.9)
-        elif provider == "google":
-            model = ChatGoogleGenerativeAI(
-                model="gemini-2.5-flash-lite",
-                temperature=0.8,
-            )
-        else:
-            raise ValueError(f"Unsupported model provider: {provider}")
-        _model_cache[provider] = model
-        return model
+_output_sink: Optional[OutputSink] = None
+
+
+def configure_output_sink(sink: OutputSink) -> None:
+    """Send the combined output of every following run to ``sink``."""
+    global _output_sink
+    _output_sink = sink
+
+
+def limiter_metrics() -> Dict[str, Dict[str, Any]]:
+    """Current concurrency limit and outcome counters for each provider."""
+    return {provider: limiter.metrics() for provider, limiter in _concurrency_limiters.items()}
+
+
+def router_metrics() -> Dict[str, Any]:
+    """Hedging, failover and latency statistics of the model router."""
+    return _router.metrics()
+
+
+async def warm_up_models(timeout: float = 10.0) -> Dict[str, Dict[str, Any]]:
+    """Build every chat model and open its connections before serving requests."""
+    return await model_registry.warm_up(timeout)
+
+
+async def _invoke(provider: str, llm: Any, prompt: str) -> Any:
+    """Call the model within the provider's rate budgets and adaptive concurrency limit."""
+    estimate = estimate_tokens(prompt)
+    async with _rate_limiters[provider].reserve(estimate) as reservation:
+        # Latency is judged against the task's own baseline: a story takes far longer than a judgement.
+        async with _concurrency_limiters[provider].slot(current_task.get()):
+            response = await llm.ainvoke(prompt)
+        reservation.reconcile(used_tokens(response, estimate))
+    return response
+
+
+async def _call_provider(provider: str, prompt: str, schema: Optional[type] = None) -> Any:
+    llm = model_registry.get(provider)
+    if schema is not None:
+        llm = llm.with_structured_output(schema)
+    return await _invoke(provider, llm, prompt)
+
+
+# Ordered providers per task. Streamed content tasks fail over but do not hedge.
+_router = ModelRouter(
+    routes={
+        "joke_draft": Route(["openai", "google"]),
+        "joke_judge": Route(["google", "openai"]),
+        "joke_improve": Route(["google", "openai"]),
+        "joke_finalize": Route(["openai", "google"], hedge=False),
+        "story": Route(["openai", "google"], hedge=False),
+        "poem": Route(["google", "openai"], hedge=False),
+    },
+    call=_call_provider,
+)
 
 
 async def _extract_text(response: Any) -> str:
@@ -85,34 +124,29 @@ async def _extract_text(response: Any) -> str:
     return str(content).strip()
 
 
-def _next_joke_flow(state: State, **updates: Any) -> JokeFlowState:
-    """Return a new joke flow state merging the provided updates."""
-    current = state.joke_flow.model_copy(deep=True)
-    return current.model_copy(update=updates)
-
 # Flow 1: Joke workflow nodes
-async def generate_joke(state: State) -> Dict[str, Any]:
-    """Create the first version of a joke."""
-    llm = await _get_model("openai")
-    style = random.choice(["deadpan", "absurdist", "wordplay-heavy", "self-aware stand-up routine", "wholesome storytelling"])
-    prompt = (
+def _joke_prompt(topic: str, style: str) -> str:
+    return (
         "Invent a brand-new joke that has not been told before. "
-        f"Topic: {state.topic}. Work in a {style} style and avoid any known "
+        f"Topic: {topic}. Work in a {style} style and avoid any known "
         "classics such as 'cat on the computer' or 'keeping an eye on the mouse'. "
         "Keep it to 2-3 sentences."
     )
-    async with _rate_limiters["openai"]:
-        response = await llm.ainvoke(prompt)
+
+
+async def generate_joke(state: State) -> Dict[str, Any]:
+    """Create the first version of a joke."""
+    style = random.choice(JOKE_STYLES)
+    response = await _router.ainvoke("joke_draft", _joke_prompt(state.topic, style))
     joke_text = await _extract_text(response)
     return {
-        "joke_flow": _next_joke_flow(
-            state,
-            draft=joke_text,
-            style_hint=style,
-            attempts=1,
-            quality=None,
-            final=None,
-        )
+        "joke_flow": {
+            "draft": joke_text,
+            "style_hint": style,
+            "attempts": 1,
+            "quality": None,
+            "final": None,
+        }
     }
 
 
@@ -120,25 +154,18 @@ async def check_joke_quality(state: State) -> Dict[str, Any]:
     """Decide whether the initial joke passes the funniness threshold."""
     if state.joke_flow.draft is None:
         raise ValueError("No joke is available to evaluate.")
-    llm = (await _get_model("google")).with_structured_output(JokeQualityDecision)
     prompt = (
         "Evaluate the joke below. Respond with result='Pass' if it's funny enough, "
         "otherwise use result='Fail'. Joke: "
         f"{state.joke_flow.draft}"
     )
-    async with _rate_limiters["google"]:
-        assessment = await llm.ainvoke(prompt)
+    assessment = await _router.ainvoke("joke_judge", prompt, JokeQualityDecision)
     decision = getattr(assessment, "result", None)
     if decision is None and isinstance(assessment, dict):
         decision = assessment.get("result")
     if decision not in {"Pass", "Fail"}:
         raise ValueError(f"Unexpected evaluation response: {assessment!r}")
-    return {
-        "joke_flow": _next_joke_flow(
-            state,
-            quality=decision,
-        )
-    }
+    return {"joke_flow": {"quality": decision}}
 
 
 async def route_joke_quality(state: State) -> str:
@@ -155,24 +182,97 @@ async def improve_joke(state: State) -> Dict[str, Any]:
     if state.joke_flow.draft is None:
         raise ValueError("No joke is available to improve.")
     if state.joke_flow.attempts >= JOKE_RETRY_LIMIT:
-        return {"joke_flow": state.joke_flow}
-    llm = await _get_model("google")
+        return {}
     prompt = (
         "Punch up the following joke with clever wordplay while keeping it concise. "
         "Preserve the core premise but change the structure so it feels fresh. "
         f"Target style: {state.joke_flow.style_hint or 'surprising and playful'}. "
         f"Joke: {state.joke_flow.draft}"
     )
-    async with _rate_limiters["google"]:
-        response = await llm.ainvoke(prompt)
+    response = await _router.ainvoke("joke_improve", prompt)
     improved_text = await _extract_text(response)
     return {
-        "joke_flow": _next_joke_flow(
-            state,
-            draft=improved_text,
-            attempts=state.joke_flow.attempts + 1,
-            quality=None,
-        )
+        "joke_flow": {
+            "draft": improved_text,
+            "attempts": state.joke_flow.attempts + 1,
+            "quality": None,
+        }
+    }
+
+
+async def _draft_candidate(topic: str, style: str) -> Tuple[str, str]:
+    response = await _router.ainvoke("joke_draft", _joke_prompt(topic, style))
+    return style, await _extract_text(response)
+
+
+async def _score_candidates(topic: str, candidates: List[Tuple[str, str]]) -> List[Tuple[int, str]]:
+    """Score a batch of candidate jokes in one structured-output call; returns (score, result) per candidate."""
+    listing = "\n".join(f"[{i}] {text}" for i, (_, text) in enumerate(candidates))
+    prompt = (
+        f"Evaluate each candidate joke about {topic} below. For every candidate, return its "
+        "index, a score from 1 to 10 for how funny it is, and result='Pass' if it's funny "
+        "enough, otherwise result='Fail'.\n"
+        f"{listing}"
+    )
+    assessment = await _router.ainvoke("joke_judge", prompt, JokeCandidateScores)
+    if isinstance(assessment, dict):
+        assessment = JokeCandidateScores.model_validate(assessment)
+    # Candidates the model skipped count as failed with the lowest score.
+    scored = [(0, "Fail")] * len(candidates)
+    for item in assessment.scores:
+        if 0 <= item.index < len(candidates):
+            scored[item.index] = (item.score, item.result)
+    return scored
+
+
+async def speculate_joke(state: State) -> Dict[str, Any]:
+    """Draft JOKE_CANDIDATES styled jokes in parallel and keep the best-scored one.
+
+    Drafts that finish while a scoring call is in flight are scored together in
+    the next call. As soon as one candidate passes, the drafts still running
+    are cancelled; if none passes, the highest score advances to finalize.
+    """
+    styles = random.sample(JOKE_STYLES, k=len(JOKE_STYLES))
+    pending = {
+        asyncio.create_task(_draft_candidate(state.topic, styles[i % len(styles)]))
+        for i in range(JOKE_CANDIDATES)
+    }
+    best: Optional[Tuple[str, int, str, str]] = None
+    scored = 0
+    errors: List[BaseException] = []
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            batch = []
+            for task in done:
+                if task.exception() is not None:
+                    logger.warning("Joke candidate failed: %r", task.exception())
+                    errors.append(task.exception())
+                else:
+                    batch.append(task.result())
+            if not batch:
+                continue
+            scored += len(batch)
+            for (style, text), (score, result) in zip(batch, await _score_candidates(state.topic, batch)):
+                if best is None or (result == "Pass", score) > (best[0] == "Pass", best[1]):
+                    best = (result, score, style, text)
+            if best[0] == "Pass":
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    if best is None:
+        raise errors[0] if errors else ValueError("No joke candidates were generated.")
+    quality, _, style, text = best
+    return {
+        "joke_flow": {
+            "draft": text,
+            "style_hint": style,
+            "attempts": scored,
+            "quality": quality,
+            "final": None,
+        }
     }
 
 
@@ -180,52 +280,42 @@ async def finalize_joke(state: State) -> Dict[str, Any]:
     setup = state.joke_flow.draft
     if setup is None:
         raise ValueError("No joke is available to finalize.")
-    llm = await _get_model("openai")
     prompt = (
         "Provide the final version of this joke. Retain the core idea but add a "
         f"surprising twist. Style guide: {state.joke_flow.style_hint or 'inventive'}. "
         f"Draft: {setup}"
     )
-    async with _rate_limiters["openai"]:
-        response = await llm.ainvoke(prompt)
+    response = await _router.ainvoke("joke_finalize", prompt)
     final_text = await _extract_text(response)
-    updated_flow = _next_joke_flow(
-        state,
-        final=final_text,
-    )
-    return {"final_joke": final_text, "joke_flow": updated_flow}
+    return {"final_joke": final_text, "joke_flow": {"final": final_text}}
 
 # Flow 2: Story workflow nodes
 async def write_story(state: State) -> Dict[str, str]:
     if state.topic is None:
         raise ValueError("No topic is available to write a story about.")
-    llm = await _get_model("openai")
     prompt = (
         "Write a short story based on the following topic. Make it engaging "
         "and imaginative. Topic: "
         f"{state.topic}"
     )
-    async with _rate_limiters["openai"]:
-        response = await llm.ainvoke(prompt)
+    response = await _router.ainvoke("story", prompt)
     return {"story": await _extract_text(response)}
 
 # Flow 3: Poem workflow nodes
 async def compose_poem(state: State) -> Dict[str, str]:
     if state.topic is None:
         raise ValueError("No topic is available to compose a poem about.")
-    llm = await _get_model("google")
     prompt = (
         "Compose a short poem inspired by the following topic. Use vivid imagery "
         "and rhythmic language. Topic: "
         f"{state.topic}"
     )
-    async with _rate_limiters["google"]:
-        response = await llm.ainvoke(prompt)
+    response = await _router.ainvoke("poem", prompt)
     return {"poem": await _extract_text(response)}
 
 # Aggregator node
 async def aggregate_answers(state: State) -> Dict[str, Any]:
-    """Combine outputs from multiple flows into a single payload and save to a markdown file in async manner."""
+    """Combine outputs from multiple flows into a single payload and hand it to the output sink in one write."""
     combined = {
         "joke": state.final_joke or state.joke_flow.final or state.joke_flow.draft,
         "story": state.story,
@@ -233,9 +323,12 @@ async def aggregate_answers(state: State) -> Dict[str, Any]:
     }
 
     combined = {k: v for k, v in combined.items() if v is not None}
-    # Save to markdown file
-    async with aiofiles.open("2-aggregator-pattern/output.md", "w") as f:
-        await f.write(f"# Aggregated Creations for `{state.topic}`\n\n")
-        for key, value in combined.items():
-            await f.write(f"## {key.title()}\n\n{value}\n\n")
+    global _output_sink
+    if _output_sink is None:
+        # Built lazily so that environment loaded by the entry point is honoured.
+        _output_sink = sink_from_env()
+    await _output_sink.write(state.topic, combined)
+    # "joke" is not a State field, so streamed updates would drop it; the
+    # whole payload goes to stream_mode="custom" listeners instead.
+    get_stream_writer()({"aggregate_answers": combined})
     return combined
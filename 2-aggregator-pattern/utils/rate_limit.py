@@ -0,0 +1,336 @@
+import asyncio
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Cheap prompt-size estimate (~4 characters per token) used before a call."""
+    return max(len(prompt) // 4, 1)
+
+
+def used_tokens(response: Any, default: int) -> int:
+    """Total tokens reported by a chat model response, or ``default`` if unknown."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens", default)
+
+
+class _Reservation:
+    """Budget taken for one call; ``reconcile`` settles it against real usage."""
+
+    def __init__(self, limiter: "TokenBucketRateLimiter", tokens: int):
+        self._limiter = limiter
+        self.tokens = tokens
+
+    async def __aenter__(self) -> "_Reservation":
+        await self._limiter.acquire(self.tokens)
+        return self
+
+    async def __aexit__(self, *exc_info) -> bool:
+        return False
+
+    def reconcile(self, actual_tokens: int) -> None:
+        self._limiter.reconcile(self.tokens, actual_tokens)
+        self.tokens = actual_tokens
+
+
+class TokenBucketRateLimiter:
+    """Async limiter budgeting requests per minute and tokens per minute together.
+
+    Each budget is a token bucket that refills continuously. Waiters are served
+    strictly first-in, first-out and never poll: when the oldest waiter cannot
+    be served yet, one timer is armed for the moment both buckets will hold
+    enough, and it wakes exactly that waiter. Token estimates taken up front are
+    reconciled with the usage the provider reports, so over-estimates are
+    refunded and under-estimates are paid back by later callers.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        request_burst: Optional[float] = None,
+        token_burst: Optional[float] = None,
+    ):
+        self._request_rate = requests_per_minute / 60
+        self._token_rate = (tokens_per_minute or float("inf")) / 60
+        # By default requests burst to one second's worth, like the sliding
+        # window this replaced, so a cold start cannot trip per-second limits.
+        # Token limits are per minute, so a full minute of them may be spent at once.
+        self._request_capacity = request_burst or max(self._request_rate, 1.0)
+        self._token_capacity = token_burst or tokens_per_minute or float("inf")
+        self._requests = self._request_capacity
+        self._tokens = self._token_capacity
+        self._updated: Optional[float] = None
+        self._waiters: Deque[Tuple[asyncio.Future, float]] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def reserve(self, tokens: int = 0) -> _Reservation:
+        """Context manager acquiring one request plus ``tokens`` estimated tokens."""
+        return _Reservation(self, tokens)
+
+    def _refill(self, now: float) -> None:
+        if self._updated is not None:
+            elapsed = now - self._updated
+            self._requests = min(self._request_capacity, self._requests + elapsed * self._request_rate)
+            self._tokens = min(self._token_capacity, self._tokens + elapsed * self._token_rate)
+        self._updated = now
+
+    def _try_take(self, tokens: float) -> bool:
+        if self._requests >= 1 and self._tokens >= tokens:
+            self._requests -= 1
+            self._tokens -= tokens
+            return True
+        return False
+
+    def _wait_time(self, tokens: float) -> float:
+        request_wait = max(1 - self._requests, 0.0) / self._request_rate
+        token_wait = max(tokens - self._tokens, 0.0) / self._token_rate
+        return max(request_wait, token_wait)
+
+    def _wake(self) -> None:
+        """Serve waiters from the head of the queue and re-arm the timer if needed."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        loop = asyncio.get_running_loop()
+        self._refill(loop.time())
+        while self._waiters:
+            future, tokens = self._waiters[0]
+            if future.done():
+                # Cancelled while queued.
+                self._waiters.popleft()
+                continue
+            if not self._try_take(tokens):
+                break
+            self._waiters.popleft()
+            future.set_result(None)
+        if self._waiters:
+            delay = self._wait_time(self._waiters[0][1])
+            self._timer = loop.call_later(delay, self._wake)
+
+    async def acquire(self, tokens: int = 0) -> None:
+        # A request larger than the bucket could never be served; let it drain the bucket instead.
+        tokens = min(tokens, self._token_capacity)
+        loop = asyncio.get_running_loop()
+        self._refill(loop.time())
+        if not self._waiters and self._try_take(tokens):
+            return
+        future = loop.create_future()
+        self._waiters.append((future, tokens))
+        if len(self._waiters) == 1:
+            self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Served just before the cancellation landed: hand the budget back.
+                self._requests = min(self._request_capacity, self._requests + 1)
+                self._tokens = min(self._token_capacity, self._tokens + tokens)
+            self._wake()
+            raise
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Settle an estimate against real usage; the bucket may go into debt."""
+        self._tokens = min(self._token_capacity, self._tokens + estimated_tokens - actual_tokens)
+        if self._waiters and actual_tokens < estimated_tokens:
+            self._wake()
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by a provider SDK error, following ``__cause__`` links."""
+    while exc is not None:
+        for candidate in (exc, getattr(exc, "response", None)):
+            for attr in ("status_code", "code"):
+                value = getattr(candidate, attr, None)
+                if isinstance(value, int):
+                    return int(value)
+        exc = exc.__cause__
+    return None
+
+
+def is_overload_error(exc: BaseException) -> bool:
+    """True for 429 and 5xx responses; client errors say nothing about provider capacity."""
+    status = _status_code(exc)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a ``Retry-After``/``retry-after-ms`` response header, if present."""
+    while exc is not None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if headers:
+            lowered = {str(k).lower(): v for k, v in headers.items()}
+            try:
+                return float(lowered["retry-after-ms"]) / 1000
+            except (KeyError, TypeError, ValueError):
+                pass
+            value = lowered.get("retry-after")
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                pass
+            try:
+                # HTTP-date form.
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+        exc = exc.__cause__
+    return None
+
+
+class _Slot:
+    def __init__(self, limiter: "AdaptiveConcurrencyLimiter", key: str):
+        self._limiter = limiter
+        self._key = key
+        self._started = 0.0
+
+    async def __aenter__(self) -> "_Slot":
+        await self._limiter.acquire()
+        self._started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        latency = time.monotonic() - self._started
+        if exc is None:
+            self._limiter.on_success(latency, self._started, self._key)
+        elif not isinstance(exc, asyncio.CancelledError):
+            self._limiter.on_error(exc, self._started)
+        self._limiter.release()
+        return False
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on the number of calls in flight to one provider.
+
+    The limit grows additively (about ``increase`` per limit's worth of healthy
+    completions) while latency stays within ``latency_tolerance`` times its
+    running baseline, and shrinks multiplicatively on 429/5xx responses or
+    latency spikes. Slow completions still pull the baseline towards them, more
+    gently, so a lasting latency shift becomes the new normal instead of
+    freezing the limit. Each kind of call (``key``, e.g. the task) keeps its own
+    baseline, so a long generation is not mistaken for a slow judge call. A
+    ``Retry-After`` header pauses new calls until it expires.
+    Only calls started after the last decrease can trigger another one, so a
+    burst of errors from one overloaded moment backs off once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        increase: float = 1.0,
+        backoff: float = 0.5,
+        latency_backoff: float = 0.9,
+        latency_tolerance: float = 3.0,
+        slow_baseline_weight: float = 0.01,
+    ):
+        self.limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._increase = increase
+        self._backoff = backoff
+        self._latency_backoff = latency_backoff
+        self._latency_tolerance = latency_tolerance
+        self._slow_baseline_weight = slow_baseline_weight
+        self._baselines: Dict[str, float] = {}
+        self._last_decrease = float("-inf")
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+
+    def slot(self, key: str = "") -> _Slot:
+        """Context manager holding one in-flight slot and recording the call's outcome.
+
+        ``key`` names the kind of call whose latency baseline the outcome is compared with.
+        """
+        return _Slot(self, key)
+
+    def _can_start(self) -> bool:
+        return self._in_flight < int(self.limit) and time.monotonic() >= self._blocked_until
+
+    def _wake(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters and self._can_start():
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._in_flight += 1
+            future.set_result(None)
+        if self._waiters and self._in_flight < int(self.limit):
+            # Only a Retry-After pause can hold waiters back while slots are free.
+            delay = max(self._blocked_until - time.monotonic(), 0.0)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    async def acquire(self) -> None:
+        if not self._waiters and self._can_start():
+            self._in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._wake()
+
+    def _decrease(self, factor: float, started: float) -> None:
+        if started <= self._last_decrease:
+            return
+        self.limit = max(self._min_limit, self.limit * factor)
+        self._last_decrease = time.monotonic()
+
+    def on_success(self, latency: float, started: float, key: str = "") -> None:
+        self.successes += 1
+        baseline = self._baselines.get(key)
+        if baseline is not None and latency > self._latency_tolerance * baseline:
+            self._decrease(self._latency_backoff, started)
+            weight = self._slow_baseline_weight
+            self._baselines[key] = (1 - weight) * baseline + weight * latency
+            return
+        self._baselines[key] = latency if baseline is None else 0.9 * baseline + 0.1 * latency
+        self.limit = min(self._max_limit, self.limit + self._increase / self.limit)
+        self._wake()
+
+    def on_error(self, exc: BaseException, started: float) -> None:
+        if not is_overload_error(exc):
+            self.errors += 1
+            return
+        self.throttled += 1
+        self._decrease(self._backoff, started)
+        retry_after = _retry_after(exc)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self._in_flight,
+            "queued": len(self._waiters),
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "baseline_latency_s": {key: round(baseline, 3) for key, baseline in self._baselines.items()},
+            "paused_for_s": round(max(self._blocked_until - time.monotonic(), 0.0), 3),
+        }
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_openai(model: Any) -> None:
+    """Open a pooled connection with a free ``models.list`` request."""
+    await model.root_async_client.models.list()
+
+
+async def warm_google(model: Any) -> None:
+    """Build the async gRPC client in this event loop and open its channel with a free ``count_tokens``."""
+    from google.ai.generativelanguage_v1beta.types import Content, CountTokensRequest, Part
+
+    request = CountTokensRequest(model=model.model, contents=[Content(role="user", parts=[Part(text="ping")])])
+    await model.async_client.count_tokens(request=request)
+
+
+class ModelRegistry:
+    """Chat models built once per provider and shared by every node.
+
+    Construction is synchronous and the graph runs on one event loop, so a
+    lookup is a plain dict read: no await and no lock, even on a miss. Call
+    ``warm_up`` once at process start to build every model and open its
+    connection pool before the first request arrives.
+    """
+
+    def __init__(
+        self,
+        factories: Dict[str, Callable[[], Any]],
+        warmers: Optional[Dict[str, Callable[[Any], Awaitable[None]]]] = None,
+    ):
+        self._factories = factories
+        self._warmers = warmers or {}
+        self._models: Dict[str, Any] = {}
+
+    def get(self, provider: str) -> Any:
+        model = self._models.get(provider)
+        if model is None:
+            factory = self._factories.get(provider)
+            if factory is None:
+                raise ValueError(f"Unsupported model provider: {provider}")
+            model = self._models[provider] = factory()
+        return model
+
+    async def _warm(self, provider: str, timeout: float) -> Optional[str]:
+        warmer = self._warmers.get(provider)
+        if warmer is None:
+            return None
+        try:
+            await asyncio.wait_for(warmer(self.get(provider)), timeout)
+        except Exception as e:
+            # A cold pool is only slower, so a failed warm-up must not stop startup.
+            logger.warning("Warm-up failed for %s: %r", provider, e)
+            return f"{type(e).__name__}: {e}"
+        return None
+
+    async def warm_up(self, timeout: float = 10.0) -> Dict[str, Dict[str, Any]]:
+        """Build every model, then warm all providers concurrently; returns timings per provider."""
+        report: Dict[str, Dict[str, Any]] = {}
+        for provider in self._factories:
+            started = time.perf_counter()
+            self.get(provider)
+            report[provider] = {"build_s": round(time.perf_counter() - started, 4)}
+
+        async def warm(provider: str) -> None:
+            started = time.perf_counter()
+            error = await self._warm(provider, timeout)
+            report[provider]["warm_s"] = round(time.perf_counter() - started, 4)
+            if error:
+                report[provider]["error"] = error
+
+        await asyncio.gather(*(warm(provider) for provider in self._factories))
+        return report
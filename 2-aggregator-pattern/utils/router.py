@@ -0,0 +1,187 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence
+
+from utils.rate_limit import is_overload_error
+
+
+# Task of the attempt in progress, readable inside ``call`` (e.g. to keep
+# per-task statistics) without widening its signature.
+current_task: ContextVar[str] = ContextVar("current_task", default="")
+
+
+def _provider_fault(exc: BaseException) -> bool:
+    """429, 5xx or a timeout: the provider is struggling, not the request malformed."""
+    while exc is not None:
+        if is_overload_error(exc) or any("Timeout" in cls.__name__ for cls in type(exc).__mro__):
+            return True
+        exc = exc.__cause__
+    return False
+
+
+@dataclass(frozen=True)
+class Route:
+    """Providers to try for one task, in order of preference.
+
+    ``hedge`` allows a second provider to be started when the first is slower
+    than its usual p95. It is off for tasks whose tokens are streamed to
+    clients, where two racing generations would interleave.
+    """
+
+    providers: Sequence[str]
+    hedge: bool = True
+
+
+class ProviderHealth:
+    """Outcome counters and per-task latency samples for one provider."""
+
+    def __init__(self, window: int):
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.unavailable_until = 0.0
+        self.hedges_won = 0
+
+    def quantile(self, task: str, q: float) -> Optional[float]:
+        samples = self.latencies.get(task)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(q * (len(ordered) - 1))]
+
+
+class ModelRouter:
+    """Sends each task to the first available provider on its route.
+
+    A provider that fails ``failure_threshold`` times in a row with a 429, a
+    5xx or a timeout is skipped for ``cooldown`` seconds unless no other
+    provider on the route is available. When a call fails for any reason, the
+    next provider on the route takes over. Only completed calls feed the
+    latency windows. For hedged
+    routes, if the call has not finished after the provider's p95 latency for
+    that task, the next provider is started as well; the first result wins
+    and the other call is cancelled.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, Route],
+        call: Callable[..., Awaitable[Any]],
+        hedge_quantile: float = 0.95,
+        min_samples: int = 20,
+        initial_hedge_delay: float = 10.0,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        window: int = 200,
+    ):
+        self._routes = routes
+        self._call = call
+        self._hedge_quantile = hedge_quantile
+        self._min_samples = min_samples
+        self._initial_hedge_delay = initial_hedge_delay
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._health: Dict[str, ProviderHealth] = defaultdict(lambda: ProviderHealth(window))
+        self.hedges_fired = 0
+
+    def providers_for(self, task: str) -> List[str]:
+        """Providers on the task's route that are not cooling down, in route order."""
+        providers = list(self._routes[task].providers)
+        now = time.monotonic()
+        available = [p for p in providers if self._health[p].unavailable_until <= now]
+        return available or providers
+
+    def hedge_delay(self, task: str, provider: str) -> float:
+        samples = self._health[provider].latencies.get(task, ())
+        if len(samples) < self._min_samples:
+            return self._initial_hedge_delay
+        return self._health[provider].quantile(task, self._hedge_quantile)
+
+    def _record(self, task: str, provider: str, latency: float, error: Optional[BaseException]) -> None:
+        health = self._health[provider]
+        if error is None:
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.latencies[task].append(latency)
+            return
+        health.failures += 1
+        if not _provider_fault(error):
+            # A rejected request or an unparsable structured output is no sign of an outage.
+            return
+        health.consecutive_failures += 1
+        if health.consecutive_failures >= self._failure_threshold:
+            health.unavailable_until = time.monotonic() + self._cooldown
+
+    async def _attempt(self, task: str, provider: str, *args: Any) -> Any:
+        started = time.monotonic()
+        # Each attempt runs in its own asyncio task, so this does not leak to the caller.
+        current_task.set(task)
+        try:
+            result = await self._call(provider, *args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record(task, provider, time.monotonic() - started, e)
+            raise
+        self._record(task, provider, time.monotonic() - started, None)
+        return result
+
+    async def ainvoke(self, task: str, *args: Any) -> Any:
+        """Run ``call(provider, *args)`` for ``task`` with failover and hedging."""
+        queue = self.providers_for(task)
+        hedge = self._routes[task].hedge
+        running: Dict[asyncio.Task, tuple] = {}
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch(is_hedge: bool = False) -> None:
+            provider = queue.pop(0)
+            attempt = asyncio.create_task(self._attempt(task, provider, *args))
+            running[attempt] = (provider, time.monotonic(), is_hedge)
+
+        launch()
+        try:
+            while running:
+                timeout = None
+                if hedge and not hedged and queue and len(running) == 1:
+                    ((provider, launched, _),) = running.values()
+                    timeout = max(0.0, launched + self.hedge_delay(task, provider) - time.monotonic())
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.hedges_fired += 1
+                    launch(is_hedge=True)
+                    continue
+                for finished in done:
+                    provider, _, is_hedge = running.pop(finished)
+                    if finished.exception() is None:
+                        if is_hedge:
+                            self._health[provider].hedges_won += 1
+                        return finished.result()
+                    last_error = finished.exception()
+                if not running and queue:
+                    launch()
+            raise last_error
+        finally:
+            # A cancelled loser's latency is only a lower bound; recording it would make the provider look faster.
+            for loser in running:
+                loser.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        providers = {
+            provider: {
+                "successes": health.successes,
+                "failures": health.failures,
+                "available": health.unavailable_until <= now,
+                "hedges_won": health.hedges_won,
+                "p95_s": {task: round(health.quantile(task, 0.95), 3) for task in health.latencies if health.latencies[task]},
+            }
+            for provider, health in self._health.items()
+        }
+        return {"hedges_fired": self.hedges_fired, "providers": providers}
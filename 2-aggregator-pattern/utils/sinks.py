@@ -0,0 +1,129 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Protocol
+
+import aiofiles
+import aiofiles.os
+
+
+def render_markdown(topic: str, combined: Dict[str, str]) -> str:
+    """Render one run's outputs as the Markdown document written by the file sink."""
+    parts = [f"# Aggregated Creations for `{topic}`\n\n"]
+    for key, value in combined.items():
+        parts.append(f"## {key.title()}\n\n{value}\n\n")
+    return "".join(parts)
+
+
+def _slug(topic: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-")[:48] or "topic"
+
+
+class OutputSink(Protocol):
+    """Destination for the combined output of one graph run."""
+
+    async def write(self, topic: str, combined: Dict[str, str]) -> None: ...
+
+
+class MarkdownFileSink:
+    """One Markdown file per run.
+
+    The document is rendered in memory, written with a single call to a
+    temporary file in the target directory, then renamed into place, so readers
+    never see a partial file and concurrent runs never share one.
+    """
+
+    def __init__(self, directory: Path):
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    async def write(self, topic: str, combined: Dict[str, str]) -> None:
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = self._directory / f"{_slug(topic)}-{run_id}.md"
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        async with aiofiles.open(tmp_path, "w") as f:
+            await f.write(render_markdown(topic, combined))
+        await aiofiles.os.replace(tmp_path, path)
+
+
+class JsonlSink:
+    """Append-only JSONL log with one line per run.
+
+    Renaming a temporary file over a growing log would rewrite it on every run,
+    so each record is instead appended to an ``O_APPEND`` descriptor. A short
+    write is continued until the whole line is out, under a lock so that
+    concurrent runs never interleave inside a line.
+    """
+
+    def __init__(self, path: Path):
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()
+
+    def _append(self, line: bytes) -> None:
+        view = memoryview(line)
+        with self._lock:
+            while view:
+                view = view[os.write(self._fd, view):]
+
+    async def write(self, topic: str, combined: Dict[str, str]) -> None:
+        record = {"topic": topic, "created_at": time.time(), **combined}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        await asyncio.to_thread(self._append, line)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class SQLiteSink:
+    """One row per run in a SQLite table, inserted in a single transaction."""
+
+    def __init__(self, path: Path):
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id TEXT PRIMARY KEY, topic TEXT NOT NULL, created_at REAL NOT NULL, "
+            "outputs TEXT NOT NULL, markdown TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def _insert(self, row: tuple) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?)", row)
+
+    async def write(self, topic: str, combined: Dict[str, str]) -> None:
+        row = (
+            uuid.uuid4().hex,
+            topic,
+            time.time(),
+            json.dumps(combined, ensure_ascii=False),
+            render_markdown(topic, combined),
+        )
+        await asyncio.to_thread(self._insert, row)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def sink_from_env(kind: Optional[str] = None) -> OutputSink:
+    """Build the sink named by ``AGGREGATOR_OUTPUT_SINK`` (markdown, jsonl or sqlite)."""
+    kind = kind or os.getenv("AGGREGATOR_OUTPUT_SINK", "markdown")
+    directory = Path(os.getenv("AGGREGATOR_OUTPUT_DIR", "2-aggregator-pattern/outputs"))
+    if kind == "markdown":
+        return MarkdownFileSink(directory)
+    if kind == "jsonl":
+        return JsonlSink(directory / "runs.jsonl")
+    if kind == "sqlite":
+        return SQLiteSink(directory / "runs.sqlite")
+    raise ValueError(f"Unsupported output sink: {kind}")
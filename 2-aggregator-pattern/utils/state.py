@@ -1,4 +1,4 @@
-from typing import Literal, Optional
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -6,6 +6,8 @@ from pydantic import BaseModel, Field
 JokeQuality = Literal["Pass", "Fail"]
 
 JOKE_RETRY_LIMIT = 3
+# Candidates drafted in parallel by the speculative joke mode.
+JOKE_CANDIDATES = 4
 
 
 class JokeFlowState(BaseModel):
@@ -18,13 +20,39 @@ class JokeFlowState(BaseModel):
     attempts: int = 0
 
 
+def merge_joke_flow(
+    current: Optional[JokeFlowState],
+    update: Union[JokeFlowState, Dict[str, Any]],
+) -> JokeFlowState:
+    """Reducer applying the fields a joke node changed onto the current flow state.
+
+    Nodes return only the fields they touched. Every field is an immutable
+    scalar, so one shallow copy per update is enough; nothing is deep-copied.
+    """
+    if isinstance(update, JokeFlowState):
+        return update
+    if current is None:
+        return JokeFlowState(**update)
+    return current.model_copy(update=update)
+
+
 class State(BaseModel):
     topic: str
     final_joke: Optional[str] = None
     poem: Optional[str] = None
     story: Optional[str] = None
-    joke_flow: JokeFlowState = Field(default_factory=JokeFlowState)
+    joke_flow: Annotated[JokeFlowState, merge_joke_flow] = Field(default_factory=JokeFlowState)
 
 
 class JokeQualityDecision(BaseModel):
     result: JokeQuality
+
+
+class JokeCandidateScore(BaseModel):
+    index: int = Field(description="Position of the candidate in the list that was scored.")
+    result: JokeQuality
+    score: int = Field(ge=1, le=10, description="How funny the candidate is, from 1 to 10.")
+
+
+class JokeCandidateScores(BaseModel):
+    scores: List[JokeCandidateScore]
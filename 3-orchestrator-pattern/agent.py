@@ -0,0 +1,35 @@
+from functools import partial
+from typing import Awaitable, Callable, Optional, Union
+
+from langgraph.graph import START, END, StateGraph
+
+from utils.nodes import assign_workers, plan_tasks, prepare_datasets, render_report, run_worker
+from utils.state import State, WorkerAnswer, WorkerState
+
+
+def _build_workflow(
+    planner: Callable = plan_tasks,
+    answer: Optional[Callable[[WorkerState], Awaitable[Union[str, WorkerAnswer]]]] = None,
+    render_sections: bool = True,
+) -> StateGraph:
+    """Dataset preparation -> planner -> N workers via Send -> report.
+
+    ``planner`` and ``answer`` replace the model-backed planning and task
+    answering, e.g. with simulated ones in benchmarks. With
+    ``render_sections`` false, workers leave rendering to the report node.
+    """
+    workflow = StateGraph(State)
+    workflow.add_node("prepare_datasets", prepare_datasets)
+    workflow.add_node("plan_tasks", planner)
+    workflow.add_node("run_worker", partial(run_worker, answer=answer, render=render_sections))
+    workflow.add_node("render_report", render_report)
+
+    workflow.add_edge(START, "prepare_datasets")
+    workflow.add_edge("prepare_datasets", "plan_tasks")
+    workflow.add_conditional_edges("plan_tasks", assign_workers, ["run_worker", "render_report"])
+    workflow.add_edge("run_worker", "render_report")
+    workflow.add_edge("render_report", END)
+    return workflow
+
+
+orchestrator_app = _build_workflow().compile()
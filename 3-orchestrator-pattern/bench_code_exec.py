@@ -0,0 +1,94 @@
+"""Executions per second of the sandboxed code-execution pool.
+
+Two workloads, a no-op and a group-by over a memory-mapped table of
+`--rows` rows, are run against:
+
+- spawn_per_call: a fresh sandboxed interpreter for every execution
+- pool_inline_data: the pre-forked pool, with the table serialized into every
+  request instead of memory-mapped
+- pool: the pre-forked pool with memory-mapped Arrow datasets
+
+    python 3-orchestrator-pattern/bench_code_exec.py --executions 200 --pool-sizes 1 4 8
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import pyarrow as pa
+
+from utils.code_exec import CodeExecutionPool, write_arrow
+
+WORKLOADS = {
+    "noop": "result = 1",
+    "groupby": (
+        "result = datasets['sales'].group_by('region').aggregate([('amount', 'sum')])"
+        ".sort_by('region').to_pydict()"
+    ),
+}
+
+
+def _table(rows: int) -> pa.Table:
+    return pa.table({
+        "region": pa.array([f"r{i % 16}" for i in range(rows)]),
+        "amount": pa.array([(i * 7919) % 1000 / 10 for i in range(rows)], pa.float64()),
+    })
+
+
+def _inline(code: str, table: pa.Table) -> str:
+    """Code that rebuilds the table from bytes embedded in the request, as a per-call copy would."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    payload = base64.b64encode(sink.getvalue().to_pybytes()).decode()
+    return (
+        "import base64\n"
+        f"datasets = {{'sales': pa.ipc.open_stream(base64.b64decode({payload!r})).read_all()}}\n"
+        + code
+    )
+
+
+async def _throughput(run, executions: int) -> float:
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run() for _ in range(executions)))
+    elapsed = time.perf_counter() - started
+    failed = [r.error for r in results if not r.ok]
+    assert not failed, failed[0]
+    return round(executions / elapsed, 1)
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        table = _table(args.rows)
+        datasets = {"sales": str(write_arrow(table, Path(tmp) / "sales.arrow"))}
+        inline_groupby = _inline(WORKLOADS["groupby"], table)
+
+        for size in args.pool_sizes:
+            rows = {"pool_size": size}
+            # A pool that retires every worker after one call: each execution gets a fresh interpreter.
+            spawning = CodeExecutionPool(size=size, max_executions=1)
+            await spawning.start()
+            pool = await CodeExecutionPool(size=size, max_executions=10**9).start()
+            for name, code in WORKLOADS.items():
+                rows[f"{name}_spawn_per_call"] = await _throughput(
+                    lambda: spawning.execute(code, datasets), max(args.executions // 10, size)
+                )
+                rows[f"{name}_pool"] = await _throughput(lambda: pool.execute(code, datasets), args.executions)
+            rows["groupby_pool_inline_data"] = await _throughput(
+                lambda: pool.execute(inline_groupby), max(args.executions // 10, size)
+            )
+            await spawning.close()
+            await pool.close()
+            print(json.dumps({"rows": args.rows, "executions_per_s": rows}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--executions", type=int, default=200)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    asyncio.run(main(parser.parse_args()))
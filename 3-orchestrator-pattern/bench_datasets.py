@@ -0,0 +1,146 @@
+"""Cold and warm query latency of the columnar dataset cache on a multi-GB CSV.
+
+A synthetic sales CSV of `--size-gb` is generated once (kept in `--workdir`),
+then each query is timed as:
+
+- csv_reparse: parse the CSV columns the query needs and query them, as
+  every call would without the cache
+- cold: convert the CSV into an empty cache, then map and query it
+- warm: a fresh registry over the populated cache, as in a new run: look the
+  entry up, map the Arrow file and query it
+- sandbox_first / sandbox_warm: the same query as analysis code in a
+  `CodeExecutionPool` worker, on its first call (maps the file) and after
+
+Summary statistics are also compared: read from the registry versus computed
+over the mapped table. "Warm" means the cache is populated; the OS page cache
+is whatever the previous steps left, so numbers on a machine with less RAM
+than the file include disk reads.
+
+    python 3-orchestrator-pattern/bench_datasets.py --size-gb 2
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from utils.code_exec import CodeExecutionPool
+from utils.datasets import DatasetRegistry
+
+QUERIES = {
+    "groupby_sum": lambda t: t.group_by("region").aggregate([("amount", "sum")]).num_rows,
+    "filter_count": lambda t: pc.sum(pc.greater(t["amount"], 900)).as_py(),
+    "mean": lambda t: pc.mean(t["amount"]).as_py(),
+}
+SANDBOX_QUERY = "result = datasets['sales'].group_by('region').aggregate([('amount', 'sum')]).num_rows"
+
+
+def _uniform(rows: int, seed: int, high: int) -> pa.Array:
+    """Integers in [0, high) from pyarrow's generator."""
+    return pc.cast(pc.floor(pc.multiply(pc.random(rows, initializer=seed), high)), pa.int64())
+
+
+def _generate(path: Path, size_gb: float, seed: int) -> None:
+    regions = pa.array([f"region-{i:02d}" for i in range(24)])
+    target = size_gb * 1024**3
+    schema = pa.schema([("order_id", pa.int64()), ("region", pa.string()), ("amount", pa.float64()),
+                        ("quantity", pa.int64()), ("day", pa.date32())])
+    tmp_path = path.with_suffix(".tmp")
+    start_id = 0
+    with pa_csv.CSVWriter(str(tmp_path), schema) as writer:
+        while tmp_path.stat().st_size < target:
+            rows = 1_000_000
+            writer.write_table(pa.table({
+                "order_id": pa.array(range(start_id, start_id + rows), pa.int64()),
+                "region": regions.take(_uniform(rows, seed, len(regions))),
+                "amount": pc.round(pc.divide(_uniform(rows, seed + 1, 200_000), 100.0), 2),
+                "quantity": pc.add(_uniform(rows, seed + 2, 19), 1),
+                "day": pc.cast(pc.cast(pc.add(_uniform(rows, seed + 3, 730), 19000), pa.int32()), pa.date32()),
+            }, schema=schema))
+            start_id += rows
+            seed += 4
+    tmp_path.rename(path)
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    value = fn()
+    return value, round(time.perf_counter() - started, 3)
+
+
+async def _sandbox(arrow_path: str) -> dict:
+    pool = await CodeExecutionPool(size=1, timeout=600, memory_mb=4096, max_executions=10**9).start()
+    try:
+        timings = {}
+        for label in ("sandbox_first", "sandbox_warm"):
+            started = time.perf_counter()
+            execution = await pool.execute(SANDBOX_QUERY, {"sales": arrow_path})
+            assert execution.ok, execution.error
+            timings[label] = round(time.perf_counter() - started, 3)
+        return timings
+    finally:
+        await pool.close()
+
+
+def main(args: argparse.Namespace) -> None:
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="bench-datasets-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    csv_path = workdir / f"sales-{args.size_gb:g}gb.csv"
+    if not csv_path.exists():
+        _, generate_s = _timed(lambda: _generate(csv_path, args.size_gb, args.seed))
+        print(json.dumps({"generated": str(csv_path), "seconds": generate_s}))
+    csv_gb = round(csv_path.stat().st_size / 1024**3, 2)
+
+    reparse = {}
+    for name, query in QUERIES.items():
+        columns = ["region", "amount"] if name == "groupby_sum" else ["amount"]
+        started = time.perf_counter()
+        query(pa_csv.read_csv(csv_path, convert_options=pa_csv.ConvertOptions(include_columns=columns)))
+        reparse[name] = round(time.perf_counter() - started, 3)
+
+    cache_dir = Path(tempfile.mkdtemp(prefix="cache-", dir=workdir))
+    cold_registry = DatasetRegistry(cache_dir, max_bytes=int(args.cache_gb * 1024**3))
+    entry, convert_s = _timed(lambda: cold_registry.prepare(csv_path))
+    table, map_s = _timed(lambda: cold_registry.table(entry))
+    cold = {name: round(convert_s + map_s + _timed(lambda: query(table))[1], 3) for name, query in QUERIES.items()}
+    cold_registry.close()
+    del table
+
+    warm_registry = DatasetRegistry(cache_dir, max_bytes=int(args.cache_gb * 1024**3))
+    warm = {}
+    for name, query in QUERIES.items():
+        started = time.perf_counter()
+        query(warm_registry.table(warm_registry.prepare(csv_path)))
+        warm[name] = round(time.perf_counter() - started, 3)
+    assert warm_registry.stats()["hits"] == len(QUERIES) and warm_registry.stats().get("conversions", 0) == 0
+
+    table = warm_registry.table(entry)
+    _, stats_computed_s = _timed(lambda: [pc.min_max(table[c.name]) for c in table.schema if c.type != pa.string()])
+    _, stats_cached_s = _timed(lambda: warm_registry.prepare(csv_path).stats)
+
+    print(json.dumps({
+        "csv_gb": csv_gb,
+        "rows": entry.num_rows,
+        "arrow_gb": round(entry.size_bytes / 1024**3, 2),
+        "convert_s": convert_s,
+        "map_s": map_s,
+        "query_s": {"csv_reparse": reparse, "cold": cold, "warm": warm},
+        **asyncio.run(_sandbox(entry.arrow_path)),
+        "summary_stats_s": {"computed": stats_computed_s, "cached": stats_cached_s},
+    }))
+    warm_registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-gb", type=float, default=2.0)
+    parser.add_argument("--cache-gb", type=float, default=20.0, help="eviction bound of the benchmark cache")
+    parser.add_argument("--workdir", help="where the CSV and cache are kept (default: a new temp dir)")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""Fan-out scaling of the orchestrator from 1 to 200 workers.
+
+The planner is replaced by one that emits N tasks and every worker by a
+simulated model call with log-normal latency, so only the graph's fan-out,
+the concurrency cap and the result reducer are measured. For each N and cap
+the report shows wall time, the ideal wall time for that cap, the overhead
+per worker and the peak number of workers that ran at once.
+
+    python 3-orchestrator-pattern/bench_fanout.py --caps 8 32 200
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+from agent import _build_workflow
+from utils import nodes
+from utils.state import WorkerState, WorkerTask
+
+
+class SimulatedWorker:
+    def __init__(self, median_latency: float, sigma: float, seed: int):
+        self._rng = random.Random(seed)
+        self._median_latency = median_latency
+        self._sigma = sigma
+        self.in_flight = 0
+        self.peak = 0
+        self.busy_s = 0.0
+        self.longest = 0.0
+
+    async def __call__(self, state: WorkerState) -> str:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        latency = self._median_latency * self._rng.lognormvariate(0, self._sigma)
+        self.busy_s += latency
+        self.longest = max(self.longest, latency)
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            self.in_flight -= 1
+        return f"Answer to {state.task.question}"
+
+
+def _planner(workers: int):
+    async def plan(state):
+        return {"tasks": [WorkerTask(id=i, title=f"Task {i}", question=f"q{i}") for i in range(1, workers + 1)]}
+
+    return plan
+
+
+async def _run(workers: int, cap: int, args: argparse.Namespace) -> dict:
+    nodes.configure_worker_concurrency(cap)
+    worker = SimulatedWorker(args.median_latency, args.sigma, args.seed)
+    app = _build_workflow(_planner(workers), worker).compile()
+    started = time.perf_counter()
+    result = await app.ainvoke({"question": "benchmark"})
+    wall = time.perf_counter() - started
+    assert len(result["results"]) == workers and result["report"].count("\n## ") == workers
+    assert worker.peak <= cap, f"cap {cap} exceeded: {worker.peak} workers ran at once"
+    # Lower bound for the cap: total work spread over `cap` slots, or the longest call.
+    ideal = max(worker.busy_s / min(cap, workers), worker.longest)
+    waits = sorted(r.wait_s for r in result["results"])
+    return {
+        "workers": workers,
+        "cap": cap,
+        "wall_s": round(wall, 3),
+        "ideal_s": round(ideal, 3),
+        "overhead_ms_per_worker": round(max(wall - ideal, 0) / workers * 1000, 3),
+        "peak_in_flight": worker.peak,
+        "p95_wait_s": round(waits[math.ceil(0.95 * len(waits)) - 1], 3),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    for cap in args.caps:
+        for workers in args.workers:
+            print(json.dumps(await _run(workers, cap, args)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 5, 10, 25, 50, 100, 200])
+    parser.add_argument("--caps", type=int, nargs="+", default=[8, 32, 200])
+    parser.add_argument("--median-latency", type=float, default=0.1, help="seconds per simulated worker call")
+    parser.add_argument("--sigma", type=float, default=0.4, help="log-normal spread of worker latency")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
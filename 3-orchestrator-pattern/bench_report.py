@@ -0,0 +1,103 @@
+"""Report latency with sections rendered by each worker versus all at the end.
+
+Workers are simulated model calls with log-normal latency that return a short
+Markdown answer and a label -> value result, so every section has a chart.
+For each mode the report shows wall time, the tail from the last worker's
+answer to the finished report, and per-section chart and render times:
+
+- end: workers only answer; the report node renders every section after the
+  last one arrives
+- incremental: each worker renders its section as soon as it answers, and the
+  report node only stitches the fragments
+
+The chart pool is started and warmed before timing.
+
+    python 3-orchestrator-pattern/bench_report.py --sections 50 --caps 8 32
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+from agent import _build_workflow
+from utils import nodes
+from utils.report import CHART_WORKERS, chart_executor, draw_bar_chart
+from utils.state import WorkerAnswer, WorkerState, WorkerTask
+
+
+class SimulatedAnalyst:
+    def __init__(self, median_latency: float, sigma: float, seed: int):
+        self._rng = random.Random(seed)
+        self._median_latency = median_latency
+        self._sigma = sigma
+        self.last_answer = 0.0
+
+    async def __call__(self, state: WorkerState) -> WorkerAnswer:
+        await asyncio.sleep(self._median_latency * self._rng.lognormvariate(0, self._sigma))
+        self.last_answer = max(self.last_answer, time.perf_counter())
+        series = {f"region-{i:02d}": round(self._rng.uniform(10, 1000), 2) for i in range(12)}
+        text = (
+            f"Sales for **{state.task.title}** rose in most regions.\n\n"
+            + "\n".join(f"- {label}: {value}" for label, value in list(series.items())[:5])
+        )
+        return WorkerAnswer(text=text, data=series)
+
+
+def _planner(sections: int):
+    async def plan(state):
+        return {"tasks": [WorkerTask(id=i, title=f"Task {i}", question=f"q{i}") for i in range(1, sections + 1)]}
+
+    return plan
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[math.ceil(q * len(ordered)) - 1], 3)
+
+
+async def _run(mode: str, cap: int, args: argparse.Namespace) -> dict:
+    nodes.configure_worker_concurrency(cap)
+    analyst = SimulatedAnalyst(args.median_latency, args.sigma, args.seed)
+    app = _build_workflow(_planner(args.sections), analyst, render_sections=mode == "incremental").compile()
+    started = time.perf_counter()
+    result = await app.ainvoke({"question": "benchmark"})
+    finished = time.perf_counter()
+    assert result["report"].count("\n## ") == args.sections
+    assert result["report_html"].count("<img ") == args.sections
+    results = result["results"]
+    return {
+        "mode": mode,
+        "sections": args.sections,
+        "cap": cap,
+        "wall_s": round(finished - started, 3),
+        "tail_after_last_answer_s": round(finished - analyst.last_answer, 3),
+        "p50_chart_s": _percentile([r.chart_s for r in results], 0.5),
+        "p95_chart_s": _percentile([r.chart_s for r in results], 0.95),
+        "p95_render_s": _percentile([r.render_s for r in results], 0.95),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    loop = asyncio.get_running_loop()
+    # Spawn and warm every chart worker so start-up is not charged to either mode.
+    await asyncio.gather(*(
+        loop.run_in_executor(chart_executor(), draw_bar_chart, "warm-up", {"a": 1.0, "b": 2.0})
+        for _ in range(CHART_WORKERS * 2)
+    ))
+    for cap in args.caps:
+        for mode in ("end", "incremental"):
+            print(json.dumps(await _run(mode, cap, args)))
+    chart_executor().shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, default=50)
+    parser.add_argument("--caps", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--median-latency", type=float, default=0.5, help="seconds per simulated worker call")
+    parser.add_argument("--sigma", type=float, default=0.4, help="log-normal spread of worker latency")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+
+async def invoke_graph(question: str, datasets: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Plan, fan out and render the report for one data-analysis question; returns the final state."""
+    # Import lazily so the environment is loaded before the model is built.
+    from agent import orchestrator_app
+
+    result = await orchestrator_app.ainvoke({"question": question, "datasets": datasets or {}})
+    return result
+
+
+if __name__ == "__main__":
+    load_dotenv("3-orchestrator-pattern/.env")
+    parser = argparse.ArgumentParser(description="Answer a data analysis question with parallel workers.")
+    parser.add_argument("question", nargs="*")
+    parser.add_argument(
+        "--dataset", action="append", default=[], metavar="NAME=PATH",
+        help="CSV, Parquet or Arrow IPC file the workers' analysis code can read as datasets[NAME]",
+    )
+    parser.add_argument("--html", type=Path, help="also write the HTML report, with charts, to this file")
+    parser.add_argument("--timings", action="store_true", help="print per-section timings to stderr")
+    args = parser.parse_args()
+    question = " ".join(args.question) or input("Enter a data analysis question: ").strip()
+    datasets = dict(item.split("=", 1) for item in args.dataset)
+    result = asyncio.run(invoke_graph(question, datasets))
+    print(result["report"])
+    if args.html:
+        args.html.write_text(result["report_html"])
+    if args.timings:
+        from utils.report import section_timings
+
+        for row in section_timings(result["results"]):
+            print(json.dumps(row), file=sys.stderr)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The orchestrator runs from its own directory; make `utils` importable from any cwd.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
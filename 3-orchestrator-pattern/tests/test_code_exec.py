@@ -0,0 +1,115 @@
+import asyncio
+
+from utils.code_exec import CodeExecutionPool
+
+PID = "import os\nresult = os.getpid()"
+BURN = """
+import os
+import time
+started = time.process_time()
+while time.process_time() - started < {seconds}:
+    pass
+result = os.getpid()
+"""
+
+
+def _run(pool: CodeExecutionPool, *calls):
+    """Execute ``calls`` one after another on ``pool``; return the results and final metrics."""
+
+    async def main():
+        try:
+            results = []
+            for code, kwargs in calls:
+                results.append(await pool.execute(code, **kwargs))
+            # Let replacements forked in the background join the pool.
+            await asyncio.gather(*pool._replacing)
+            return results, pool.metrics()
+        finally:
+            await pool.close()
+
+    return asyncio.run(main())
+
+
+def test_timeout_kills_and_replaces_worker():
+    pool = CodeExecutionPool(size=1, timeout=10)
+    (first, timed_out, after), metrics = _run(
+        pool,
+        (PID, {}),
+        ("import os\nwhile True:\n    pass", {"timeout": 0.5}),
+        (PID, {}),
+    )
+    assert timed_out.error.startswith("timed out")
+    assert after.ok and after.result != first.result
+    assert metrics["timeouts"] == 1 and metrics["idle"] == 1
+
+
+def test_workers_recycled_after_max_executions():
+    pool = CodeExecutionPool(size=1, max_executions=2)
+    results, metrics = _run(pool, *[(PID, {})] * 3)
+    pids = [r.result for r in results]
+    assert pids[0] == pids[1] != pids[2]
+    assert metrics["recycled"] == 1
+
+
+def test_cpu_limit_applies_per_call():
+    # Together the calls use more CPU than one call may, in the same worker.
+    pool = CodeExecutionPool(size=1, cpu_seconds=1, worker_cpu_seconds=60)
+    results, metrics = _run(pool, *[(BURN.format(seconds=0.6), {})] * 3)
+    assert all(r.ok for r in results)
+    assert len({r.result for r in results}) == 1
+    assert metrics["recycled"] == 0
+
+
+def test_call_over_cpu_limit_fails_without_killing_worker():
+    pool = CodeExecutionPool(size=1, cpu_seconds=1, worker_cpu_seconds=60)
+    (before, burned, after), _ = _run(pool, (PID, {}), (BURN.format(seconds=5), {}), (PID, {}))
+    assert "CpuTimeExceeded" in burned.error
+    assert after.ok and after.result == before.result
+
+
+def test_worker_recycled_before_lifetime_cpu_limit():
+    pool = CodeExecutionPool(size=1, cpu_seconds=1, worker_cpu_seconds=2)
+    results, metrics = _run(pool, *[(BURN.format(seconds=0.6), {})] * 3)
+    assert all(r.ok for r in results)
+    assert metrics["recycled"] >= 1
+
+
+def test_worker_environment_is_scrubbed(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-secret")
+    pool = CodeExecutionPool(size=1)
+    (env, session), _ = _run(
+        pool,
+        ("import os\nresult = dict(os.environ)", {}),
+        ("import os\nresult = os.getsid(0) == os.getpid()", {}),
+    )
+    assert "OPENAI_API_KEY" not in env.result
+    # LC_CTYPE may be set by the interpreter itself when it coerces the C locale.
+    allowed = {"PATH", "LANG", "LC_ALL", "LC_CTYPE", "TZ"}
+    assert {key for key in env.result if not key.startswith("SANDBOX_")} <= allowed
+    assert session.result is True
+
+
+def test_execute_raises_once_no_worker_can_start():
+    pool = CodeExecutionPool(size=1, spawn_retries=2)
+    pool._spawn_backoff_s = 0.01
+
+    async def fail_to_spawn():
+        raise RuntimeError("sandbox worker failed to start")
+
+    async def main():
+        try:
+            await pool.execute(PID)
+            pool._spawn = fail_to_spawn
+            timed_out = await pool.execute("while True:\n    pass", timeout=0.5)
+            # Both calls queue for the lost worker's replacement and must not hang.
+            outcomes = await asyncio.wait_for(
+                asyncio.gather(pool.execute(PID), pool.execute(PID), return_exceptions=True), 5
+            )
+            return timed_out, outcomes, pool.metrics()
+        finally:
+            await pool.close()
+
+    timed_out, outcomes, metrics = asyncio.run(main())
+    assert timed_out.error.startswith("timed out")
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert metrics["live"] == 0 and metrics["idle"] == 0
@@ -0,0 +1,64 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pyarrow as pa
+
+from utils.code_exec import CodeExecutionPool, write_arrow
+from utils.datasets import DatasetRegistry
+
+
+def test_key_locks_are_dropped_after_use(tmp_path):
+    sources = []
+    for i in range(4):
+        sources.append(tmp_path / f"data{i}.csv")
+        sources[-1].write_text("region,sales\neast,1\nwest,2\n")
+    registry = DatasetRegistry(tmp_path / "cache")
+    with ThreadPoolExecutor(8) as pool:
+        entries = list(pool.map(registry.prepare, sources * 4))
+    assert {entry.num_rows for entry in entries} == {2}
+    assert registry._key_locks == {}
+    assert registry.stats()["conversions"] == 4
+    registry.close()
+
+
+def test_sandbox_unmaps_deleted_datasets(tmp_path):
+    first = write_arrow(pa.table({"x": [1, 2, 3]}), tmp_path / "first.arrow")
+    second = write_arrow(pa.table({"x": [4, 5]}), tmp_path / "second.arrow")
+    maps = "import os\nresult = [os.getpid(), open('/proc/self/maps').read()]"
+
+    async def main():
+        pool = CodeExecutionPool(size=1, max_tables=4)
+        try:
+            mapped = await pool.execute(maps, {"t": first})
+            first.unlink()  # what DatasetRegistry eviction does
+            after_eviction = await pool.execute(maps, {"t": second})
+            return mapped.result, after_eviction.result
+        finally:
+            await pool.close()
+
+    (pid, before), (same_pid, after) = asyncio.run(main())
+    assert pid == same_pid
+    assert str(first) in before
+    assert str(first) not in after and str(second) in after
+
+
+def test_leased_entries_survive_eviction(tmp_path):
+    sources = []
+    for i in range(3):
+        sources.append(tmp_path / f"data{i}.csv")
+        sources[-1].write_text("region,sales\n" + f"east,{i}\n" * 200)
+    registry = DatasetRegistry(tmp_path / "cache", max_bytes=1)
+    lease = registry.lease(60)
+    held = registry.prepare(sources[0], lease=lease)
+    # Each conversion alone exceeds the bound, so it evicts everything unpinned.
+    unleased = registry.prepare(sources[1])
+    registry.prepare(sources[2])
+    assert Path(held.arrow_path).exists()
+    assert not Path(unleased.arrow_path).exists()
+
+    registry.release(lease)
+    registry.prepare(sources[1])
+    assert not Path(held.arrow_path).exists()
+    assert registry.stats()["leases"] == 0
+    registry.close()
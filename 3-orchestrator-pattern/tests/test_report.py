@@ -0,0 +1,29 @@
+import asyncio
+import re
+
+from utils.report import render_section
+from utils.state import WorkerResult
+
+ANSWER = """**Revenue** grew <script>alert(1)</script> in the east.
+
+<img src=x onerror=alert(1)>
+
+[details](javascript:alert(1)) [more](java\tscript:alert(2)) ![chart](data:text/html,x) [source](https://example.com)
+
+[a](&#106;avascript:alert(3)) [b](jav&#x09;ascript:alert(4)) ![c](&#x6A;avascript:alert(5)) [d][ref]
+[e](&amp;#106;avascript:alert(6)) [f](https://example.com/?a=1&amp;b=2)
+
+[ref]: &#106;avascript:alert(7)
+"""
+
+
+def test_render_section_escapes_html_from_answers():
+    result = asyncio.run(render_section(WorkerResult(task_id=1, title="<b>Sales</b>", answer=ANSWER)))
+    assert "<strong>Revenue</strong>" in result.html
+    assert "<script" not in result.html and "&lt;script&gt;" in result.html
+    assert "<img src=x" not in result.html and "&lt;img src=x" in result.html
+    assert "<b>" not in result.html
+    urls = re.findall(r'(?:href|src)="([^"]*)"', result.html)
+    assert urls == ["#", "#", "#", "https://example.com", "#", "#", "#", "#", "#", "https://example.com/?a=1&amp;b=2"]
+    # The Markdown fragment keeps the answer as written.
+    assert "<script>alert(1)</script>" in result.markdown
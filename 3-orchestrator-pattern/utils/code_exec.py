@@ -0,0 +1,293 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import resource
+import signal
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+RUNNER = Path(__file__).with_name("sandbox_runner.py")
+# Environment passed to workers: nothing else, so API keys never reach executed code.
+_WORKER_ENV_KEYS = ("PATH", "LANG", "LC_ALL", "TZ")
+
+
+@dataclass
+class ExecutionResult:
+    stdout: str = ""
+    result: Any = None
+    error: Optional[str] = None
+    duration_s: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def write_arrow(table: pa.Table, path: Path) -> Path:
+    """Write ``table`` as an uncompressed Arrow IPC file that workers can memory-map."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def dataset_schema(path: str) -> pa.Schema:
+    """Schema of an Arrow IPC file, read from its footer without loading data."""
+    with pa.memory_map(str(path), "r") as source:
+        return pa.ipc.open_file(source).schema
+
+
+class _Worker:
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.started = time.monotonic()
+        self.executions = 0
+
+    async def request(self, payload: dict) -> dict:
+        self.process.stdin.write((json.dumps(payload) + "\n").encode())
+        await self.process.stdin.drain()
+        line = await self.process.stdout.readline()
+        if not line:
+            code = await self.process.wait()
+            raise RuntimeError(f"worker exited with code {code}")
+        return json.loads(line)
+
+    def kill(self) -> None:
+        if self.process.returncode is None:
+            # The worker leads its own session, so this also reaps anything it spawned.
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+class CodeExecutionPool:
+    """Pre-forked pool of resource-limited Python workers for analysis code.
+
+    Each worker is a separate interpreter started in isolated mode with an
+    empty working directory, a minimal environment and rlimits on data
+    memory, CPU time, open files and file size. The memory limit applies to
+    the data segment rather than the address space, so memory-mapped datasets
+    larger than the limit still open. CPU time is limited per call to
+    ``cpu_seconds``: the worker lowers its soft limit to that much above what
+    it has already used before each call, under a lifetime hard limit of
+    ``worker_cpu_seconds``. A worker is recycled before what is left of that
+    limit gets smaller than one call's budget. Calls wait for an idle worker,
+    so concurrency never exceeds ``size``. A call that outlives ``timeout``
+    has its worker killed and replaced; workers are also replaced after
+    ``max_executions`` calls or ``max_age_s`` seconds to shed leaked state.
+    A replacement that fails to start is retried ``spawn_retries`` times with
+    exponential backoff; if the pool still ends up with no workers, the next
+    call tries one more start and raises instead of waiting forever.
+
+    This limits resource use and isolates credentials. It is not a security
+    boundary against hostile code: run the pool inside a container or VM for
+    untrusted input.
+
+    Executed code sees ``datasets`` (name -> ``pyarrow.Table``, memory-mapped
+    from the Arrow IPC paths given to ``execute``; each worker keeps up to
+    ``max_tables`` mapped between calls), ``pa`` and ``pc``
+    (``pyarrow.compute``), and returns a value by assigning ``result``.
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        timeout: float = 30.0,
+        memory_mb: int = 2048,
+        cpu_seconds: int = 60,
+        max_executions: int = 200,
+        max_age_s: float = 600.0,
+        worker_cpu_seconds: int = 600,
+        max_tables: int = 8,
+        spawn_retries: int = 3,
+    ):
+        if worker_cpu_seconds < 2 * cpu_seconds:
+            raise ValueError("worker_cpu_seconds must be at least twice cpu_seconds")
+        self.size = size
+        self.timeout = timeout
+        self._memory_bytes = memory_mb * 1024 * 1024
+        self._cpu_seconds = cpu_seconds
+        self._worker_cpu_seconds = worker_cpu_seconds
+        self._max_tables = max_tables
+        self._max_executions = max_executions
+        self._max_age_s = max_age_s
+        self._spawn_retries = spawn_retries
+        self._spawn_backoff_s = 0.5
+        # Idle workers, plus a None that wakes one waiter when the last worker is lost.
+        self._idle: asyncio.Queue = asyncio.Queue()
+        # Workers idle, busy or being replaced.
+        self._live = 0
+        self._workdir = tempfile.TemporaryDirectory(prefix="sandbox-")
+        self._ids = itertools.count()
+        self._replacing: set = set()
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self.executions = 0
+        self.timeouts = 0
+        self.recycled = 0
+
+    def _limit_resources(self) -> None:
+        # Runs in the child between fork and exec. The runner lowers the soft
+        # CPU limit per call; the hard limit caps the worker's lifetime.
+        resource.setrlimit(resource.RLIMIT_DATA, (self._memory_bytes, self._memory_bytes))
+        resource.setrlimit(resource.RLIMIT_CPU, (self._worker_cpu_seconds, self._worker_cpu_seconds))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (256, 256))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (64 * 1024 * 1024, 64 * 1024 * 1024))
+
+    async def _spawn(self) -> _Worker:
+        env = {key: os.environ[key] for key in _WORKER_ENV_KEYS if key in os.environ}
+        # Split the cores between workers instead of giving each a full Arrow thread pool.
+        env["SANDBOX_ARROW_THREADS"] = str(max(1, (os.cpu_count() or 1) // self.size))
+        env["SANDBOX_CPU_SECONDS"] = str(self._cpu_seconds)
+        env["SANDBOX_MAX_TABLES"] = str(self._max_tables)
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-I", str(RUNNER),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=self._workdir.name,
+            env=env,
+            # Its own session, so killing the process group reaps anything it spawned.
+            start_new_session=True,
+            preexec_fn=self._limit_resources,
+            limit=16 * 1024 * 1024,
+        )
+        worker = _Worker(process)
+        ready = await asyncio.wait_for(process.stdout.readline(), self.timeout)
+        if not ready:
+            raise RuntimeError("sandbox worker failed to start")
+        return worker
+
+    async def _replace(self, worker: _Worker) -> None:
+        worker.kill()
+        await worker.process.wait()
+        for attempt in range(self._spawn_retries + 1):
+            try:
+                self._idle.put_nowait(await self._spawn())
+                return
+            except Exception:
+                if attempt == self._spawn_retries:
+                    logger.exception("Could not replace sandbox worker; pool shrinks by one")
+                    break
+                await asyncio.sleep(self._spawn_backoff_s * 2**attempt)
+        self._live -= 1
+        if self._live == 0:
+            self._idle.put_nowait(None)
+
+    def _replace_later(self, worker: _Worker) -> None:
+        task = asyncio.create_task(self._replace(worker))
+        self._replacing.add(task)
+        task.add_done_callback(self._replacing.discard)
+
+    async def start(self) -> "CodeExecutionPool":
+        """Fork all workers up front so the first calls do not pay interpreter start-up."""
+        async with self._start_lock:
+            if not self._started:
+                for worker in await asyncio.gather(*(self._spawn() for _ in range(self.size))):
+                    self._idle.put_nowait(worker)
+                self._live = self.size
+                self._started = True
+        return self
+
+    async def _acquire(self) -> _Worker:
+        while True:
+            if self._live == 0:
+                # Every replacement failed: try once more rather than wait on an empty pool.
+                while not self._idle.empty():
+                    self._idle.get_nowait()
+                self._live += 1
+                try:
+                    return await self._spawn()
+                except Exception as e:
+                    self._live -= 1
+                    # Pass the wake-up on to the next waiter, which would otherwise block.
+                    self._idle.put_nowait(None)
+                    raise RuntimeError("sandbox pool has no workers and could not start one") from e
+            worker = await self._idle.get()
+            if worker is not None:
+                return worker
+
+    async def execute(
+        self,
+        code: str,
+        datasets: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> ExecutionResult:
+        """Run ``code`` in an idle worker; ``datasets`` maps names to Arrow IPC file paths."""
+        if not self._started:
+            await self.start()
+        worker = await self._acquire()
+        payload = {
+            "id": next(self._ids),
+            "code": code,
+            "datasets": {name: str(Path(path).resolve()) for name, path in (datasets or {}).items()},
+        }
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(worker.request(payload), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._replace_later(worker)
+            return ExecutionResult(error=f"timed out after {timeout or self.timeout:.1f}s",
+                                   duration_s=time.perf_counter() - started)
+        except asyncio.CancelledError:
+            # The worker may still be mid-request, so it cannot go back to the pool.
+            self._replace_later(worker)
+            raise
+        except Exception as e:
+            self._replace_later(worker)
+            return ExecutionResult(error=f"sandbox worker failed: {e}", duration_s=time.perf_counter() - started)
+
+        self.executions += 1
+        worker.executions += 1
+        cpu_left = self._worker_cpu_seconds - response.get("cpu_s", 0.0)
+        if (
+            worker.executions >= self._max_executions
+            or time.monotonic() - worker.started >= self._max_age_s
+            or cpu_left < self._cpu_seconds
+        ):
+            self.recycled += 1
+            self._replace_later(worker)
+        else:
+            self._idle.put_nowait(worker)
+        return ExecutionResult(
+            stdout=response["stdout"],
+            result=response["result"],
+            error=response["error"],
+            duration_s=response["duration_s"],
+        )
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "size": self.size,
+            "live": self._live,
+            # With no live workers the queue holds only the wake-up.
+            "idle": self._idle.qsize() if self._live else 0,
+            "executions": self.executions,
+            "timeouts": self.timeouts,
+            "recycled": self.recycled,
+        }
+
+    async def close(self) -> None:
+        await asyncio.gather(*self._replacing, return_exceptions=True)
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            if worker is not None:
+                worker.kill()
+                await worker.process.wait()
+        self._workdir.cleanup()
+        self._live = 0
+        self._started = False
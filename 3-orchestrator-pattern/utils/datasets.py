@@ -0,0 +1,324 @@
+"""Columnar cache of the datasets analysis workers query.
+
+Each CSV (or Parquet) file is converted once, batch by batch, into an
+uncompressed Arrow IPC file that any process can memory-map, and summary
+statistics are computed during the same pass. Entries are keyed on the source
+path, size and modification time, so an edited file is converted again. An
+SQLite index records the entries, and least-recently-used conversions are
+deleted once their total size exceeds the bound. Entries prepared under a
+lease are never deleted while the lease holds, so a run's files outlive the
+conversions other runs trigger in the meantime.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+ARROW_SUFFIXES = {".arrow", ".ipc", ".feather"}
+
+
+@dataclass
+class DatasetEntry:
+    source: str
+    arrow_path: str
+    num_rows: int
+    size_bytes: int
+    stats: Dict[str, Dict[str, Any]]
+
+    def describe(self, max_columns: int = 50) -> str:
+        """One line per column with its type and summary statistics, for prompts."""
+        lines = [f"{self.num_rows} rows"]
+        for name, column in list(self.stats.items())[:max_columns]:
+            details = ", ".join(f"{k}={v}" for k, v in column.items() if k != "type")
+            lines.append(f"- {name} ({column['type']}): {details}")
+        return "\n".join(lines)
+
+
+class _ColumnStats:
+    """Running count, nulls, min, max and mean of one column across batches."""
+
+    def __init__(self, type_: pa.DataType):
+        self.type = type_
+        self.count = 0
+        self.nulls = 0
+        self.min: Any = None
+        self.max: Any = None
+        self.sum = 0.0
+        self._numeric = pa.types.is_integer(type_) or pa.types.is_floating(type_)
+        self._ordered = self._numeric or pa.types.is_temporal(type_)
+
+    def update(self, array: Union[pa.Array, pa.ChunkedArray]) -> None:
+        self.nulls += array.null_count
+        self.count += len(array) - array.null_count
+        if not self._ordered or len(array) == array.null_count:
+            return
+        bounds = pc.min_max(array)
+        low, high = bounds["min"].as_py(), bounds["max"].as_py()
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        if self._numeric:
+            self.sum += pc.sum(array).as_py() or 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"type": str(self.type), "count": self.count, "nulls": self.nulls}
+        if self._ordered and self.count:
+            stats["min"], stats["max"] = self.min, self.max
+        if self._numeric and self.count:
+            stats["mean"] = round(self.sum / self.count, 6)
+        return json.loads(json.dumps(stats, default=str))
+
+
+def _open(
+    source: Path, block_size: int, column_types: Optional[Dict[str, pa.DataType]]
+) -> Tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    """Schema and streaming batches of a CSV or Parquet file, never the whole file at once."""
+    if source.suffix.lower() == ".parquet":
+        parquet = pq.ParquetFile(source)
+        return parquet.schema_arrow, parquet.iter_batches(batch_size=256 * 1024)
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types),
+    )
+
+    def batches() -> Iterator[pa.RecordBatch]:
+        try:
+            yield from reader
+        except pa.ArrowInvalid as e:
+            # Types are inferred from the first block; a later block that disagrees fails here.
+            raise ValueError(f"{source}: {e}. Pass column_types for the affected columns.") from e
+
+    return reader.schema, batches()
+
+
+class DatasetRegistry:
+    """Converts datasets to memory-mappable Arrow files once and keeps their statistics."""
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        max_bytes: int = 20 * 1024**3,
+        block_size: int = 64 * 1024 * 1024,
+    ):
+        self._dir = Path(cache_dir)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._block_size = block_size
+        self._conn = sqlite3.connect(self._dir / "index.sqlite", isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS datasets ("
+            "key TEXT PRIMARY KEY, source TEXT NOT NULL, arrow_path TEXT NOT NULL, "
+            "num_rows INTEGER NOT NULL, size INTEGER NOT NULL, stats TEXT NOT NULL, "
+            "owned INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db_lock = threading.Lock()
+        # Per-key conversion locks with their number of holders and waiters; dropped when unused.
+        self._key_locks: Dict[str, Tuple[threading.Lock, int]] = {}
+        self._key_locks_guard = threading.Lock()
+        self.counters: Dict[str, int] = defaultdict(int)
+        # Lease id -> (expiry on the monotonic clock, Arrow files it pins). Guarded by _db_lock.
+        self._leases: Dict[int, Tuple[float, Set[str]]] = {}
+        self._lease_ids = itertools.count(1)
+
+    def lease(self, seconds: float) -> int:
+        """Open a lease pinning every entry later prepared with it, until released or ``seconds`` pass.
+
+        The expiry only matters for a holder that never calls `release`.
+        """
+        with self._db_lock:
+            lease = next(self._lease_ids)
+            self._leases[lease] = (time.monotonic() + seconds, set())
+        return lease
+
+    def release(self, lease: int) -> None:
+        with self._db_lock:
+            self._leases.pop(lease, None)
+
+    def _pin(self, lease: Optional[int], arrow_path: str) -> None:
+        if lease is not None:
+            self._leases[lease][1].add(arrow_path)
+
+    def _pinned(self) -> Set[str]:
+        """Arrow files pinned by unexpired leases; expired leases are dropped. Call under _db_lock."""
+        now = time.monotonic()
+        for lease in [lease for lease, (expires, _) in self._leases.items() if expires <= now]:
+            del self._leases[lease]
+        return {path for _, paths in self._leases.values() for path in paths}
+
+    @contextmanager
+    def _key_lock(self, key: str) -> Iterator[None]:
+        with self._key_locks_guard:
+            lock, users = self._key_locks.get(key, (None, 0))
+            lock = lock or threading.Lock()
+            self._key_locks[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._key_locks_guard:
+                _, users = self._key_locks[key]
+                if users == 1:
+                    del self._key_locks[key]
+                else:
+                    self._key_locks[key] = (lock, users - 1)
+
+    @staticmethod
+    def key(source: Path) -> str:
+        # Path, size and mtime identify a version without reading a multi-GB file.
+        stat = source.stat()
+        return hashlib.sha256(f"{source}\0{stat.st_size}\0{stat.st_mtime_ns}".encode()).hexdigest()
+
+    def _lookup(self, key: str, lease: Optional[int]) -> Optional[DatasetEntry]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT source, arrow_path, num_rows, size, stats FROM datasets WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or not Path(row[1]).exists():
+                return None
+            self._conn.execute("UPDATE datasets SET last_access = ? WHERE key = ?", (time.time(), key))
+            # Pinned under the same lock _evict takes, so it cannot be deleted in between.
+            self._pin(lease, row[1])
+        return DatasetEntry(row[0], row[1], row[2], row[3], json.loads(row[4]))
+
+    def _convert(self, source: Path, key: str, column_types, lease: Optional[int]) -> DatasetEntry:
+        if source.suffix.lower() in ARROW_SUFFIXES:
+            # Already memory-mappable: only scan it for statistics and never delete it.
+            arrow_path, owned = source, False
+            with pa.memory_map(str(source), "r") as f:
+                reader = pa.ipc.open_file(f)
+                batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+                num_rows, stats = self._scan(reader.schema, batches, None)
+        else:
+            arrow_path, owned = self._dir / f"{key[:24]}.arrow", True
+            tmp_path = arrow_path.with_name(f".{arrow_path.name}.tmp")
+            schema, batches = _open(source, self._block_size, column_types)
+            try:
+                with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+                    num_rows, stats = self._scan(schema, batches, writer)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+            os.replace(tmp_path, arrow_path)
+        size = arrow_path.stat().st_size if owned else 0
+        entry = DatasetEntry(str(source), str(arrow_path), num_rows, size, {k: s.as_dict() for k, s in stats.items()})
+        with self._db_lock:
+            # Earlier versions of a modified file can never be looked up again,
+            # but a run holding one keeps it until eviction finds it unpinned.
+            pinned = self._pinned()
+            stale = [
+                (stale_key, stale_path)
+                for stale_key, stale_path in self._conn.execute(
+                    "SELECT key, arrow_path FROM datasets WHERE source = ? AND key != ? AND owned = 1",
+                    (entry.source, key),
+                ).fetchall()
+                if stale_path not in pinned
+            ]
+            for _, stale_path in stale:
+                Path(stale_path).unlink(missing_ok=True)
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM datasets WHERE key = ?", [(stale_key,) for stale_key, _ in stale])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, entry.source, entry.arrow_path, num_rows, size, json.dumps(entry.stats), int(owned), time.time()),
+            )
+            self._conn.execute("COMMIT")
+            self._pin(lease, entry.arrow_path)
+        self.counters["conversions"] += 1
+        self._evict(keep=key)
+        return entry
+
+    @staticmethod
+    def _scan(schema: pa.Schema, batches: Iterator[pa.RecordBatch], writer) -> Tuple[int, Dict[str, _ColumnStats]]:
+        stats = {field.name: _ColumnStats(field.type) for field in schema}
+        rows = 0
+        for batch in batches:
+            rows += batch.num_rows
+            for field, column in zip(schema, batch.columns):
+                stats[field.name].update(column)
+            if writer is not None:
+                writer.write_batch(batch)
+        return rows, stats
+
+    def _evict(self, keep: str) -> None:
+        """Delete least recently used unpinned conversions until they fit in 90% of the bound."""
+        with self._db_lock:
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM datasets").fetchone()
+            if total <= self._max_bytes:
+                return
+            target = int(self._max_bytes * 0.9)
+            pinned = self._pinned()
+            doomed = []
+            for key, arrow_path, size in self._conn.execute(
+                "SELECT key, arrow_path, size FROM datasets WHERE owned = 1 AND key != ? ORDER BY last_access", (keep,)
+            ).fetchall():
+                if total <= target:
+                    break
+                if arrow_path in pinned:
+                    continue
+                doomed.append(key)
+                total -= size
+                # Sandbox workers drop their mapping of a deleted file on their next call.
+                Path(arrow_path).unlink(missing_ok=True)
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM datasets WHERE key = ?", [(key,) for key in doomed])
+            self._conn.execute("COMMIT")
+        self.counters["evictions"] += len(doomed)
+
+    def prepare(
+        self,
+        source: Union[str, Path],
+        column_types: Optional[Dict[str, pa.DataType]] = None,
+        lease: Optional[int] = None,
+    ) -> DatasetEntry:
+        """Return the Arrow entry for ``source``, converting it first on a miss.
+
+        With a ``lease`` from `lease`, the entry is not evicted until the lease is released or expires.
+        """
+        source = Path(source).resolve()
+        key = self.key(source)
+        with self._key_lock(key):
+            entry = self._lookup(key, lease)
+            if entry is not None:
+                self.counters["hits"] += 1
+                return entry
+            self.counters["misses"] += 1
+            return self._convert(source, key, column_types, lease)
+
+    async def aprepare(
+        self,
+        source: Union[str, Path],
+        column_types: Optional[Dict[str, pa.DataType]] = None,
+        lease: Optional[int] = None,
+    ) -> DatasetEntry:
+        return await asyncio.to_thread(self.prepare, source, column_types, lease)
+
+    @staticmethod
+    def table(entry: DatasetEntry) -> pa.Table:
+        """Memory-map an entry's Arrow file; pages are shared with every process mapping it."""
+        with pa.memory_map(entry.arrow_path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._db_lock:
+            (count, total) = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM datasets").fetchone()
+            leases = len(self._leases)
+        return {"entries": count, "bytes": total, "leases": leases, **self.counters}
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,195 @@
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from langchain_openai import ChatOpenAI
+from langgraph.types import Send
+
+# Repository root, for the transport shared by all agents. Inserted first so
+# this checkout's `common` wins over any installed package of that name.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from common.transport import openai_http_clients
+from utils.code_exec import CodeExecutionPool, dataset_schema
+from utils.datasets import DatasetRegistry
+from utils.report import chart_series, render_section, stitch_report
+from utils.state import AnalysisCode, AnalysisPlan, State, WorkerAnswer, WorkerResult, WorkerState
+
+# Upper bound on tasks a plan may fan out to, and on workers running at once.
+MAX_WORKER_TASKS = int(os.getenv("ORCHESTRATOR_MAX_TASKS", "200"))
+MAX_CONCURRENT_WORKERS = int(os.getenv("ORCHESTRATOR_MAX_CONCURRENCY", "8"))
+SANDBOX_WORKERS = int(os.getenv("ORCHESTRATOR_SANDBOX_WORKERS", "4"))
+SANDBOX_TIMEOUT = float(os.getenv("ORCHESTRATOR_SANDBOX_TIMEOUT", "30"))
+DATASET_CACHE_DIR = Path(os.getenv("ORCHESTRATOR_DATASET_CACHE", Path(__file__).resolve().parents[1] / ".datasets"))
+DATASET_CACHE_GB = float(os.getenv("ORCHESTRATOR_DATASET_CACHE_GB", "20"))
+# A run's datasets stay pinned until its report is rendered; the lease only
+# runs out for a run that dies before getting there.
+DATASET_LEASE_S = float(os.getenv("ORCHESTRATOR_DATASET_LEASE_S", "3600"))
+
+_llm = None
+_code_pool: Optional[CodeExecutionPool] = None
+_dataset_registry: Optional[DatasetRegistry] = None
+# Workers beyond the cap wait here before calling a model, so a large plan
+# queues instead of flooding the provider.
+_worker_slots = asyncio.Semaphore(MAX_CONCURRENT_WORKERS)
+
+
+def _model() -> ChatOpenAI:
+    global _llm
+    if _llm is None:
+        _llm = ChatOpenAI(model="gpt-4.1", temperature=0, **openai_http_clients())
+    return _llm
+
+
+def code_pool() -> CodeExecutionPool:
+    """The process-wide sandbox pool, forked on first use."""
+    global _code_pool
+    if _code_pool is None:
+        _code_pool = CodeExecutionPool(size=SANDBOX_WORKERS, timeout=SANDBOX_TIMEOUT)
+    return _code_pool
+
+
+def dataset_registry() -> DatasetRegistry:
+    """The process-wide columnar dataset cache, opened on first use."""
+    global _dataset_registry
+    if _dataset_registry is None:
+        _dataset_registry = DatasetRegistry(DATASET_CACHE_DIR, max_bytes=int(DATASET_CACHE_GB * 1024**3))
+    return _dataset_registry
+
+
+def configure_worker_concurrency(limit: int) -> None:
+    """Change the worker cap for runs started after this call."""
+    global _worker_slots
+    _worker_slots = asyncio.Semaphore(limit)
+
+
+async def prepare_datasets(state: State) -> Dict[str, Any]:
+    """Convert the question's datasets to cached Arrow files and summarize them.
+
+    A dataset seen before, unchanged, is a lookup; only new or modified files
+    are read in full. The entries are leased so other runs' conversions cannot
+    evict them before render_report releases them.
+    """
+    if not state.datasets:
+        return {}
+    registry = dataset_registry()
+    lease = registry.lease(DATASET_LEASE_S)
+    names = list(state.datasets)
+    try:
+        entries = await asyncio.gather(*(registry.aprepare(state.datasets[name], lease=lease) for name in names))
+    except BaseException:
+        registry.release(lease)
+        raise
+    return {
+        "dataset_lease": lease,
+        "datasets": {name: entry.arrow_path for name, entry in zip(names, entries)},
+        "dataset_notes": {name: entry.describe() for name, entry in zip(names, entries)},
+    }
+
+
+def _describe_datasets(state: Union[State, WorkerState]) -> str:
+    return "\n".join(
+        f"datasets[{name!r}]: " + (state.dataset_notes.get(name) or str(dataset_schema(path)))
+        for name, path in state.datasets.items()
+    )
+
+
+async def plan_tasks(state: State) -> Dict[str, Any]:
+    """Split the question into independent analysis tasks, one per worker."""
+    planner = _model().with_structured_output(AnalysisPlan)
+    prompt = (
+        "You are planning a data analysis. Break the question below into independent "
+        "sub-questions that can be answered in parallel, each becoming one section of "
+        f"the final report. Use as few tasks as the question needs, at most {MAX_WORKER_TASKS}. "
+        f"Question: {state.question}"
+    )
+    if state.datasets:
+        prompt += f"\nWorkers can run code over these datasets:\n{_describe_datasets(state)}"
+    plan = await planner.ainvoke(prompt)
+    tasks = plan.tasks[:MAX_WORKER_TASKS]
+    # Renumber so task ids are unique and follow plan order.
+    return {"tasks": [task.model_copy(update={"id": i}) for i, task in enumerate(tasks, start=1)]}
+
+
+def assign_workers(state: State) -> List[Union[Send, str]]:
+    """Fan out one worker per planned task, or go straight to the report if there are none."""
+    sends = [
+        Send(
+            "run_worker",
+            WorkerState(question=state.question, task=task, datasets=state.datasets, dataset_notes=state.dataset_notes),
+        )
+        for task in state.tasks
+    ]
+    return sends or ["render_report"]
+
+
+async def answer_task(state: WorkerState) -> str:
+    prompt = (
+        "Answer the following analysis task concisely, with figures where possible. "
+        f"It is part of the larger question: {state.question}\n"
+        f"Task: {state.task.question}"
+    )
+    response = await _model().ainvoke(prompt)
+    return str(response.text).strip()
+
+
+async def answer_with_code(state: WorkerState) -> WorkerAnswer:
+    """Have the model write analysis code, run it in the sandbox pool and explain the output."""
+    prompt = (
+        "Write Python that answers the analysis task below. Tables are available as "
+        "pyarrow Tables; `pa` is pyarrow and `pc` is pyarrow.compute. Assign the answer "
+        "to `result` as plain numbers, strings, lists or dicts.\n"
+        f"{_describe_datasets(state)}\n"
+        f"Overall question: {state.question}\n"
+        f"Task: {state.task.question}"
+    )
+    analysis = await _model().with_structured_output(AnalysisCode).ainvoke(prompt)
+    execution = await code_pool().execute(analysis.code, state.datasets)
+    if not execution.ok:
+        raise RuntimeError(f"analysis code failed: {execution.error.strip().splitlines()[-1]}")
+    response = await _model().ainvoke(
+        "Explain the result of this analysis in a short report section, quoting the key figures.\n"
+        f"Task: {state.task.question}\nCode:\n{analysis.code}\n"
+        f"Printed output:\n{execution.stdout}\nResult: {execution.result}"
+    )
+    return WorkerAnswer(text=str(response.text).strip(), data=execution.result)
+
+
+async def run_worker(state: WorkerState, answer=None, render: bool = True) -> Dict[str, Any]:
+    """Run one task under the worker cap; failures are reported in the result, not raised.
+
+    Tasks on a question with datasets are answered with sandboxed analysis
+    code, others by the model alone. The section is rendered right away,
+    after the slot is released, unless ``render`` is false.
+    """
+    answer = answer or (answer_with_code if state.datasets else answer_task)
+    queued = time.perf_counter()
+    async with _worker_slots:
+        started = time.perf_counter()
+        result = WorkerResult(task_id=state.task.id, title=state.task.title, wait_s=started - queued)
+        try:
+            answered = await answer(state)
+            if isinstance(answered, str):
+                answered = WorkerAnswer(text=answered)
+            result.answer = answered.text
+            result.chart = chart_series(answered.data)
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        result.run_s = time.perf_counter() - started
+    if render:
+        await render_section(result)
+    return {"results": [result]}
+
+
+async def render_report(state: State) -> Dict[str, str]:
+    """Stitch the workers' pre-rendered sections into Markdown and HTML reports in plan order.
+
+    Sections that arrive unrendered are rendered here, concurrently.
+    """
+    await asyncio.gather(*(render_section(r) for r in state.results if not r.markdown))
+    report, report_html = stitch_report(state.question, state.results)
+    if state.dataset_lease is not None:
+        dataset_registry().release(state.dataset_lease)
+    return {"report": report, "report_html": report_html}
@@ -0,0 +1,228 @@
+"""Per-section rendering of the orchestrator report.
+
+Each worker renders its own section into Markdown and HTML fragments as soon
+as its answer is in, while other workers are still waiting on the model.
+Charts are drawn in a process pool, so plotting neither blocks the event loop
+nor holds the GIL. `stitch_report` only concatenates the fragments.
+
+Answers are written by the model from dataset contents, so they are rendered
+as untrusted Markdown: raw HTML comes out as text and links or images may
+only point at http(s), mailto or relative URLs.
+"""
+
+import asyncio
+import base64
+import html
+import io
+import logging
+import math
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+from utils.state import WorkerResult
+
+logger = logging.getLogger(__name__)
+
+SAFE_URL_SCHEMES = {"", "http", "https", "mailto"}
+_URL_NOISE = re.compile(r"[\x00-\x20\x7f]")
+CHART_WORKERS = int(os.getenv("ORCHESTRATOR_CHART_WORKERS", str(os.cpu_count() or 1)))
+MAX_CHART_BARS = 40
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: system-ui, sans-serif; max-width: 52rem; margin: 2rem auto; padding: 0 1rem; line-height: 1.5; }}
+section {{ margin-bottom: 2rem; }}
+img {{ max-width: 100%; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ccc; padding: 0.2rem 0.5rem; }}
+.failed {{ color: #a00; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+{sections}
+</body>
+</html>
+"""
+
+_chart_executor: Optional[ProcessPoolExecutor] = None
+
+
+def chart_series(data: Any) -> Optional[Dict[str, float]]:
+    """Label -> value pairs to plot from an analysis result, if it has that shape.
+
+    Accepts a mapping of labels to numbers, or a column dict (as returned by
+    ``Table.to_pydict()``) with one label column and one numeric column.
+    """
+    if not isinstance(data, dict) or not data:
+        return None
+    if all(_is_number(v) for v in data.values()):
+        series = {str(k): float(v) for k, v in data.items()}
+    elif len(data) == 2 and all(isinstance(v, list) for v in data.values()):
+        labels, values = data.values()
+        if not all(_is_number(v) for v in values):
+            labels, values = values, labels
+        if len(labels) != len(values) or not all(_is_number(v) for v in values):
+            return None
+        series = {str(k): float(v) for k, v in zip(labels, values)}
+    else:
+        return None
+    return series if 2 <= len(series) <= MAX_CHART_BARS else None
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _init_chart_worker() -> None:
+    # Pay the matplotlib import once per process, not on the first chart.
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.figure  # noqa: F401
+
+
+def draw_bar_chart(title: str, series: Dict[str, float]) -> bytes:
+    """PNG bar chart of ``series``; runs in a chart worker process."""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(6.4, 3.2), dpi=100)
+    # Fixed margins with room for rotated labels: a tight layout draws the figure twice.
+    figure.subplots_adjust(left=0.1, right=0.98, top=0.9, bottom=0.3)
+    axes = figure.subplots()
+    axes.bar(list(series), list(series.values()), color="#4c72b0")
+    axes.set_title(title)
+    axes.tick_params(axis="x", labelrotation=45 if len(series) > 6 else 0)
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def chart_executor() -> ProcessPoolExecutor:
+    """The process-wide chart pool, started on first use."""
+    global _chart_executor
+    if _chart_executor is None:
+        # Spawned rather than forked: forking a process with a running event loop
+        # and client threads copies their locks in whatever state they are in.
+        _chart_executor = ProcessPoolExecutor(
+            max_workers=CHART_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_chart_worker,
+        )
+    return _chart_executor
+
+
+def _url_scheme(url: str) -> str:
+    """Scheme a browser would see in ``url``, however its characters are encoded."""
+    # The serializer writes character references in attributes as they are, and
+    # the browser decodes them ("&#106;avascript:"). Decode until nothing changes.
+    decoded = html.unescape(url)
+    while decoded != url:
+        url, decoded = decoded, html.unescape(decoded)
+    # Browsers ignore control characters and whitespace inside a scheme ("java\tscript:").
+    return urlsplit(_URL_NOISE.sub("", url)).scheme.lower()
+
+
+class _SafeUrls(Treeprocessor):
+    def run(self, root) -> None:
+        for element in root.iter():
+            for attribute in ("href", "src"):
+                url = element.get(attribute)
+                if url is not None and _url_scheme(url) not in SAFE_URL_SCHEMES:
+                    element.set(attribute, "#")
+
+
+class _UntrustedMarkdown(Extension):
+    """Treat raw HTML as text and drop links and images with script-capable URL schemes."""
+
+    def extendMarkdown(self, md: markdown.Markdown) -> None:
+        md.preprocessors.deregister("html_block")
+        md.inlinePatterns.deregister("html")
+        # After the inline patterns have created every <a> and <img>.
+        md.treeprocessors.register(_SafeUrls(md), "safe_urls", 0)
+
+
+def markdown_to_html(text: str) -> str:
+    """HTML for model-written Markdown, safe to embed in the report page."""
+    return markdown.markdown(text, extensions=["tables", "fenced_code", _UntrustedMarkdown()])
+
+
+def _series_table(series: Dict[str, float]) -> str:
+    rows = "\n".join(f"| {label} | {value:,.4g} |" for label, value in series.items())
+    return f"| | value |\n|---|---|\n{rows}\n"
+
+
+async def render_section(result: WorkerResult) -> WorkerResult:
+    """Fill in ``result``'s Markdown and HTML fragments and their timings.
+
+    The Markdown carries a chart's data as a table. The HTML embeds the chart
+    itself as a PNG. A chart that fails to draw is left out rather than failing
+    the section.
+    """
+    started = time.perf_counter()
+    heading = f"{result.task_id}. {result.title}"
+    if result.error is None:
+        body = result.answer or ""
+        if result.chart:
+            body += f"\n\n{_series_table(result.chart)}"
+    else:
+        body = f"_Task failed: {result.error}_"
+
+    png = None
+    if result.chart:
+        chart_started = time.perf_counter()
+        try:
+            png = await asyncio.get_running_loop().run_in_executor(
+                chart_executor(), draw_bar_chart, result.title, result.chart
+            )
+        except Exception:
+            logger.exception("Could not draw the chart for task %s", result.task_id)
+        result.chart_s = time.perf_counter() - chart_started
+
+    result.markdown = f"## {heading}\n\n{body}\n"
+    image = ""
+    if png:
+        image = f'\n<img alt="{html.escape(result.title)}" src="data:image/png;base64,{base64.b64encode(png).decode()}">'
+    css_class = ' class="failed"' if result.error is not None else ""
+    result.html = (
+        f'<section id="task-{result.task_id}"{css_class}>\n<h2>{html.escape(heading)}</h2>\n'
+        f"{markdown_to_html(body)}{image}\n</section>"
+    )
+    result.render_s = time.perf_counter() - started
+    return result
+
+
+def stitch_report(question: str, results: List[WorkerResult]) -> Tuple[str, str]:
+    """Markdown and HTML reports from pre-rendered sections, in plan order."""
+    ordered = sorted(results, key=lambda r: r.task_id)
+    report = "\n".join([f"# {question}\n"] + [r.markdown for r in ordered])
+    report_html = HTML_TEMPLATE.format(title=html.escape(question), sections="\n".join(r.html for r in ordered))
+    return report, report_html
+
+
+def section_timings(results: List[WorkerResult]) -> List[Dict[str, Any]]:
+    """Per-section seconds spent queued, answering, charting and rendering."""
+    return [
+        {
+            "task_id": r.task_id,
+            "title": r.title,
+            "wait_s": round(r.wait_s, 3),
+            "run_s": round(r.run_s, 3),
+            "chart_s": round(r.chart_s, 3),
+            "render_s": round(r.render_s, 3),
+        }
+        for r in sorted(results, key=lambda r: r.task_id)
+    ]
@@ -0,0 +1,131 @@
+"""Worker process for `utils.code_exec.CodeExecutionPool`.
+
+Reads one JSON request per line from stdin and answers with one JSON line on
+the original stdout. Anything the executed code prints is captured; file
+descriptor 1 itself is pointed at /dev/null so stray writes cannot corrupt the
+protocol. Datasets arrive as paths to Arrow IPC files and are memory-mapped
+once per worker, so executions share the pages instead of copying tables.
+At most SANDBOX_MAX_TABLES stay mapped, least recently used first out, and a
+table whose file was deleted or replaced (e.g. evicted from the dataset
+cache) is dropped before the next call, so its disk space is freed.
+
+Each call gets SANDBOX_CPU_SECONDS of CPU time: the soft RLIMIT_CPU is set
+that far above the CPU the worker has used so far, and the SIGXCPU it raises
+fails the call rather than killing the worker. Between calls the soft limit
+goes back up to the hard limit the pool set for the worker's lifetime.
+"""
+
+import contextlib
+import io
+import json
+import math
+import os
+import resource
+import signal
+import sys
+import time
+import traceback
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+MAX_OUTPUT_CHARS = 20_000
+CPU_SECONDS = int(os.environ.get("SANDBOX_CPU_SECONDS", "60"))
+MAX_TABLES = int(os.environ.get("SANDBOX_MAX_TABLES", "8"))
+_tables: "OrderedDict[tuple, pa.Table]" = OrderedDict()
+_executing = False
+
+
+class CpuTimeExceeded(Exception):
+    pass
+
+
+def _on_sigxcpu(signum, frame) -> None:
+    if _executing:
+        raise CpuTimeExceeded(f"call exceeded its CPU time limit of {CPU_SECONDS}s")
+
+
+def _cpu_used() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _set_cpu_limit(soft: int) -> None:
+    """Set the soft CPU limit, clamped to the hard one; ``RLIM_INFINITY`` means as high as allowed."""
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY and (soft == resource.RLIM_INFINITY or soft > hard):
+        soft = hard
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _file_version(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _prune_tables() -> None:
+    for key in [key for key in _tables if _file_version(key[0]) != key[1]]:
+        del _tables[key]
+
+
+def _load(path: str) -> pa.Table:
+    key = (path, _file_version(path))
+    table = _tables.get(key)
+    if table is None:
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        _tables[key] = table
+        while len(_tables) > MAX_TABLES:
+            _tables.popitem(last=False)
+    _tables.move_to_end(key)
+    return table
+
+
+def _execute(request: dict) -> dict:
+    global _executing
+    started = time.perf_counter()
+    stdout = io.StringIO()
+    response = {"id": request["id"], "stdout": "", "result": None, "error": None}
+    _prune_tables()
+    try:
+        datasets = {name: _load(path) for name, path in (request.get("datasets") or {}).items()}
+        namespace = {"__name__": "__sandbox__", "datasets": datasets, "pa": pa, "pc": pc}
+        _set_cpu_limit(math.ceil(_cpu_used()) + CPU_SECONDS)
+        _executing = True
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stdout):
+                exec(compile(request["code"], "<analysis>", "exec"), namespace)
+        finally:
+            _executing = False
+            _set_cpu_limit(resource.RLIM_INFINITY)
+        result = namespace.get("result")
+        if isinstance(result, pa.Table):
+            result = result.slice(0, 100).to_pylist()
+        response["result"] = json.loads(json.dumps(result, default=str))
+    except BaseException:
+        response["error"] = traceback.format_exc(limit=5)[-MAX_OUTPUT_CHARS:]
+    response["stdout"] = stdout.getvalue()[:MAX_OUTPUT_CHARS]
+    response["duration_s"] = time.perf_counter() - started
+    # Lets the pool recycle the worker before its lifetime CPU limit runs out.
+    response["cpu_s"] = _cpu_used()
+    return response
+
+
+def main() -> None:
+    pa.set_cpu_count(int(os.environ.get("SANDBOX_ARROW_THREADS", pa.cpu_count())))
+    signal.signal(signal.SIGXCPU, _on_sigxcpu)
+    protocol = os.fdopen(os.dup(1), "w", buffering=1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    protocol.write(json.dumps({"ready": True}) + "\n")
+    for line in sys.stdin:
+        protocol.write(json.dumps(_execute(json.loads(line))) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import operator
+from typing import Annotated, Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class WorkerTask(BaseModel):
+    id: int = Field(description="Position of the task in the plan, starting at 1.")
+    title: str = Field(description="Short section title for the report.")
+    question: str = Field(description="Self-contained analysis question for one worker.")
+
+
+class AnalysisPlan(BaseModel):
+    tasks: List[WorkerTask]
+
+
+class AnalysisCode(BaseModel):
+    code: str = Field(description="Python that computes the answer and assigns it to `result`.")
+
+
+class WorkerAnswer(BaseModel):
+    text: str
+    # Value computed by the task's analysis code, charted when it is label -> number shaped.
+    data: Any = None
+
+
+class WorkerResult(BaseModel):
+    task_id: int
+    title: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    chart: Optional[Dict[str, float]] = None
+    # Section fragments, rendered by the worker as soon as it finishes.
+    markdown: str = ""
+    html: str = ""
+    # Time spent waiting for a worker slot, running, drawing the chart and rendering.
+    wait_s: float = 0.0
+    run_s: float = 0.0
+    chart_s: float = 0.0
+    render_s: float = 0.0
+
+
+class WorkerState(BaseModel):
+    """Payload sent to one worker; results flow back through State.results."""
+
+    question: str
+    task: WorkerTask
+    datasets: Dict[str, str] = Field(default_factory=dict)
+    dataset_notes: Dict[str, str] = Field(default_factory=dict)
+
+
+class State(BaseModel):
+    question: str
+    # Dataset name -> CSV, Parquet or Arrow IPC file; prepare_datasets swaps in
+    # the cached Arrow IPC file that workers' analysis code memory-maps.
+    datasets: Dict[str, str] = Field(default_factory=dict)
+    # Dataset name -> row count and per-column summary statistics, for prompts.
+    dataset_notes: Dict[str, str] = Field(default_factory=dict)
+    # Registry lease pinning the Arrow files above until the report is rendered.
+    dataset_lease: Optional[int] = None
+    tasks: List[WorkerTask] = Field(default_factory=list)
+    results: Annotated[List[WorkerResult], operator.add] = Field(default_factory=list)
+    report: Optional[str] = None
+    report_html: Optional[str] = None
@@ -0,0 +1,135 @@
+"""Throughput and event-loop lag of the sync and async memory APIs under concurrency.
+
+Each request retrieves a user's memories and stores a new one, the way one
+agent turn does. Requests run as asyncio tasks, at most `--concurrency` at a
+time, through:
+
+- sync_in_loop: the sync functions called straight from the coroutine, as an
+  async agent calling the sync tools does; every Redis and embedding wait
+  blocks the event loop
+- sync_threads: the sync functions on a thread pool sized to the concurrency
+- async: `aretrieve_memories` and `astore_memory` on the pooled asyncio client
+
+The OpenAI vectorizer is replaced by a simulated one with the same fixed
+latency for `embed` (time.sleep) and `aembed` (asyncio.sleep), and every text
+is unique, so no embedding is cached. Event-loop lag is how late a 10 ms
+ticker task wakes up while requests run. The async pool holds at most
+REDIS_MAX_CONNECTIONS connections; more concurrent requests wait for one.
+
+Runs against the Redis at REDIS_URL (a local Redis Stack) and deletes what it
+writes.
+
+    python 4-travel-agent-long-short-memory/bench_async_memory.py --requests 256 --concurrency 1 8 32 64
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from redisvl.query.filter import Tag
+
+import utils
+from schema import MemoryType
+
+
+class SimulatedVectorizer:
+    def __init__(self, latency: float, dims: int = 1536):
+        self._latency = latency
+        self._dims = dims
+
+    def _vector(self, text: str, as_buffer: bool):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self._dims, dtype=np.float32)
+        return vector.tobytes() if as_buffer else vector.tolist()
+
+    def embed(self, text: str, as_buffer: bool = False, **kwargs):
+        time.sleep(self._latency)
+        return self._vector(text, as_buffer)
+
+    async def aembed(self, text: str, as_buffer: bool = False, **kwargs):
+        await asyncio.sleep(self._latency)
+        return self._vector(text, as_buffer)
+
+
+def _turn(i: int, user_id: str) -> None:
+    utils.retrieve_memories(f"Preferences asked in turn {i}", [MemoryType.EPISODIC], user_id, distance_threshold=0.3)
+    utils.store_memory(f"Traveller fact #{i}", MemoryType.EPISODIC, user_id)
+
+
+async def _aturn(i: int, user_id: str) -> None:
+    await utils.aretrieve_memories(
+        f"Preferences asked in turn {i}", [MemoryType.EPISODIC], user_id, distance_threshold=0.3
+    )
+    await utils.astore_memory(f"Traveller fact #{i}", MemoryType.EPISODIC, user_id)
+
+
+async def _ticker(lags: list, stop: asyncio.Event, interval: float = 0.01) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def _run(mode: str, requests: int, concurrency: int) -> dict:
+    user_id = f"bench-{mode}-{concurrency}-{time.time_ns()}"
+    limit = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    latencies, lags, stop = [], [], asyncio.Event()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        async def request(i: int) -> None:
+            async with limit:
+                started = time.perf_counter()
+                if mode == "sync_in_loop":
+                    _turn(i, user_id)
+                elif mode == "sync_threads":
+                    await loop.run_in_executor(pool, _turn, i, user_id)
+                else:
+                    await _aturn(i, user_id)
+                latencies.append(time.perf_counter() - started)
+
+        ticker = asyncio.create_task(_ticker(lags, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(request(i) for i in range(requests)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await ticker
+
+    stored = utils.memory_client().index.drop_by_filter(Tag("user_id") == user_id).processed
+    latencies.sort()
+    lags.sort()
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": requests,
+        "stored": stored,
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(requests / wall, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p95_ms": round(latencies[math.ceil(0.95 * len(latencies)) - 1] * 1000, 1),
+        "loop_lag_p95_ms": round(lags[math.ceil(0.95 * len(lags)) - 1] * 1000, 1) if lags else None,
+        "loop_lag_max_ms": round(lags[-1] * 1000, 1) if lags else None,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    vectorizer = SimulatedVectorizer(args.embed_latency)
+    utils.memory_client().embed = vectorizer
+    (await utils.amemory_client()).embed = vectorizer
+    for concurrency in args.concurrency:
+        for mode in ("sync_in_loop", "sync_threads", "async"):
+            print(json.dumps(await _run(mode, args.requests, concurrency)))
+    await (await utils.amemory_client()).redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--embed-latency", type=float, default=0.15, help="seconds per simulated embedding request")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""Hit ratio and saved latency of the embedding cache on a repetitive query stream.
+
+Memory queries are drawn from a Zipf distribution over a fixed set of
+phrasings, the way agents keep re-asking for "Airline preferences". The
+vectorizer is simulated with a fixed per-request latency. The stream is
+replayed twice: by a fresh process (empty LRU, empty Redis entries) and by a
+restarted one (empty LRU, Redis entries from the first run). The report also
+times a hit returned as float32 bytes versus converted to a float list.
+
+Runs against the Redis at REDIS_URL and deletes its keys afterwards.
+
+    python 4-travel-agent-long-short-memory/bench_embedding_cache.py --queries 2000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+import timeit
+
+import numpy as np
+from redis import Redis
+
+from embedding_cache import CachedVectorizer, to_list
+
+TOPICS = ["Airline preferences", "Travel, activity, and dietary preferences", "Hotel preferences",
+          "Seat preferences", "Past trips", "Visa requirements", "Loyalty programs", "Budget"]
+
+
+class SimulatedVectorizer:
+    def __init__(self, latency: float, dims: int = 1536):
+        self.model = f"simulated-{time.time_ns()}"
+        self._latency = latency
+        self._dims = dims
+
+    def embed_many(self, texts: list, batch_size: int = 10, as_buffer: bool = False, **kwargs) -> list:
+        time.sleep(self._latency * -(-len(texts) // batch_size))
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(self._dims, dtype=np.float32)
+            vectors.append(vector.tobytes() if as_buffer else vector.tolist())
+        return vectors
+
+
+def _stream(queries: int, phrasings: int, seed: int) -> list:
+    rng = random.Random(seed)
+    texts = [f"{TOPICS[i % len(TOPICS)]}{'' if i < len(TOPICS) else f' ({i})'}" for i in range(phrasings)]
+    weights = [1 / (rank + 1) for rank in range(phrasings)]
+    return rng.choices(texts, weights=weights, k=queries)
+
+
+def main(args: argparse.Namespace) -> None:
+    redis_client = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    vectorizer = SimulatedVectorizer(args.embed_latency)
+    stream = _stream(args.queries, args.phrasings, args.seed)
+    for run in ("fresh_process", "restarted_process"):
+        cache = CachedVectorizer(vectorizer, redis_client, ttl=600, lru_size=args.lru_size)
+        started = time.perf_counter()
+        for text in stream:
+            cache.embed(text)
+        wall = time.perf_counter() - started
+        print(json.dumps({"run": run, "queries": len(stream), "wall_s": round(wall, 3),
+                          "uncached_s": round(len(stream) * args.embed_latency, 3), **cache.stats()}))
+
+    vector = cache.embed(stream[0])
+    as_bytes = timeit.timeit(lambda: cache.embed(stream[0]), number=10_000) / 10_000
+    as_list = timeit.timeit(lambda: to_list(cache.embed(stream[0])), number=10_000) / 10_000
+    print(json.dumps({"hit_us": {"float32_bytes": round(as_bytes * 1e6, 2), "float_list": round(as_list * 1e6, 2)},
+                      "vector_bytes": len(vector)}))
+    keys = list(redis_client.scan_iter(f"embedding_cache:{vectorizer.model}:*"))
+    if keys:
+        redis_client.delete(*keys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--phrasings", type=int, default=200, help="distinct query texts in the stream")
+    parser.add_argument("--lru-size", type=int, default=4096)
+    parser.add_argument("--embed-latency", type=float, default=0.12, help="seconds per simulated embedding request")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
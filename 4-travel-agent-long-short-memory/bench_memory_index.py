@@ -0,0 +1,191 @@
+"""Recall and latency of FLAT versus HNSW memory indexes on synthetic corpora.
+
+For each corpus size, clustered random vectors are written to Redis hashes
+under a throwaway prefix, and a FLAT index plus one HNSW index per `--m` value
+are built over the same keys. Queries are perturbed corpus vectors, timed
+through redisvl in two shapes, with recall@k measured against exact cosine
+neighbours computed in NumPy:
+
+- knn: top-k queries, for several EF_RUNTIME values
+- range: the range queries the memory tools issue, for several EPSILON
+  values. Each query's radius is the distance of its k-th exact neighbour,
+  so a perfect search returns exactly those k.
+
+Vectors default to 384 dimensions so 1M of them fit in memory next to the
+indexes, each of which keeps its own copy. Latency grows with the
+dimension, so pass `--dims 1536` for the production embedding size if the
+host has the memory.
+
+Runs against a local Redis Stack at REDIS_URL and deletes everything it
+creates.
+
+    python 4-travel-agent-long-short-memory/bench_memory_index.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+from redis import Redis
+from redisvl.index import SearchIndex
+from redisvl.query import VectorQuery, VectorRangeQuery
+from redisvl.schema.schema import IndexSchema
+
+PREFIX = "bench_memory"
+
+
+def _corpus(size: int, dims: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((max(size // 1000, 10), dims), dtype=np.float32)
+    vectors = centers[rng.integers(0, len(centers), size)]
+    vectors += 0.6 * rng.standard_normal((size, dims), dtype=np.float32)
+    return vectors
+
+
+def _load(client: Redis, prefix: str, vectors: np.ndarray, batch: int = 2000) -> None:
+    for start in range(0, len(vectors), batch):
+        with client.pipeline(transaction=False) as pipe:
+            for i in range(start, min(start + batch, len(vectors))):
+                pipe.hset(f"{prefix}:{i}", mapping={"embedding": vectors[i].tobytes()})
+            pipe.execute()
+
+
+def _index(client: Redis, name: str, prefix: str, dims: int, algorithm: str, m: int, ef_construction: int):
+    attrs = {"algorithm": algorithm, "dims": dims, "distance_metric": "cosine", "datatype": "float32"}
+    if algorithm == "hnsw":
+        attrs.update({"m": m, "ef_construction": ef_construction})
+    schema = IndexSchema.from_dict({
+        "index": {"name": name, "prefix": prefix, "storage_type": "hash"},
+        "fields": [{"name": "embedding", "type": "vector", "attrs": attrs}],
+    })
+    index = SearchIndex(schema=schema, redis_client=client)
+    started = time.perf_counter()
+    index.create(overwrite=True)
+    while True:
+        info = client.ft(name).info()
+        if float(info["percent_indexed"]) >= 1 and int(info["indexing"]) == 0:
+            break
+        time.sleep(0.2)
+    return index, time.perf_counter() - started
+
+
+def _radii(vectors: np.ndarray, queries: np.ndarray, truth: np.ndarray) -> np.ndarray:
+    """Cosine distance from each query to the farthest of its exact neighbours."""
+    unit_queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    neighbours = vectors[truth]
+    unit_neighbours = neighbours / np.linalg.norm(neighbours, axis=2, keepdims=True)
+    distances = 1 - np.einsum("qd,qkd->qk", unit_queries, unit_neighbours)
+    # Float32 rounding in Redis must not push the k-th neighbour outside the radius.
+    return distances.max(axis=1) + 1e-5
+
+
+def _exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int, chunk: int = 100_000) -> np.ndarray:
+    unit_queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        block = vectors[start:start + chunk]
+        scores = unit_queries @ (block / np.linalg.norm(block, axis=1, keepdims=True)).T
+        scores = np.concatenate([best_scores, scores], axis=1)
+        block_ids = np.broadcast_to(np.arange(start, start + len(block)), (len(queries), len(block)))
+        ids = np.concatenate([best_ids, block_ids], axis=1)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return best_ids
+
+
+def _measure(
+    index: SearchIndex, queries: np.ndarray, truth: np.ndarray, k: int, ef_runtime=None, radii=None, epsilon=None
+):
+    """KNN queries, or range queries when ``radii`` holds each query's radius."""
+    latencies, hits = [], 0
+    for i, (query, expected) in enumerate(zip(queries, truth)):
+        if radii is None:
+            vector_query = VectorQuery(
+                vector=query.tobytes(), vector_field_name="embedding", num_results=k,
+                return_fields=["id"], ef_runtime=ef_runtime,
+            )
+        else:
+            vector_query = VectorRangeQuery(
+                vector=query.tobytes(), vector_field_name="embedding", num_results=2 * k,
+                return_fields=["id"], distance_threshold=float(radii[i]), epsilon=epsilon,
+            )
+        started = time.perf_counter()
+        results = index.query(vector_query)
+        latencies.append(time.perf_counter() - started)
+        found = {int(r["id"].rsplit(":", 1)[1]) for r in results}
+        hits += len(found & set(expected.tolist()))
+    latencies.sort()
+    return {
+        "recall_at_k": round(hits / (len(queries) * k), 4),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p95_ms": round(latencies[math.ceil(0.95 * len(latencies)) - 1] * 1000, 3),
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    client = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+    rng = np.random.default_rng(args.seed)
+    for size in args.sizes:
+        prefix = f"{PREFIX}:{size}"
+        vectors = _corpus(size, args.dims, rng)
+        _load(client, prefix, vectors)
+        picks = rng.integers(0, size, args.queries)
+        queries = vectors[picks] + 0.3 * rng.standard_normal((args.queries, args.dims), dtype=np.float32)
+        truth = _exact_neighbours(vectors, queries, args.k)
+        radii = _radii(vectors, queries, truth)
+
+        configs = [("flat", 0)] + [("hnsw", m) for m in args.m]
+        indexes = []
+        try:
+            for algorithm, m in configs:
+                name = f"{PREFIX}_{size}_{algorithm}{m or ''}"
+                index, build_s = _index(client, name, prefix, args.dims, algorithm, m, args.ef_construction)
+                indexes.append(index)
+                row = {
+                    "vectors": size, "dims": args.dims, "algorithm": algorithm, "m": m or None,
+                    "ef_construction": args.ef_construction if m else None, "build_s": round(build_s, 2),
+                }
+                for ef_runtime in ([None] if algorithm == "flat" else args.ef_runtime):
+                    print(json.dumps({
+                        **row, "query": "knn", "ef_runtime": ef_runtime,
+                        **_measure(index, queries, truth, args.k, ef_runtime=ef_runtime),
+                    }))
+                for epsilon in ([None] if algorithm == "flat" else args.epsilon):
+                    print(json.dumps({
+                        **row, "query": "range", "epsilon": epsilon,
+                        **_measure(index, queries, truth, args.k, radii=radii, epsilon=epsilon),
+                    }))
+        finally:
+            for index in indexes:
+                index.delete(drop=False)
+            for keys in _chunks(client.scan_iter(f"{prefix}:*", count=10_000), 10_000):
+                client.unlink(*keys)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, nargs="+", default=[16, 32])
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-runtime", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--epsilon", type=float, nargs="+", default=[0.01, 0.05, 0.2])
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,105 @@
+"""Process start-up cost of the memory layer as stored memories grow.
+
+Before, every process start ran `create(overwrite=True)` on the memory index,
+so Redis dropped it and re-indexed every `memory:*` document. Queries saw
+partial results until that finished. Now `ensure_memory_index` compares the
+stored schema version and leaves an up-to-date index alone. For each corpus
+size this times, against the Redis at REDIS_URL:
+
+- import_s: `import utils` in a fresh interpreter, which no longer connects to
+  Redis or builds clients
+- overwrite_s: the previous start-up, `create(overwrite=True)` until the index
+  is complete again
+- ensure_s: `ensure_memory_index` on an index at the current schema version
+
+Documents go under a throwaway prefix and index, which are deleted afterwards.
+
+    python 4-travel-agent-long-short-memory/bench_startup.py --memories 1000 10000 50000
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from redisvl.index import SearchIndex
+
+from redis_utils import ensure_memory_index, get_redis_client, memory_schema
+
+NAME = "bench_startup_memories"
+PREFIX = "bench_startup_memory"
+
+
+def _seed(index: SearchIndex, count: int, rng: np.random.Generator, batch: int = 500) -> None:
+    for start in range(0, count, batch):
+        index.load([
+            {
+                "content": f"Traveller fact #{i}",
+                "memory_type": "episodic",
+                "metadata": "{}",
+                "created_at": "2024-01-01T00:00:00",
+                "user_id": "bench",
+                "memory_id": str(i),
+                "embedding": rng.standard_normal(1536, dtype=np.float32).tolist(),
+            }
+            for i in range(start, min(start + batch, count))
+        ])
+
+
+def _wait_until_indexed(name: str) -> None:
+    client = get_redis_client()
+    while True:
+        info = client.ft(name).info()
+        if float(info["percent_indexed"]) >= 1 and int(info["indexing"]) == 0:
+            return
+        time.sleep(0.05)
+
+
+def _import_seconds() -> float:
+    code = "import time; t = time.perf_counter(); import utils; print(time.perf_counter() - t)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def main(args: argparse.Namespace) -> None:
+    client = get_redis_client()
+    schema = memory_schema(name=NAME, prefix=PREFIX)
+    rng = np.random.default_rng(args.seed)
+    import_s = round(min(_import_seconds() for _ in range(3)), 3)
+    loaded = 0
+    try:
+        for count in sorted(args.memories):
+            index = ensure_memory_index(client, schema)
+            _seed(index, count - loaded, rng)
+            loaded = count
+            _wait_until_indexed(NAME)
+
+            started = time.perf_counter()
+            SearchIndex(schema=schema, redis_client=client).create(overwrite=True, drop=False)
+            _wait_until_indexed(NAME)
+            overwrite_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            ensure_memory_index(client, schema)
+            ensure_s = time.perf_counter() - started
+            print(json.dumps({
+                "memories": count,
+                "import_s": import_s,
+                "overwrite_s": round(overwrite_s, 3),
+                "ensure_s": round(ensure_s, 4),
+            }))
+    finally:
+        SearchIndex(schema=schema, redis_client=client).delete(drop=True)
+        client.delete(f"{NAME}:schema_version")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memories", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,110 @@
+"""Write-path cost of long-term memories: embedding calls and wall time.
+
+The OpenAI vectorizer is replaced by a simulated one with fixed per-request
+latency and deterministic vectors (repeated texts embed identically), so only
+the number of embedding requests and Redis round trips differ between:
+
+- embed_twice: the previous store_memory, embedding once for the dedup query
+  and again for the load
+- store_memory: one embedding reused for the dedup query and the load
+- store_memories: batched embedding calls, in-batch dedup in NumPy,
+  pipelined dedup queries and pipelined loads (one of each below
+  MEMORY_BATCH_SIZE memories)
+
+Runs against the Redis at REDIS_URL (a local Redis Stack) and deletes what it
+writes.
+
+    python 4-travel-agent-long-short-memory/bench_store_memory.py --memories 200
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+
+import numpy as np
+from redisvl.query.filter import Tag
+
+import utils
+from schema import Memory, MemoryType
+
+
+class SimulatedVectorizer:
+    def __init__(self, latency: float, dims: int = 1536):
+        self._latency = latency
+        self._dims = dims
+        self.requests = 0
+
+    def _vector(self, text: str, as_buffer: bool):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self._dims, dtype=np.float32)
+        return vector.tobytes() if as_buffer else vector.tolist()
+
+    def embed(self, text: str, as_buffer: bool = False, **kwargs):
+        self.requests += 1
+        time.sleep(self._latency)
+        return self._vector(text, as_buffer)
+
+    def embed_many(self, texts: list, batch_size: int = 10, as_buffer: bool = False, **kwargs) -> list:
+        self.requests += -(-len(texts) // batch_size)
+        time.sleep(self._latency * -(-len(texts) // batch_size))
+        return [self._vector(text, as_buffer) for text in texts]
+
+
+def _embed_twice(content, memory_type, user_id, thread_id=None, metadata=None):
+    if utils.similar_memory_exists(content, memory_type, user_id, thread_id):
+        return
+    embedding = utils.memory_client().embed.embed(content, as_buffer=True)
+    utils.memory_client().index.load(
+        [utils._memory_data(content, memory_type, embedding, user_id, thread_id, metadata)]
+    )
+
+
+def _memories(count: int, duplicate_ratio: float, seed: int) -> list:
+    rng = random.Random(seed)
+    memories = []
+    for i in range(count):
+        if memories and rng.random() < duplicate_ratio:
+            memories.append(rng.choice(memories))
+        else:
+            memory_type = MemoryType.EPISODIC if i % 2 else MemoryType.SEMANTIC
+            memories.append(Memory(content=f"Traveller fact #{i}", memory_type=memory_type, metadata="{}"))
+    return memories
+
+
+def main(args: argparse.Namespace) -> None:
+    vectorizer = SimulatedVectorizer(args.embed_latency)
+    utils.memory_client().embed = vectorizer
+    memories = _memories(args.memories, args.duplicate_ratio, args.seed)
+    modes = {
+        "embed_twice": lambda user_id: [_embed_twice(m.content, m.memory_type, user_id) for m in memories],
+        "store_memory": lambda user_id: [
+            utils.store_memory(m.content, m.memory_type, user_id, metadata=m.metadata) for m in memories
+        ],
+        "store_memories": lambda user_id: utils.store_memories(memories, user_id),
+    }
+    for mode, run in modes.items():
+        user_id = f"bench-{mode}-{time.time_ns()}"
+        vectorizer.requests = 0
+        started = time.perf_counter()
+        run(user_id)
+        wall = time.perf_counter() - started
+        stored = utils.memory_client().index.drop_by_filter(Tag("user_id") == user_id).processed
+        print(json.dumps({
+            "mode": mode,
+            "memories": len(memories),
+            "stored": stored,
+            "embedding_requests": vectorizer.requests,
+            "wall_s": round(wall, 3),
+            "ms_per_memory": round(wall / len(memories) * 1000, 3),
+        }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memories", type=int, default=200)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2)
+    parser.add_argument("--embed-latency", type=float, default=0.15, help="seconds per simulated embedding request")
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
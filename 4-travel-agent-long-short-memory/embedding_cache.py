@@ -0,0 +1,168 @@
+"""Cache of text embeddings in front of the OpenAI vectorizer.
+
+Lookups go to an in-process LRU first, then to Redis, and only then to the
+vectorizer. Keys hash the model name and the exact text, so a model change
+misses. Vectors are stored and returned as raw float32 bytes, the form Redis
+vector queries take, so a hit never builds a Python list. Redis entries
+expire after a TTL. Given an asyncio Redis client too, the same cache serves
+``aembed`` and ``aembed_many`` for async callers.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import redis.asyncio as aioredis
+from redis import Redis
+
+
+def to_list(vector: bytes) -> List[float]:
+    """Float list for JSON documents, which cannot hold raw bytes."""
+    return np.frombuffer(vector, dtype=np.float32).tolist()
+
+
+class CachedVectorizer:
+    """Two-level embedding cache with hit and saved-latency counters.
+
+    Wraps a redisvl vectorizer and offers the same ``embed`` and
+    ``embed_many`` calls. Saved latency is estimated as the number of hits
+    times the mean per-text latency of the vectorizer calls made on misses.
+    """
+
+    def __init__(
+        self,
+        vectorizer: Any,
+        redis_client: Redis,
+        ttl: int = 7 * 24 * 3600,
+        lru_size: int = 4096,
+        prefix: str = "embedding_cache",
+        async_redis_client: Optional[aioredis.Redis] = None,
+    ):
+        self.vectorizer = vectorizer
+        self._redis = redis_client
+        self._aredis = async_redis_client
+        self._ttl = ttl
+        self._lru_size = lru_size
+        self._prefix = f"{prefix}:{vectorizer.model}"
+        self._lru: "OrderedDict[str, bytes]" = OrderedDict()
+        # Guards the LRU and the counters, which callers on many threads share.
+        self._lock = threading.Lock()
+        self.lru_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self._miss_seconds = 0.0
+
+    def key(self, text: str) -> str:
+        return f"{self._prefix}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _lru_put(self, key: str, vector: bytes) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._lru_size:
+            self._lru.popitem(last=False)
+
+    def _lookup_lru(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            vectors = [self._lru.get(key) for key in keys]
+            for key, vector in zip(keys, vectors):
+                if vector is not None:
+                    self._lru.move_to_end(key)
+            self.lru_hits += sum(v is not None for v in vectors)
+        return vectors
+
+    def _merge_redis(self, keys: List[str], vectors: List[Optional[bytes]], missing: List[int], found: list) -> None:
+        with self._lock:
+            for i, vector in zip(missing, found):
+                if vector is not None:
+                    vectors[i] = vector
+                    self.redis_hits += 1
+                    self._lru_put(keys[i], vector)
+
+    def _merge_embedded(
+        self, keys: List[str], vectors: List[Optional[bytes]], missing: List[int], embedded: list, seconds: float
+    ) -> None:
+        with self._lock:
+            self._miss_seconds += seconds
+            self.misses += len(missing)
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+                self._lru_put(keys[i], vector)
+
+    def embed(self, text: str, as_buffer: bool = True, **kwargs) -> Union[bytes, List[float]]:
+        return self.embed_many([text], as_buffer=as_buffer, **kwargs)[0]
+
+    def embed_many(
+        self, texts: Sequence[str], batch_size: int = 10, as_buffer: bool = True, **kwargs
+    ) -> List[Union[bytes, List[float]]]:
+        """Embeddings of ``texts`` in order: one Redis read, then vectorizer requests of ``batch_size`` misses."""
+        keys = [self.key(text) for text in texts]
+        vectors = self._lookup_lru(keys)
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            self._merge_redis(keys, vectors, missing, self._redis.mget([keys[i] for i in missing]))
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            started = time.perf_counter()
+            embedded = self.vectorizer.embed_many(
+                [texts[i] for i in missing], batch_size=batch_size, as_buffer=True, **kwargs
+            )
+            self._merge_embedded(keys, vectors, missing, embedded, time.perf_counter() - started)
+            with self._redis.pipeline(transaction=False) as pipe:
+                for i in missing:
+                    pipe.set(keys[i], vectors[i], ex=self._ttl)
+                pipe.execute()
+
+        return vectors if as_buffer else [to_list(v) for v in vectors]
+
+    async def aembed(self, text: str, as_buffer: bool = True, **kwargs) -> Union[bytes, List[float]]:
+        return (await self.aembed_many([text], as_buffer=as_buffer, **kwargs))[0]
+
+    async def aembed_many(
+        self, texts: Sequence[str], batch_size: int = 10, as_buffer: bool = True, **kwargs
+    ) -> List[Union[bytes, List[float]]]:
+        """`embed_many` through the asyncio Redis client and the vectorizer's ``aembed_many``."""
+        if self._aredis is None:
+            raise ValueError("CachedVectorizer was created without an async_redis_client")
+        keys = [self.key(text) for text in texts]
+        vectors = self._lookup_lru(keys)
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            self._merge_redis(keys, vectors, missing, await self._aredis.mget([keys[i] for i in missing]))
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            started = time.perf_counter()
+            embedded = await self.vectorizer.aembed_many(
+                [texts[i] for i in missing], batch_size=batch_size, as_buffer=True, **kwargs
+            )
+            self._merge_embedded(keys, vectors, missing, embedded, time.perf_counter() - started)
+            async with self._aredis.pipeline(transaction=False) as pipe:
+                for i in missing:
+                    pipe.set(keys[i], vectors[i], ex=self._ttl)
+                await pipe.execute()
+
+        return vectors if as_buffer else [to_list(v) for v in vectors]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return self._stats()
+
+    def _stats(self) -> Dict[str, float]:
+        lookups = self.lru_hits + self.redis_hits + self.misses
+        hits = self.lru_hits + self.redis_hits
+        mean_miss_s = self._miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "lookups": lookups,
+            "lru_hits": self.lru_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "mean_embed_ms": round(mean_miss_s * 1000, 3),
+            "saved_s": round(hits * mean_miss_s, 3),
+        }
@@ -0,0 +1,34 @@
+"""Rebuild the long-term memory index with another vector algorithm, online.
+
+    python 4-travel-agent-long-short-memory/migrate_index.py --algorithm hnsw --m 16 --ef-construction 200
+
+Queries keep using the old index until the new one has indexed every memory,
+then the `agent_memories` alias is switched over. Set MEMORY_INDEX_ALGORITHM
+and the MEMORY_INDEX_HNSW_* variables to the same values so restarted agents
+expect the migrated schema.
+"""
+
+import argparse
+import logging
+
+from redis_utils import (
+    MEMORY_INDEX_HNSW_EF_CONSTRUCTION,
+    MEMORY_INDEX_HNSW_M,
+    migrate_memory_index,
+)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--algorithm", choices=["flat", "hnsw"], required=True)
+    parser.add_argument("--m", type=int, default=MEMORY_INDEX_HNSW_M, help="HNSW edges per node")
+    parser.add_argument("--ef-construction", type=int, default=MEMORY_INDEX_HNSW_EF_CONSTRUCTION)
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds to wait for indexing")
+    args = parser.parse_args()
+    name = migrate_memory_index(
+        timeout=args.timeout,
+        algorithm=args.algorithm,
+        m=args.m,
+        ef_construction=args.ef_construction,
+    )
+    print(name)
@@ -1,6 +1,13 @@
 import logging
+import sys
+from pathlib import Path
 logger = logging.getLogger(__name__)
 
+# Repository root, for the transport shared by all agents. Inserted first so
+# this checkout's `common` wins over any installed package of that name.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.transport import openai_http_clients
+
 from redis_utils import redis_saver
 from toolkit import store_memory_tool, retrieve_memories_tool
 from langchain_core.messages import (
@@ -10,8 +17,8 @@ from langgraph.graph.message import MessagesState
 
 
 tools = [store_memory_tool, retrieve_memories_tool]
-llm = ChatOpenAI(model="gpt-4.1", temperature=0.7).bind_tools(tools)
-summarizer = ChatOpenAI(model="gpt-4.1", temperature=0.3)
+llm = ChatOpenAI(model="gpt-4.1", temperature=0.7, **openai_http_clients()).bind_tools(tools)
+summarizer = ChatOpenAI(model="gpt-4.1", temperature=0.3, **openai_http_clients())
 # The number of messages after which we'll summarize the conversation.
 MESSAGE_SUMMARIZATION_THRESHOLD = 6
 
@@ -1,65 +1,292 @@
+import hashlib
+import json
 import os
 import logging
+import time
+from functools import cache
+from typing import Any, Dict, List, Optional
 logger = logging.getLogger(__name__)
 
+import redis.asyncio as aioredis
 from redis import Redis
-from redisvl.index import SearchIndex
+from redis.exceptions import ResponseError
+from redisvl.exceptions import RedisSearchError
+from redisvl.index import AsyncSearchIndex, SearchIndex
 from redisvl.schema.schema import IndexSchema
-from langchain_core.messages import AIMessage, SystemMessage
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt.chat_agent_executor import create_react_agent
-from langgraph.checkpoint.redis import RedisSaver
 
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+# Connections the async client may open; further callers wait for a free one.
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+# Name queries use; after a migration it is an alias of a versioned physical index.
+MEMORY_INDEX_ALIAS = "agent_memories"
+# "flat" scans every vector; "hnsw" is an approximate graph search whose cost
+# grows roughly logarithmically with the number of memories.
+MEMORY_INDEX_ALGORITHM = os.getenv("MEMORY_INDEX_ALGORITHM", "flat")
+MEMORY_INDEX_HNSW_M = int(os.getenv("MEMORY_INDEX_HNSW_M", "16"))
+MEMORY_INDEX_HNSW_EF_CONSTRUCTION = int(os.getenv("MEMORY_INDEX_HNSW_EF_CONSTRUCTION", "200"))
+# Query-time HNSW setting, sent with every memory query to an HNSW index
+# instead of being part of the index schema, so changing it needs no
+# migration. The memory tools run range queries, whose counterpart of KNN's
+# EF_RUNTIME is EPSILON: how far beyond the radius the graph search keeps
+# looking. Higher trades latency for recall.
+MEMORY_QUERY_HNSW_EPSILON = float(os.getenv("MEMORY_QUERY_HNSW_EPSILON", "0.01"))
+
+
+@cache
+def get_redis_client() -> Redis:
+    """The process-wide Redis connection pool, created on first use rather than at import."""
+    return Redis.from_url(REDIS_URL)
+
+
+def create_async_redis_client() -> aioredis.Redis:
+    """A new asyncio Redis client with its own connection pool.
+
+    The pool blocks callers beyond ``REDIS_MAX_CONNECTIONS`` instead of
+    failing. Connections belong to the event loop that opened them, so each
+    loop needs its own client; `utils.amemory_client` keeps one per loop.
+    """
+    pool = aioredis.BlockingConnectionPool.from_url(REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS, timeout=30)
+    return aioredis.Redis(connection_pool=pool)
 
-redis_client = Redis.from_url(REDIS_URL)
-logger.info(f"Ping {redis_client.ping()}")
 
 @cache
 def redis_saver():
-    redis_saver = RedisSaver(redis_client=redis_client)
+    from langgraph.checkpoint.redis import RedisSaver
+
+    redis_saver = RedisSaver(redis_client=get_redis_client())
     redis_saver.setup()
+    return redis_saver
 
-@cache
-def init_redis_index():
-    memory_schema = IndexSchema.from_dict({
-            "index": {
-                "name": "agent_memories",  # Index name for identification
-                "prefix": "memory",       # Redis key prefix (memory:1, memory:2, etc.)
-                "key_separator": ":",
-                "storage_type": "json",
-            },
-            "fields": [
-                {"name": "content", "type": "text"},
-                {"name": "memory_type", "type": "tag"},
-                {"name": "metadata", "type": "text"},
-                {"name": "created_at", "type": "text"},
-                {"name": "user_id", "type": "tag"},
-                {"name": "memory_id", "type": "tag"},
-                {
-                    "name": "embedding",
-                    "type": "vector",
-                    "attrs": {
-                        "algorithm": "flat",
-                        "dims": 1536,  # OpenAI embedding dimension
-                        "distance_metric": "cosine",
-                        "datatype": "float32",
-                    },
-                },
-            ],
-        }
-    )
+def vector_attrs(
+    algorithm: str = MEMORY_INDEX_ALGORITHM,
+    m: int = MEMORY_INDEX_HNSW_M,
+    ef_construction: int = MEMORY_INDEX_HNSW_EF_CONSTRUCTION,
+    dims: int = 1536,  # OpenAI embedding dimension
+) -> Dict[str, Any]:
+    """Attributes of the embedding field for the chosen algorithm.
+
+    Only build-time settings belong here; they are all part of the schema version.
+    """
+    attrs = {"algorithm": algorithm, "dims": dims, "distance_metric": "cosine", "datatype": "float32"}
+    if algorithm == "hnsw":
+        attrs.update({"m": m, "ef_construction": ef_construction})
+    elif algorithm != "flat":
+        raise ValueError(f"Unknown vector index algorithm: {algorithm!r}")
+    return attrs
+
+
+def range_query_attrs(algorithm: Optional[str]) -> Dict[str, Any]:
+    """Query-time keyword arguments for a VectorRangeQuery on an index built with ``algorithm``."""
+    # A FLAT field rejects HNSW parameters.
+    return {"epsilon": MEMORY_QUERY_HNSW_EPSILON} if algorithm == "hnsw" else {}
+
+
+def schema_version(schema: IndexSchema) -> str:
+    """Digest of everything in ``schema`` that affects indexing, i.e. all but its name."""
+    definition = schema.to_dict()
+    definition["index"].pop("name")
+    return hashlib.sha256(json.dumps(definition, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def memory_schema(name: Optional[str] = None, prefix: str = "memory", **attrs) -> IndexSchema:
+    """Schema of the long-term memory index.
+
+    Without ``name`` the physical index is named after the alias, the
+    algorithm and the schema version, so every version gets its own index.
+    """
+    fields = [
+        {"name": "content", "type": "text"},
+        {"name": "memory_type", "type": "tag"},
+        {"name": "metadata", "type": "text"},
+        {"name": "created_at", "type": "text"},
+        {"name": "user_id", "type": "tag"},
+        {"name": "memory_id", "type": "tag"},
+        {"name": "embedding", "type": "vector", "attrs": vector_attrs(**attrs)},
+    ]
+    schema = IndexSchema.from_dict({
+        "index": {
+            "name": name or MEMORY_INDEX_ALIAS,
+            "prefix": prefix,       # Redis key prefix (memory:1, memory:2, etc.)
+            "key_separator": ":",
+            "storage_type": "json",
+        },
+        "fields": fields,
+    })
+    if name is None:
+        schema.index.name = f"{MEMORY_INDEX_ALIAS}_{fields[-1]['attrs']['algorithm']}_{schema_version(schema)[:8]}"
+    return schema
+
+
+def _tokens(value: Any) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        return [token for item in value for token in _tokens(item)]
+    return [value.decode() if isinstance(value, bytes) else str(value)]
+
+
+def vector_algorithm(info: Dict[str, Any]) -> Optional[str]:
+    """Lower-cased algorithm of the first vector field in an FT.INFO reply, if it reports one."""
+    for attribute in info.get("attributes", []):
+        tokens = _tokens(attribute)
+        for key, value in zip(tokens, tokens[1:]):
+            if key.lower() == "algorithm":
+                return value.lower()
+    return None
+
+
+def index_algorithm(redis_client: Redis, alias: str = MEMORY_INDEX_ALIAS) -> Optional[str]:
+    """Vector algorithm of the index ``alias`` resolves to, whatever this process is configured with."""
     try:
-        long_term_memory_index = SearchIndex(
-            schema=memory_schema,
-            redis_client=redis_client,
-            validate_on_load=True
-        )
-        long_term_memory_index.create(overwrite=True)
-        logger.info("Long-term memory index ready")
-    except Exception as e:
-        logger.info(f"Error creating index: {e}")
+        return vector_algorithm(redis_client.ft(alias).info())
+    except ResponseError:
+        return None
+
+
+async def aindex_algorithm(redis_client: aioredis.Redis, alias: str = MEMORY_INDEX_ALIAS) -> Optional[str]:
+    try:
+        return vector_algorithm(await redis_client.ft(alias).info())
+    except ResponseError:
         return None
-    return long_term_memory_index
 
+
+def alias_target(redis_client: Redis, alias: str = MEMORY_INDEX_ALIAS) -> Optional[str]:
+    """Physical index behind ``alias``, the alias itself for a plain index, or None if neither exists."""
+    try:
+        return redis_client.ft(alias).info()["index_name"]
+    except ResponseError:
+        return None
+
+
+async def aalias_target(redis_client: aioredis.Redis, alias: str = MEMORY_INDEX_ALIAS) -> Optional[str]:
+    try:
+        return (await redis_client.ft(alias).info())["index_name"]
+    except ResponseError:
+        return None
+
+
+def _wait_until_indexed(redis_client: Redis, name: str, timeout: float, poll: float = 1.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        info = redis_client.ft(name).info()
+        if float(info["percent_indexed"]) >= 1 and int(info["indexing"]) == 0:
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{name} is {float(info['percent_indexed']):.0%} indexed after {timeout}s")
+        logger.info(f"{name}: {float(info['percent_indexed']):.0%} indexed")
+        time.sleep(poll)
+
+
+def migrate_memory_index(timeout: float = 3600, **attrs) -> str:
+    """Move the memory alias to a new index built with ``attrs``, without taking queries offline.
+
+    The new physical index is created next to the current one and Redis
+    indexes the existing ``memory:*`` documents into it in the background
+    while queries keep hitting the old index. Once indexing completes, the
+    alias is switched and the old index is dropped; documents are never
+    deleted. A pre-alias deployment, whose physical index is itself named
+    ``agent_memories``, has its index dropped and the alias added in one
+    transaction. Returns the new physical index name.
+    """
+    redis_client = get_redis_client()
+    schema = memory_schema(**attrs)
+    current = alias_target(redis_client)
+    if current == schema.index.name:
+        logger.info(f"{MEMORY_INDEX_ALIAS} already points at {current}")
+        return current
+
+    new_index = SearchIndex(schema=schema, redis_client=redis_client)
+    if not new_index.exists():
+        new_index.create()
+    _wait_until_indexed(redis_client, schema.index.name, timeout)
+
+    if current is None:
+        redis_client.ft(schema.index.name).aliasadd(MEMORY_INDEX_ALIAS)
+    elif current == MEMORY_INDEX_ALIAS:
+        with redis_client.pipeline(transaction=True) as pipe:
+            pipe.execute_command("FT.DROPINDEX", current)
+            pipe.execute_command("FT.ALIASADD", MEMORY_INDEX_ALIAS, schema.index.name)
+            pipe.execute()
+    else:
+        redis_client.ft(schema.index.name).aliasupdate(MEMORY_INDEX_ALIAS)
+        redis_client.ft(current).dropindex(delete_documents=False)
+    logger.info(f"{MEMORY_INDEX_ALIAS} now points at {schema.index.name} (was {current})")
+    return schema.index.name
+
+
+def _needs_create(name: str, target: Optional[str], stored_version: Optional[bytes], version: str) -> bool:
+    """True if no index answers to ``name``; an existing one is used as is, with a warning if outdated."""
+    if target is None:
+        logger.info(f"Creating {name} at schema version {version[:8]}")
+        return True
+    if target != name:
+        if not target.endswith(version[:8]):
+            logger.warning(f"{name} points at {target}, built from another schema; run migrate_index.py to switch")
+    elif (stored_version or b"").decode() != version:
+        # Recreating it in place would leave queries on a half-built index
+        # while Redis re-indexes every memory.
+        built_from = f"schema version {stored_version.decode()[:8]}" if stored_version else "an unknown schema version"
+        logger.warning(
+            f"{name} was built from {built_from}, not {version[:8]}; keeping it. "
+            f"Run migrate_index.py to rebuild it online"
+        )
+    else:
+        logger.info(f"{name} is up to date")
+    return False
+
+
+def _created_elsewhere(error: RedisSearchError, exists: bool) -> bool:
+    """Whether a failed create lost a race with another process creating the same index."""
+    if exists:
+        logger.info(f"Index was created concurrently: {error}")
+    return exists
+
+
+def ensure_memory_index(redis_client: Redis, schema: IndexSchema) -> SearchIndex:
+    """Index for ``schema``, created only if it is missing.
+
+    The version of the schema an index was created with is kept next to it in
+    Redis. An index at the current version is used as is, so a restart does
+    not make Redis re-index every existing document. An index built from
+    another schema, behind an alias left by `migrate_memory_index` or not, is
+    never touched here; a warning points at the migration. When processes
+    start together, the ones that lose the race to create the index use the
+    winner's.
+    """
+    name, version = schema.index.name, schema_version(schema)
+    index = SearchIndex(schema=schema, redis_client=redis_client, validate_on_load=True)
+    target = alias_target(redis_client, name)
+    stored_version = redis_client.get(f"{name}:schema_version") if target == name else None
+    if _needs_create(name, target, stored_version, version):
+        try:
+            index.create(drop=False)
+        except RedisSearchError as e:
+            if not _created_elsewhere(e, index.exists()):
+                raise
+            # Keep the version the creating process records.
+            redis_client.set(f"{name}:schema_version", version, nx=True)
+        else:
+            redis_client.set(f"{name}:schema_version", version)
+    return index
+
+
+async def aensure_memory_index(redis_client: aioredis.Redis, schema: IndexSchema) -> AsyncSearchIndex:
+    """`ensure_memory_index` for the asyncio client."""
+    name, version = schema.index.name, schema_version(schema)
+    index = AsyncSearchIndex(schema=schema, redis_client=redis_client, validate_on_load=True)
+    target = await aalias_target(redis_client, name)
+    stored_version = await redis_client.get(f"{name}:schema_version") if target == name else None
+    if _needs_create(name, target, stored_version, version):
+        try:
+            await index.create(drop=False)
+        except RedisSearchError as e:
+            if not _created_elsewhere(e, await index.exists()):
+                raise
+            await redis_client.set(f"{name}:schema_version", version, nx=True)
+        else:
+            await redis_client.set(f"{name}:schema_version", version)
+    return index
+
+
+@cache
+def init_redis_index() -> SearchIndex:
+    return ensure_memory_index(get_redis_client(), memory_schema(name=MEMORY_INDEX_ALIAS))
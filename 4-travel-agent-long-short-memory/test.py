@@ -12,6 +12,7 @@ print(res.split("\n"))
 
 # Total Long term memories stored
 from redisvl.query import CountQuery
+from utils import memory_client
 
 # count total long-term memories in Redis
-long_term_memory_index.query(CountQuery())
\ No newline at end of file
+memory_client().index.query(CountQuery())
\ No newline at end of file
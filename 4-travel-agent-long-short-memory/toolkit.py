@@ -3,8 +3,19 @@ from typing import Dict, Optional, List
 from langchain_core.tools import tool
 from langchain_core.runnables.config import RunnableConfig
 
-from schema import MemoryType
-from utils import store_memory, retrieve_memories, SYSTEM_USER_ID
+from schema import MemoryType, StoredMemory
+from utils import aretrieve_memories, astore_memory, store_memory, retrieve_memories, SYSTEM_USER_ID
+
+
+def _format_memories(stored_memories: List[StoredMemory]) -> str:
+    response = []
+
+    if stored_memories:
+        response.append("Long-term memories:")
+        for memory in stored_memories:
+            response.append(f"- [{memory.memory_type}] {memory.content}")
+
+    return "\n".join(response) if response else "No relevant memories found."
 
 
 @tool
@@ -63,15 +74,68 @@ def retrieve_memories_tool(
             distance_threshold=0.3,
         )
 
-        # Format the response
-        response = []
+        return _format_memories(stored_memories)
 
-        if stored_memories:
-            response.append("Long-term memories:")
-            for memory in stored_memories:
-                response.append(f"- [{memory.memory_type}] {memory.content}")
+    except Exception as e:
+        return f"Error retrieving memories: {str(e)}"
+
+
+@tool
+async def astore_memory_tool(
+    content: str,
+    memory_type: MemoryType,
+    metadata: Optional[Dict[str, str]] = None,
+    config: Optional[RunnableConfig] = None,
+) -> str:
+    """
+    Store a long-term memory in the system.
 
-        return "\n".join(response) if response else "No relevant memories found."
+    Use this tool to save important information about user preferences,
+    experiences, or general knowledge that might be useful in future
+    interactions.
+    """
+    config = config or RunnableConfig()
+    user_id = config.get("user_id", SYSTEM_USER_ID)
+    thread_id = config.get("thread_id")
+
+    try:
+        await astore_memory(
+            content=content,
+            memory_type=memory_type,
+            user_id=user_id,
+            thread_id=thread_id,
+            metadata=str(metadata) if metadata else None,
+        )
+        return f"Successfully stored {memory_type} memory: {content}"
+    except Exception as e:
+        return f"Error storing memory: {str(e)}"
+
+
+@tool
+async def aretrieve_memories_tool(
+    query: str,
+    memory_type: List[MemoryType],
+    limit: int = 5,
+    config: Optional[RunnableConfig] = None,
+) -> str:
+    """
+    Retrieve long-term memories relevant to the query.
+
+    Use this tool to access previously stored information about user
+    preferences, experiences, or general knowledge.
+    """
+    config = config or RunnableConfig()
+    user_id = config.get("user_id", SYSTEM_USER_ID)
+
+    try:
+        stored_memories = await aretrieve_memories(
+            query=query,
+            memory_type=memory_type,
+            user_id=user_id,
+            limit=limit,
+            distance_threshold=0.3,
+        )
+        return _format_memories(stored_memories)
 
     except Exception as e:
-        return f"Error retrieving memories: {str(e)}"
\ No newline at end of file
+        return f"Error retrieving memories: {str(e)}"
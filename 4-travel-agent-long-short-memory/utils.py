@@ -1,51 +1,230 @@
 """Functions to access memories"""
 
+import asyncio
 import logging
+import os
+import time
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Union
+from functools import cache
+from typing import Any, Dict, List, Optional, Sequence, Union
 
+import numpy as np
+import redis.asyncio as aioredis
+from redis import Redis
+from redisvl.index import AsyncSearchIndex, SearchIndex
 from redisvl.utils.vectorize.text.openai import OpenAITextVectorizer
 from redisvl.query import VectorRangeQuery
 from redisvl.query.filter import Tag
 import ulid
 
-from schema import MemoryType, StoredMemory
-from redis_utils import init_redis_index
+from embedding_cache import CachedVectorizer, to_list
+from schema import Memory, MemoryType, StoredMemory
+from redis_utils import (
+    MEMORY_INDEX_ALIAS,
+    aensure_memory_index,
+    aindex_algorithm,
+    create_async_redis_client,
+    get_redis_client,
+    index_algorithm,
+    init_redis_index,
+    memory_schema,
+    range_query_attrs,
+)
 
 
 # If we have any memories that aren't associated with a user, we'll use this ID.
 SYSTEM_USER_ID = "system"
+# store_memories embeds, queries and loads in batches of at most this many
+# memories. OpenAI takes at most 2048 inputs per embeddings request.
+MEMORY_BATCH_SIZE = int(os.getenv("MEMORY_BATCH_SIZE", "256"))
+# OpenAI also caps the tokens of one embeddings request. A token is at least
+# one byte, so a batch of at most this many UTF-8 bytes stays under the cap.
+EMBEDDING_BATCH_BYTES = 250_000
 logger = logging.getLogger(__name__)
-long_term_memory_index = init_redis_index()
-openai_embed = OpenAITextVectorizer(model="text-embedding-ada-002")
 
 
-def similar_memory_exists(
-    content: str,
+@dataclass
+class MemoryClient:
+    """Redis connection, long-term memory index and embedding vectorizer."""
+
+    redis: Redis
+    index: SearchIndex
+    embed: CachedVectorizer
+    # Query-time vector arguments for the index the alias points at.
+    query_attrs: Dict[str, Any]
+
+
+@dataclass
+class AsyncMemoryClient:
+    """asyncio Redis connection pool, async memory index and embedding vectorizer."""
+
+    redis: aioredis.Redis
+    index: AsyncSearchIndex
+    embed: CachedVectorizer
+    query_attrs: Dict[str, Any]
+
+
+def _cached_vectorizer(redis_client: Redis, async_redis_client: Optional[aioredis.Redis] = None) -> CachedVectorizer:
+    # Agents re-issue the same queries constantly; embeddings are cached as float32 bytes.
+    return CachedVectorizer(
+        OpenAITextVectorizer(model="text-embedding-ada-002"),
+        redis_client,
+        ttl=int(os.getenv("EMBEDDING_CACHE_TTL", str(7 * 24 * 3600))),
+        lru_size=int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "4096")),
+        async_redis_client=async_redis_client,
+    )
+
+
+@cache
+def memory_client() -> MemoryClient:
+    """The process-wide memory client, connected on first use rather than at import.
+
+    The index is created only if it is missing; see `ensure_memory_index`.
+    """
+    started = time.perf_counter()
+    redis_client = get_redis_client()
+    index = init_redis_index()
+    client = MemoryClient(
+        redis=redis_client,
+        index=index,
+        embed=_cached_vectorizer(redis_client),
+        # The live index decides, not MEMORY_INDEX_ALGORITHM: a migration may be pending or done.
+        query_attrs=range_query_attrs(index_algorithm(redis_client, index.name)),
+    )
+    logger.info(f"Memory client ready in {time.perf_counter() - started:.3f}s")
+    return client
+
+
+# asyncio connections and locks belong to the event loop that created them, so
+# every loop gets its own client, created under its own lock.
+_async_clients: Dict[asyncio.AbstractEventLoop, AsyncMemoryClient] = {}
+_async_client_locks: Dict[asyncio.AbstractEventLoop, asyncio.Lock] = {}
+
+
+def _forget_closed_loops() -> None:
+    for loop in list(_async_client_locks):
+        if loop.is_closed():
+            _async_clients.pop(loop, None)
+            _async_client_locks.pop(loop, None)
+
+
+async def amemory_client() -> AsyncMemoryClient:
+    """The async memory client of the running event loop, connected on first use.
+
+    Concurrent first callers on a loop wait for one initialisation; later
+    calls return without taking the lock. Clients of loops that have since
+    closed are dropped when another loop creates its client.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is not None:
+        return client
+    async with _async_client_locks.setdefault(loop, asyncio.Lock()):
+        if loop not in _async_clients:
+            _forget_closed_loops()
+            started = time.perf_counter()
+            redis_client = create_async_redis_client()
+            index = await aensure_memory_index(redis_client, memory_schema(name=MEMORY_INDEX_ALIAS))
+            _async_clients[loop] = AsyncMemoryClient(
+                redis=redis_client,
+                index=index,
+                # The sync client is only used by sync callers; it connects lazily.
+                embed=_cached_vectorizer(get_redis_client(), redis_client),
+                query_attrs=range_query_attrs(await aindex_algorithm(redis_client, index.name)),
+            )
+            logger.info(f"Async memory client ready in {time.perf_counter() - started:.3f}s")
+    return _async_clients[loop]
+
+
+def _similar_memory_query(
+    embedding: bytes,
     memory_type: MemoryType,
-    user_id: str = SYSTEM_USER_ID,
-    thread_id: Optional[str] = None,
-    distance_threshold: float = 0.1,
-) -> bool:
-    """Check if a similar long-term memory already exists in Redis."""
-    content_embedding = openai_embed.embed(content)
+    user_id: str,
+    thread_id: Optional[str],
+    distance_threshold: float,
+    query_attrs: Dict[str, Any],
+) -> VectorRangeQuery:
     filters = (Tag("user_id") == user_id) & (Tag("memory_type") == memory_type)
 
     if thread_id:
         filters = filters & (Tag("thread_id") == thread_id)
 
-    # Search for similar memories
-    vector_query = VectorRangeQuery(
-        vector=content_embedding,
+    return VectorRangeQuery(
+        vector=embedding,
         num_results=1,
         vector_field_name="embedding",
         filter_expression=filters,
         distance_threshold=distance_threshold,
         return_fields=["id"],
+        **query_attrs,
     )
-    results = long_term_memory_index.query(vector_query)
-    logger.debug(f"Similar memory search results: {results}")
 
+
+def _memory_data(
+    content: str,
+    memory_type: MemoryType,
+    embedding: bytes,
+    user_id: str,
+    thread_id: Optional[str],
+    metadata: Optional[str],
+) -> dict:
+    return {
+        "user_id": user_id or SYSTEM_USER_ID,
+        "content": content,
+        "memory_type": memory_type.value,
+        "metadata": metadata or "{}",
+        "created_at": datetime.now().isoformat(),
+        # JSON documents hold the vector as a list of floats.
+        "embedding": to_list(embedding),
+        "memory_id": str(ulid.ULID()),
+        "thread_id": thread_id,
+    }
+
+
+def similar_memory_exists(
+    content: str,
+    memory_type: MemoryType,
+    user_id: str = SYSTEM_USER_ID,
+    thread_id: Optional[str] = None,
+    distance_threshold: float = 0.1,
+    embedding: Optional[bytes] = None,
+) -> bool:
+    """Check if a similar long-term memory already exists in Redis.
+
+    Pass ``embedding`` (float32 bytes) when the content has already been
+    embedded to skip a second vectorizer call.
+    """
+    client = memory_client()
+    if embedding is None:
+        embedding = client.embed.embed(content, as_buffer=True)
+    # Search for similar memories
+    vector_query = _similar_memory_query(
+        embedding, memory_type, user_id, thread_id, distance_threshold, client.query_attrs
+    )
+    return _found_similar(client.index.query(vector_query))
+
+
+async def asimilar_memory_exists(
+    content: str,
+    memory_type: MemoryType,
+    user_id: str = SYSTEM_USER_ID,
+    thread_id: Optional[str] = None,
+    distance_threshold: float = 0.1,
+    embedding: Optional[bytes] = None,
+) -> bool:
+    """`similar_memory_exists` on the async client."""
+    client = await amemory_client()
+    if embedding is None:
+        embedding = await client.embed.aembed(content, as_buffer=True)
+    vector_query = _similar_memory_query(
+        embedding, memory_type, user_id, thread_id, distance_threshold, client.query_attrs
+    )
+    return _found_similar(await client.index.query(vector_query))
+
+
+def _found_similar(results: list) -> bool:
+    logger.debug(f"Similar memory search results: {results}")
     if results:
         logger.debug(
             f"{len(results)} similar {'memory' if results.count == 1 else 'memories'} found. First: "
@@ -65,49 +244,161 @@ def store_memory(
     """Store a long-term memory in Redis with deduplication.
 
         This function:
-        1. Checks for similar existing memories to avoid duplicates
-        2. Generates vector embeddings for semantic search
-        3. Stores the memory with metadata for retrieval
+        1. Generates the vector embedding once
+        2. Checks for similar existing memories with it to avoid duplicates
+        3. Stores the memory and the same embedding with metadata for retrieval
         """
-    if metadata is None:
-        metadata = "{}"
+    logger.info(f"Preparing to store memory: {content}")
+
+    embedding = memory_client().embed.embed(content, as_buffer=True)
+    if similar_memory_exists(content, memory_type, user_id, thread_id, embedding=embedding):
+        logger.info("Similar memory found, skipping storage")
+        return
+
+    memory_data = _memory_data(content, memory_type, embedding, user_id, thread_id, metadata)
+
+    try:
+        memory_client().index.load([memory_data])
+    except Exception as e:
+        logger.error(f"Error storing memory: {e}")
+        return
+    logger.info(f"Stored {memory_type} memory: {content}")
+
 
+async def astore_memory(
+    content: str,
+    memory_type: MemoryType,
+    user_id: str = SYSTEM_USER_ID,
+    thread_id: Optional[str] = None,
+    metadata: Optional[str] = None,
+):
+    """`store_memory` on the async client; the event loop is free while Redis and OpenAI answer."""
     logger.info(f"Preparing to store memory: {content}")
 
-    if similar_memory_exists(content, memory_type, user_id, thread_id):
+    client = await amemory_client()
+    embedding = await client.embed.aembed(content, as_buffer=True)
+    if await asimilar_memory_exists(content, memory_type, user_id, thread_id, embedding=embedding):
         logger.info("Similar memory found, skipping storage")
         return
 
-    embedding = openai_embed.embed(content)
-    memory_data = {
-        "user_id": user_id or SYSTEM_USER_ID,
-        "content": content,
-        "memory_type": memory_type.value,
-        "metadata": metadata,
-        "created_at": datetime.now().isoformat(),
-        "embedding": embedding,
-        "memory_id": str(ulid.ULID()),
-        "thread_id": thread_id,
-    }
+    memory_data = _memory_data(content, memory_type, embedding, user_id, thread_id, metadata)
 
     try:
-        long_term_memory_index.load([memory_data])
+        await client.index.load([memory_data])
     except Exception as e:
         logger.error(f"Error storing memory: {e}")
         return
     logger.info(f"Stored {memory_type} memory: {content}")
 
-def retrieve_memories(
-    query: str,
-    memory_type: Union[Optional[MemoryType], List[MemoryType]] = None,
+
+def _unique_within_batch(
+    embeddings: np.ndarray, memory_types: Sequence[MemoryType], distance_threshold: float
+) -> List[int]:
+    """Indices of the memories to keep, dropping any within ``distance_threshold`` of an earlier kept one.
+
+    Distances are cosine, as in the index. Only memories of the same type are
+    compared. Memories are taken ``MEMORY_BATCH_SIZE`` at a time and compared
+    with the ones kept so far, so memory grows with the batch size times the
+    number kept rather than with the square of the number of memories.
+    """
+    types = np.array([t.value for t in memory_types])
+    kept_unit = np.empty(embeddings.shape, dtype=np.float32)
+    kept_types = np.empty(len(types), dtype=types.dtype)
+    kept: List[int] = []
+    for start in range(0, len(embeddings), MEMORY_BATCH_SIZE):
+        chunk = embeddings[start:start + MEMORY_BATCH_SIZE]
+        norms = np.linalg.norm(chunk, axis=1, keepdims=True)
+        unit = chunk / np.where(norms == 0, 1, norms)
+        chunk_types = types[start:start + len(chunk)]
+        close_to_kept = (1 - unit @ kept_unit[:len(kept)].T < distance_threshold) & (
+            chunk_types[:, None] == kept_types[None, :len(kept)]
+        )
+        keep = ~close_to_kept.any(axis=1)
+        # Pairs inside the chunk, earlier memory second; only those need deciding in order.
+        close = np.tril(1 - unit @ unit.T < distance_threshold, k=-1) & (chunk_types[:, None] == chunk_types[None, :])
+        for i in np.flatnonzero(keep & (close & keep).any(axis=1)):
+            keep[i] = not (close[i] & keep).any()
+        for i in np.flatnonzero(keep):
+            kept_unit[len(kept)] = unit[i]
+            kept_types[len(kept)] = chunk_types[i]
+            kept.append(start + int(i))
+    return kept
+
+
+def _embedding_batches(texts: Sequence[str]) -> List[slice]:
+    """Consecutive slices of ``texts`` within both the input and the byte bound of one request."""
+    batches, start, size = [], 0, 0
+    for i, text in enumerate(texts):
+        length = len(text.encode("utf-8"))
+        if i > start and (i - start == MEMORY_BATCH_SIZE or size + length > EMBEDDING_BATCH_BYTES):
+            batches.append(slice(start, i))
+            start, size = i, 0
+        size += length
+    if texts:
+        batches.append(slice(start, len(texts)))
+    return batches
+
+
+def store_memories(
+    memories: Sequence[Memory],
     user_id: str = SYSTEM_USER_ID,
     thread_id: Optional[str] = None,
     distance_threshold: float = 0.1,
-    limit: int = 5,
-) -> List[StoredMemory]:
-    logger.debug(f"Retrieving memories for query: {query}")
+) -> List[str]:
+    """Store many long-term memories with batched embedding calls and pipelined loads.
+
+    Memories are deduplicated against each other in NumPy, then against Redis
+    with pipelined range queries. Embedding requests and pipelines hold at
+    most ``MEMORY_BATCH_SIZE`` memories. Returns the Redis keys written.
+    """
+    if not memories:
+        return []
+    logger.info(f"Preparing to store {len(memories)} memories")
+
+    client = memory_client()
+    texts = [m.content for m in memories]
+    embeddings = []
+    for batch in _embedding_batches(texts):
+        embeddings += client.embed.embed_many(texts[batch], batch_size=len(texts[batch]), as_buffer=True)
+    matrix = np.frombuffer(b"".join(embeddings), dtype=np.float32).reshape(len(embeddings), -1)
+    keep = _unique_within_batch(matrix, [m.memory_type for m in memories], distance_threshold)
+    queries = [
+        _similar_memory_query(
+            embeddings[i], memories[i].memory_type, user_id, thread_id, distance_threshold, client.query_attrs
+        )
+        for i in keep
+    ]
+    existing = client.index.batch_query(queries, batch_size=MEMORY_BATCH_SIZE)
+    new = [i for i, results in zip(keep, existing) if not results]
+    logger.info(f"{len(memories) - len(new)} of {len(memories)} memories are duplicates, skipping them")
+    if not new:
+        return []
+
+    memory_data = [
+        _memory_data(
+            memories[i].content, memories[i].memory_type, embeddings[i], user_id, thread_id, memories[i].metadata
+        )
+        for i in new
+    ]
+    try:
+        keys = client.index.load(memory_data, batch_size=MEMORY_BATCH_SIZE)
+    except Exception as e:
+        logger.error(f"Error storing memories: {e}")
+        return []
+    logger.info(f"Stored {len(keys)} memories")
+    return keys
+
+def _retrieve_query(
+    embedding: bytes,
+    memory_type: Union[Optional[MemoryType], List[MemoryType]],
+    user_id: str,
+    thread_id: Optional[str],
+    distance_threshold: float,
+    limit: int,
+    query_attrs: Dict[str, Any],
+) -> VectorRangeQuery:
     vector_query = VectorRangeQuery(
-        vector=openai_embed.embed(query),
+        vector=embedding,
         return_fields=[
             "content",
             "memory_type", 
@@ -121,6 +412,7 @@ def retrieve_memories(
         vector_field_name="embedding",
         dialect=2,
         distance_threshold=distance_threshold,
+        **query_attrs,
     )
 
 
@@ -134,8 +426,10 @@ def retrieve_memories(
         base_filters.append(f"@thread_id:{{{thread_id}}}")
 
     vector_query.set_filter(" ".join(base_filters))
-    similar_results = long_term_memory_index.query(vector_query)
+    return vector_query
 
+
+def _stored_memories(similar_results: list) -> List[StoredMemory]:
     memories = []
     for doc in similar_results:
         try:
@@ -153,3 +447,38 @@ def retrieve_memories(
         except Exception as e:
             logger.error(f"Error parsing memory: {e}")
     return memories
+
+
+def retrieve_memories(
+    query: str,
+    memory_type: Union[Optional[MemoryType], List[MemoryType]] = None,
+    user_id: str = SYSTEM_USER_ID,
+    thread_id: Optional[str] = None,
+    distance_threshold: float = 0.1,
+    limit: int = 5,
+) -> List[StoredMemory]:
+    logger.debug(f"Retrieving memories for query: {query}")
+    client = memory_client()
+    embedding = client.embed.embed(query, as_buffer=True)
+    vector_query = _retrieve_query(
+        embedding, memory_type, user_id, thread_id, distance_threshold, limit, client.query_attrs
+    )
+    return _stored_memories(client.index.query(vector_query))
+
+
+async def aretrieve_memories(
+    query: str,
+    memory_type: Union[Optional[MemoryType], List[MemoryType]] = None,
+    user_id: str = SYSTEM_USER_ID,
+    thread_id: Optional[str] = None,
+    distance_threshold: float = 0.1,
+    limit: int = 5,
+) -> List[StoredMemory]:
+    """`retrieve_memories` on the async client."""
+    logger.debug(f"Retrieving memories for query: {query}")
+    client = await amemory_client()
+    embedding = await client.embed.aembed(query, as_buffer=True)
+    vector_query = _retrieve_query(
+        embedding, memory_type, user_id, thread_id, distance_threshold, limit, client.query_attrs
+    )
+    return _stored_memories(await client.index.query(vector_query))
@@ -0,0 +1,5 @@
+"""Code shared by the agent subprojects.
+
+Subprojects run as scripts from their own directory, so the module each
+imports this from puts the repository root at the front of ``sys.path``.
+"""
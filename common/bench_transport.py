@@ -0,0 +1,150 @@
+"""Connection reuse and latency of the shared transport against a local TLS mock.
+
+A local HTTPS server speaking the OpenAI chat-completions API counts the
+connections it accepts (each one a TLS handshake) and answers after a fixed
+delay. The same concurrent load of `ChatOpenAI.ainvoke` calls is sent three
+ways:
+
+1. client_per_call: a new model and HTTP client for every call.
+2. client_per_model: several long-lived models, each with its own client.
+3. shared: the same models, all using `openai_http_clients()`.
+
+The mock speaks HTTP/1.1 only, so this measures keep-alive pooling and saved
+handshakes; HTTP/2 multiplexing is negotiated only with real endpoints.
+
+    python common/bench_transport.py --calls 2000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from langchain_openai import ChatOpenAI
+
+import transport
+
+COMPLETION = json.dumps({
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4.1",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode()
+
+
+class MockOpenAI:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while await reader.readline():
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(self.delay)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(COMPLETION)}\r\n\r\n".encode()
+                    + COMPLETION
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+
+def _self_signed(directory: Path) -> tuple:
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", str(key), "-out", str(cert), "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+async def _drive(call, calls: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    wall = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "calls_per_s": round(calls / wall),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 2),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = _self_signed(Path(tmp))
+        server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ctx.load_cert_chain(cert, key)
+        os.environ["LLM_HTTP_CA_BUNDLE"] = str(cert)
+        mock = MockOpenAI(args.delay)
+        server = await asyncio.start_server(mock.handle, "127.0.0.1", 0, ssl=server_ctx)
+        base_url = f"https://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1"
+        settings = transport.client_settings()
+
+        def model(**clients) -> ChatOpenAI:
+            return ChatOpenAI(model="gpt-4.1", base_url=base_url, api_key="sk-bench", max_retries=0, **clients)
+
+        async def per_call(i: int) -> None:
+            async with httpx.AsyncClient(**settings) as client:
+                await model(http_async_client=client).ainvoke("ping")
+
+        own_clients = [httpx.AsyncClient(**settings) for _ in range(args.models)]
+        own_models = [model(http_async_client=client) for client in own_clients]
+        shared_models = [model(**transport.openai_http_clients()) for _ in range(args.models)]
+
+        results = {}
+        for name, call in (
+            ("client_per_call", per_call),
+            ("client_per_model", lambda i: own_models[i % args.models].ainvoke("ping")),
+            ("shared", lambda i: shared_models[i % args.models].ainvoke("ping")),
+        ):
+            before = mock.connections
+            stats = await _drive(call, args.calls, args.concurrency)
+            results[name] = {"connections": mock.connections - before, **stats}
+
+        for client in own_clients:
+            await client.aclose()
+        await transport.aclose_clients()
+        server.close()
+        await server.wait_closed()
+    print(json.dumps({"calls": args.calls, "concurrency": args.concurrency, "models": args.models, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--models", type=int, default=8, help="long-lived model instances sharing the load")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds the mock waits before answering")
+    asyncio.run(main(parser.parse_args()))
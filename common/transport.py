@@ -0,0 +1,93 @@
+"""One pooled HTTP client per provider, shared by every model client in the process.
+
+Each ``ChatOpenAI`` otherwise ends up with its own connection pool (or one
+default pool per base URL), so under load the agents open extra sockets and
+repeat TLS handshakes. Pass the clients from here instead:
+
+    ChatOpenAI(model="gpt-4.1", **openai_http_clients())
+
+Pool sizes and timeouts come from the environment:
+
+    LLM_HTTP2                      "1" (default) to negotiate HTTP/2, needs ``httpx[http2]``
+    LLM_HTTP_MAX_CONNECTIONS       sockets per provider (default 100)
+    LLM_HTTP_MAX_KEEPALIVE         idle sockets kept open per provider (default 100)
+    LLM_HTTP_KEEPALIVE_EXPIRY      seconds an idle socket is kept (default 60)
+    LLM_HTTP_TIMEOUT               read timeout in seconds (default 120)
+    LLM_HTTP_CONNECT_TIMEOUT       connect timeout in seconds (default 10)
+    LLM_HTTP_CA_BUNDLE             extra CA file to trust, e.g. behind a TLS-inspecting proxy
+
+Gemini models from ``langchain-google-genai`` 3.x talk gRPC rather than httpx;
+their channel already multiplexes calls over HTTP/2, so sharing one model
+instance per process is what pools their connections.
+"""
+
+import importlib.util
+import logging
+import os
+import ssl
+from typing import Any, Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_sync_clients: Dict[str, httpx.Client] = {}
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("LLM_HTTP2", "1") != "1":
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("LLM_HTTP2 is set but h2 is not installed; using HTTP/1.1 (pip install 'httpx[http2]')")
+        return False
+    return True
+
+
+def client_settings() -> Dict[str, Any]:
+    """Keyword arguments shared by the sync and async clients, read from the environment."""
+    ca_bundle = os.getenv("LLM_HTTP_CA_BUNDLE")
+    return {
+        "http2": _http2_enabled(),
+        "verify": ssl.create_default_context(cafile=ca_bundle) if ca_bundle else True,
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "100")),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60")),
+        ),
+        "timeout": httpx.Timeout(
+            float(os.getenv("LLM_HTTP_TIMEOUT", "120")),
+            connect=float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10")),
+        ),
+    }
+
+
+def async_client(provider: str) -> httpx.AsyncClient:
+    """The process-wide async client for ``provider``, created on first use."""
+    client = _async_clients.get(provider)
+    if client is None or client.is_closed:
+        client = _async_clients[provider] = httpx.AsyncClient(**client_settings())
+    return client
+
+
+def sync_client(provider: str) -> httpx.Client:
+    """The process-wide sync client for ``provider``, created on first use."""
+    client = _sync_clients.get(provider)
+    if client is None or client.is_closed:
+        client = _sync_clients[provider] = httpx.Client(**client_settings())
+    return client
+
+
+def openai_http_clients() -> Dict[str, Any]:
+    """``http_client``/``http_async_client`` keyword arguments for ``ChatOpenAI``."""
+    return {"http_client": sync_client("openai"), "http_async_client": async_client("openai")}
+
+
+async def aclose_clients() -> None:
+    """Close every shared client, e.g. when a long-running server shuts down."""
+    for client in list(_async_clients.values()):
+        await client.aclose()
+    for client in list(_sync_clients.values()):
+        client.close()
+    _async_clients.clear()
+    _sync_clients.clear()